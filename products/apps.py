@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        import products.signals
+        from . import autocomplete
+        autocomplete.load_snapshot()
@@ -0,0 +1,293 @@
+"""
+In-memory prefix index used by the search box typeahead.
+
+Suggestions come from listing names, listing tags and category names, each
+weighted by how many live listings carry that term. The index is loaded
+once per process from a compact snapshot file (see the
+``build_autocomplete_snapshot`` command) or, when no snapshot exists, built
+from the database on first use. Model signals keep it current afterwards.
+
+Changes that send no signals (``archive_listings`` expiring listings with
+``update()``, in another process) call ``bump_version()``: every worker
+compares its index against that shared cache key at most once every
+``AUTOCOMPLETE_CHECK_INTERVAL`` seconds and rebuilds it on change.
+"""
+import bisect
+import gzip
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'products:autocomplete:version'
+
+KIND_LISTING = 'listing'
+KIND_TAG = 'tag'
+KIND_CATEGORY = 'category'
+
+# Only the first few words of a label are used as entry points, so "calc"
+# finds "TI-84 calculator" without indexing every word of long names.
+MAX_WORD_OFFSETS = 3
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation/whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text.lower()))
+
+
+def split_tags(tags):
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+
+def listing_terms(name, tags):
+    """Return the (kind, label) pairs contributed by one listing."""
+    terms = []
+    if name and normalize(name):
+        terms.append((KIND_LISTING, name.strip()))
+    for tag in split_tags(tags):
+        if normalize(tag):
+            terms.append((KIND_TAG, tag))
+    return terms
+
+
+class PrefixIndex:
+    """
+    Weighted prefix index over a bounded number of terms.
+
+    Terms are identified by ``(kind, normalized label)``. Lookup keys are kept
+    in a sorted list so a prefix query is a bisect followed by a scan of the
+    matching range only.
+    """
+
+    def __init__(self, max_terms=50000):
+        self.max_terms = max_terms
+        self._lock = threading.RLock()
+        self._terms = {}  # (kind, norm) -> [label, weight]
+        self._keys = []   # sorted (key, kind, norm)
+
+    def __len__(self):
+        return len(self._terms)
+
+    @staticmethod
+    def _lookup_keys(norm):
+        words = norm.split(' ')
+        return {' '.join(words[i:]) for i in range(min(len(words), MAX_WORD_OFFSETS))}
+
+    def add(self, kind, label, weight=1):
+        norm = normalize(label)
+        if not norm or weight == 0:
+            return
+        with self._lock:
+            entry = self._terms.get((kind, norm))
+            if entry is None:
+                if weight < 0:
+                    return
+                self._terms[(kind, norm)] = [label, weight]
+                for key in self._lookup_keys(norm):
+                    bisect.insort(self._keys, (key, kind, norm))
+                if len(self._terms) > self.max_terms * 1.1:
+                    self._trim()
+                return
+            entry[1] += weight
+            if weight > 0:
+                entry[0] = label
+            if entry[1] <= 0:
+                self._remove(kind, norm)
+
+    def discard(self, kind, label, weight=1):
+        self.add(kind, label, -weight)
+
+    def remove(self, kind, label):
+        """Drop a term regardless of its weight; returns the weight it had."""
+        norm = normalize(label)
+        with self._lock:
+            entry = self._terms.get((kind, norm))
+            if entry is None:
+                return 0
+            self._remove(kind, norm)
+            return entry[1]
+
+    def _remove(self, kind, norm):
+        del self._terms[(kind, norm)]
+        for key in self._lookup_keys(norm):
+            i = bisect.bisect_left(self._keys, (key, kind, norm))
+            if i < len(self._keys) and self._keys[i] == (key, kind, norm):
+                del self._keys[i]
+
+    def _trim(self):
+        # Drop the least popular terms in one pass instead of evicting on
+        # every insert once the index is full.
+        overflow = len(self._terms) - self.max_terms
+        victims = heapq.nsmallest(overflow, self._terms.items(), key=lambda item: item[1][1])
+        for (kind, norm), _ in victims:
+            self._remove(kind, norm)
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix,))
+            matches = {}
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                _, kind, norm = self._keys[i]
+                matches[(kind, norm)] = self._terms[(kind, norm)]
+                i += 1
+            best = heapq.nlargest(limit, matches.items(), key=lambda item: (item[1][1], -len(item[0][1])))
+        return [
+            {'text': label, 'type': kind, 'score': weight}
+            for (kind, _), (label, weight) in best
+        ]
+
+    def items(self):
+        with self._lock:
+            return [(kind, label, weight) for (kind, _), (label, weight) in self._terms.items()]
+
+    def clear(self):
+        with self._lock:
+            self._terms.clear()
+            self._keys.clear()
+
+
+_index = None
+_index_version = None
+_checked_at = float('-inf')
+_index_lock = threading.Lock()
+
+
+def snapshot_path():
+    return getattr(
+        settings, 'AUTOCOMPLETE_SNAPSHOT_PATH',
+        os.path.join(settings.BASE_DIR, 'autocomplete.snapshot.gz'),
+    )
+
+
+def _new_index():
+    return PrefixIndex(max_terms=getattr(settings, 'AUTOCOMPLETE_MAX_TERMS', 50000))
+
+
+def write_snapshot(index, path=None):
+    """Write the index as gzipped ``kind<TAB>weight<TAB>label`` lines."""
+    path = path or snapshot_path()
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as fh:
+        for kind, label, weight in index.items():
+            fh.write(f"{kind}\t{weight}\t{label.replace(chr(9), ' ').replace(chr(10), ' ')}\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path=None):
+    index = _new_index()
+    with gzip.open(path or snapshot_path(), 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            kind, weight, label = line.rstrip('\n').split('\t', 2)
+            index.add(kind, label, int(weight))
+    return index
+
+
+def build_from_database():
+    from .models import Category, MerchantProduct, StudentProduct, TutorService
+
+    # A process-wide index must not be built from a lagging replica, even when
+    # the first suggestion request is being routed to one
+    index = _new_index()
+    for model in (MerchantProduct, StudentProduct):
+        for name, tags in model.objects.using('default').live().values_list('name', 'tags').iterator(chunk_size=2000):
+            for kind, label in listing_terms(name, tags):
+                index.add(kind, label)
+
+    category_counts = {}
+    for model in (MerchantProduct, StudentProduct, TutorService):
+        rows = model.objects.using('default').live().filter(category__isnull=False).values('category_id').annotate(n=Count('id'))
+        for row in rows:
+            category_counts[row['category_id']] = category_counts.get(row['category_id'], 0) + row['n']
+    for category_id, name in Category.objects.using('default').values_list('id', 'name'):
+        index.add(KIND_CATEGORY, name, 1 + category_counts.get(category_id, 0))
+    return index
+
+
+def current_version():
+    """The shared index version, or None if the cache is unreachable."""
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Autocomplete index version unavailable: {str(e)}")
+        return None
+    return version
+
+
+def bump_version():
+    """Make every process rebuild its index from the database on its next check."""
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump the autocomplete index version: {str(e)}")
+    reset()
+
+
+def load_snapshot():
+    """Install the on-disk snapshot as the process index, if one exists."""
+    global _index, _index_version, _checked_at
+    path = snapshot_path()
+    if not os.path.exists(path):
+        return False
+    try:
+        index = read_snapshot(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load autocomplete snapshot {path}: {str(e)}")
+        return False
+    with _index_lock:
+        _index, _index_version, _checked_at = index, current_version(), time.monotonic()
+    return True
+
+
+def get_index():
+    """Return the process index, (re)building it from the database if needed."""
+    global _index, _index_version, _checked_at
+    interval = getattr(settings, 'AUTOCOMPLETE_CHECK_INTERVAL', 30)
+    index = _index
+    if index is not None and time.monotonic() - _checked_at < interval:
+        return index
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _checked_at < interval:
+            return _index
+        version = current_version()
+        # An unreachable cache (None) keeps the index we have
+        if _index is None or (version is not None and version != _index_version):
+            _index, _index_version = build_from_database(), version
+        _checked_at = now
+        return _index
+
+
+def loaded_index():
+    """Return the process index only if it has already been built."""
+    return _index
+
+
+def reset():
+    global _index, _index_version
+    with _index_lock:
+        _index = _index_version = None
+
+
+def suggest(prefix, limit=10):
+    return get_index().suggest(prefix, limit)
@@ -0,0 +1,131 @@
+"""
+Process-level registry of categories.
+
+Categories change a few times a year, so every worker keeps the serialized
+list in memory and serves ``/categories/`` and the nested ``category`` of
+product rows from it. Saving or deleting a Category bumps a version key in
+the shared cache; each worker compares its copy against that key at most
+once every ``CATEGORY_CACHE_CHECK_INTERVAL`` seconds and reloads on change.
+If the shared cache is unreachable, workers keep serving the rows they
+have and reload from the database once per check interval instead.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'products:category_registry:version'
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Invalidate every worker's registry (called on Category save/delete)."""
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump the category registry version: {str(e)}")
+    registry.invalidate()
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class CategoryRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._ordered = None
+        self._by_id = {}
+
+    def _is_fresh(self, now):
+        interval = getattr(settings, 'CATEGORY_CACHE_CHECK_INTERVAL', 5)
+        return self._ordered is not None and now - self._checked_at < interval
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._is_fresh(now):
+            return
+        if self._ordered is not None and in_event_loop():
+            # The ORM refuses to run here; async views call arefresh() first
+            return
+        with self._lock:
+            if self._is_fresh(now):
+                return
+            try:
+                version = current_version()
+            except Exception as e:
+                # No shared version to compare against: reload every interval instead
+                logger.warning(f"Category registry version unavailable, reloading from the database: {str(e)}")
+                version = None
+            if self._ordered is None or version is None or version != self._version:
+                self._load(version)
+            self._checked_at = now
+
+    def _load(self, version):
+        from .models import Category
+        from .serializers import CategorySerializer
+
+        # Always the primary: a lagging replica's rows would be kept by this process
+        # until the next version bump, long after the replica catches up
+        categories = Category.objects.using('default').order_by('id')
+        ordered = [dict(row) for row in CategorySerializer(categories, many=True).data]
+        self._by_id = {row['id']: row for row in ordered}
+        self._ordered = ordered
+        self._version = version
+
+    async def arefresh(self):
+        """
+        For async views: re-check (and if needed reload) in a worker thread
+        once the check interval has passed. Called from the event loop,
+        ``all``/``get`` never reload themselves.
+        """
+        if not self._is_fresh(time.monotonic()):
+            await sync_to_async(self._ensure_fresh)()
+
+    def all(self):
+        """All categories ordered by id, as serialized dicts."""
+        self._ensure_fresh()
+        return self._ordered
+
+    def get(self, category_id):
+        if category_id is None:
+            return None
+        self._ensure_fresh()
+        return self._by_id.get(category_id)
+
+    def invalidate(self):
+        # Reload on next access; readers keep getting the current rows until then
+        with self._lock:
+            self._version = None
+            self._checked_at = float('-inf')
+
+
+registry = CategoryRegistry()
+
+
+def on_category_changed():
+    bump_version()
+    # Bump again once the write is visible to other connections, so a worker
+    # that reloaded mid-transaction does not keep the old rows.
+    transaction.on_commit(bump_version)
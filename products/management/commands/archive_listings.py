@@ -0,0 +1,93 @@
+import os
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.core import serializers
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from products import autocomplete
+from products.models import LISTING_MODELS, ArchivedListing, Listing, Review, SavedSearchMatch
+
+
+class Command(BaseCommand):
+    help = 'Expire stale listings and move sold/expired ones into the archive table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows updated or moved per transaction',
+            default=500,
+        )
+        parser.add_argument(
+            '--grace-days',
+            type=int,
+            help='Days a sold/expired listing stays in place (visible to its owner) before it is archived',
+            default=7,
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['grace_days'])
+        batch_size = options['batch_size']
+
+        total_expired = 0
+        for listing_type, model in LISTING_MODELS.items():
+            expired = self.expire(model, now, batch_size)
+            archived = self.archive(listing_type, model, cutoff, batch_size)
+            total_expired += expired
+            self.stdout.write(f"{listing_type}: {expired} expired, {archived} archived")
+
+        if total_expired:
+            self.refresh_autocomplete()
+
+    def refresh_autocomplete(self):
+        # update() sent no signals, so the workers' typeahead indexes still hold
+        # the expired listings' terms: rebuild the snapshot and have them reload
+        path = autocomplete.snapshot_path()
+        if os.path.exists(path):
+            autocomplete.write_snapshot(autocomplete.build_from_database(), path)
+        autocomplete.bump_version()
+        self.stdout.write("Autocomplete index rebuild requested.")
+
+    def expire(self, model, now, batch_size):
+        total = 0
+        while True:
+            ids = list(
+                model.objects.filter(status=Listing.STATUS_ACTIVE, expires_at__lt=now)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            total += model.objects.filter(id__in=ids).update(status=Listing.STATUS_EXPIRED)
+
+    def archive(self, listing_type, model, cutoff, batch_size):
+        total = 0
+        while True:
+            # Short transactions keep row locks brief on the browse tables
+            with transaction.atomic():
+                rows = list(
+                    model.objects.select_for_update(skip_locked=True)
+                    .exclude(status=Listing.STATUS_ACTIVE)
+                    .filter(expires_at__lt=cutoff)
+                    .order_by('id')[:batch_size]
+                )
+                if not rows:
+                    return total
+                ArchivedListing.objects.bulk_create([
+                    ArchivedListing(
+                        listing_type=listing_type,
+                        original_id=record['pk'],
+                        owner_id=record['fields']['owner'],
+                        status=record['fields']['status'],
+                        data=record['fields'],
+                    )
+                    for record in serializers.serialize('python', rows)
+                ], ignore_conflicts=True)
+                ids = [row.id for row in rows]
+                # Reviews (generic FK) and saved search matches have no DB-level
+                # cascade; drop them with their listing rather than leave orphans
+                Review.objects.filter(content_type=ContentType.objects.get_for_model(model), object_id__in=ids).delete()
+                SavedSearchMatch.objects.filter(listing_type=listing_type, object_id__in=ids).delete()
+                model.objects.filter(id__in=ids).delete()
+            total += len(rows)
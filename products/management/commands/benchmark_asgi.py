@@ -0,0 +1,203 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from unibazzar.middleware import async_middleware
+
+DEFAULT_PATHS = [
+    '/api/products/merchant-products/',
+    '/api/products/categories/',
+    '/api/products/reviews/summary/?type=merchant-product&object_id=1',
+    '/api/users/universities/',
+]
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and tail latency of the catalog reads served by the sync WSGI '
+        'handler (a fixed pool of worker threads) and the async ASGI handler, in-process'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Clients sending requests back to back',
+            default=100,
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Total requests per handler',
+            default=2000,
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='WSGI worker threads (like gunicorn --threads)',
+            default=8,
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Path (with query string) to request; repeat for several. Defaults to the hot catalog reads',
+        )
+        parser.add_argument(
+            '--db-latency-ms',
+            type=float,
+            help='Delay added to every query, to model a database across the network',
+            default=0,
+        )
+
+    def handle(self, *args, **options):
+        paths = options['path'] or DEFAULT_PATHS
+        latency = options['db_latency_ms'] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            # Sent on every reconnect of the same connection object
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        self.stdout.write(
+            f"{options['requests']} requests per handler, {options['concurrency']} clients, "
+            f"{options['db_latency_ms']:g} ms added per query"
+        )
+        # Wrappers are per connection: close this thread's so it reconnects with one
+        connections.close_all()
+        if latency:
+            connection_created.connect(add_delay)
+        try:
+            with override_settings(RATELIMIT_ENABLED=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+                wsgi = WSGIHandler()
+                with ThreadPoolExecutor(options['threads']) as pool:
+                    self.report(f"wsgi ({options['threads']} threads)", asyncio.run(self.run(
+                        lambda path: asyncio.get_running_loop().run_in_executor(pool, self.wsgi_request, wsgi, path),
+                        paths, options['concurrency'], options['requests'],
+                    )))
+
+                # Configured like unibazzar/asgi.py configures it
+                with override_settings(MIDDLEWARE=async_middleware(settings.MIDDLEWARE)):
+                    asgi = ASGIHandler()
+                conn_max_age = connections.settings['default']['CONN_MAX_AGE']
+                connections.settings['default']['CONN_MAX_AGE'] = 0
+                try:
+                    with override_settings(ROOT_URLCONF='unibazzar.urls_async'):
+                        self.report('asgi', asyncio.run(self.run(
+                            lambda path: self.asgi_request(asgi, path),
+                            paths, options['concurrency'], options['requests'],
+                        )))
+                finally:
+                    connections.settings['default']['CONN_MAX_AGE'] = conn_max_age
+        finally:
+            connection_created.disconnect(add_delay)
+            connections.close_all()
+            for connection in connections.all(initialized_only=True):
+                if delay in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(delay)
+
+    async def run(self, request, paths, concurrency, total):
+        latencies = []
+        errors = []
+        remaining = iter(range(total))
+
+        async def client():
+            for n in remaining:
+                started = time.perf_counter()
+                status = await request(paths[n % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors.append(status)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, label, result):
+        latencies, errors, elapsed = result
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+        self.stdout.write(
+            f"  {label:<18} {len(latencies) / elapsed:.0f} req/s, "
+            f"p50 {percentile(50):.1f} ms, p95 {percentile(95):.1f} ms, p99 {percentile(99):.1f} ms, "
+            f"{len(errors)} errors"
+        )
+
+    @staticmethod
+    def wsgi_request(handler, path):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        statuses = []
+        response = handler(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        return statuses[0]
+
+    @staticmethod
+    async def asgi_request(handler, path):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [(b'host', HOST.encode())],
+            'server': (HOST, 80),
+            'client': ('127.0.0.1', 0),
+        }
+        messages = []
+        done = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                done.set()
+
+        await handler(scope, receive, send)
+        return messages[0]['status']
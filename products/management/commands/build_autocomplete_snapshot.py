@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from products import autocomplete
+
+
+class Command(BaseCommand):
+    help = 'Build the autocomplete prefix index from the database and write it to the snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Where to write the snapshot (defaults to AUTOCOMPLETE_SNAPSHOT_PATH)',
+            default=None,
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        index = autocomplete.build_from_database()
+        path = autocomplete.write_snapshot(index, options['output'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(index)} terms to {path} in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,191 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from products.models import LISTING_MODELS, ArchivedListing
+from users.models import ChunkedUpload
+
+
+def file_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and field.storage is default_storage
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Delete (or quarantine) files in MEDIA_ROOT that no FileField/ImageField refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            help='Only collect files last modified longer ago than this, so fresh uploads are never touched',
+            default=24,
+        )
+        parser.add_argument(
+            '--upload-expiry-hours',
+            type=float,
+            help='Delete chunked uploads (row and partial file) not resumed for this long',
+            default=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY_HOURS', 72),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Threads walking the media tree',
+            default=8,
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be reclaimed',
+        )
+        parser.add_argument(
+            '--quarantine',
+            help='Move unreferenced files into this directory instead of deleting them',
+        )
+
+    def handle(self, *args, **options):
+        self.root = os.path.abspath(settings.MEDIA_ROOT)
+        self.cutoff = time.time() - options['grace_hours'] * 3600
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.quarantine = os.path.abspath(options['quarantine']) if options['quarantine'] else None
+
+        self.referenced = self.referenced_names()
+        self.stdout.write(f"{len(self.referenced)} files referenced")
+
+        files = size = 0
+        if os.path.isdir(self.root):
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = [executor.submit(self.collect_files, self.root, shallow=True)]
+                results += [executor.submit(self.collect_files, path) for path in self.subdirectories(self.root)]
+                for future in results:
+                    count, total = future.result()
+                    files += count
+                    size += total
+
+        expired = self.expire_uploads(timezone.now() - timedelta(hours=options['upload_expiry_hours']))
+        chunks, chunk_size = self.collect_chunks(expired)
+        action = 'reclaimable' if self.dry_run else ('quarantined' if self.quarantine else 'deleted')
+        self.stdout.write(self.style.SUCCESS(
+            f"{files} unreferenced media files, {filesizeformat(size)} ({size} bytes) {action}; "
+            f"{len(expired)} expired uploads, "
+            f"{chunks} abandoned upload chunks, {filesizeformat(chunk_size)} {action}."
+        ))
+
+    def referenced_names(self):
+        """Stream every stored file name from the database into one set."""
+        names = set()
+        for model in apps.get_models():
+            for field in file_fields(model):
+                names.update(
+                    model._base_manager.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+                    .values_list(field.attname, flat=True).iterator(chunk_size=2000)
+                )
+        # Archived listings keep their photos for the owner's history
+        fields = {listing_type: file_fields(model) for listing_type, model in LISTING_MODELS.items()}
+        for listing_type, data in ArchivedListing.objects.values_list('listing_type', 'data').iterator(chunk_size=2000):
+            for field in fields.get(listing_type, ()):
+                if data.get(field.attname):
+                    names.add(data[field.attname])
+        return names
+
+    def subdirectories(self, path):
+        with os.scandir(path) as entries:
+            return [
+                entry.path for entry in entries
+                if entry.is_dir(follow_symlinks=False) and entry.path != self.quarantine
+            ]
+
+    def collect_files(self, top, shallow=False):
+        """Collect the unreferenced files in ``top`` (and below it unless ``shallow``)."""
+        count = total = 0
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not shallow and entry.path != self.quarantine:
+                            stack.append(entry.path)
+                        continue
+                    if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                        continue
+                    name = os.path.relpath(entry.path, self.root).replace(os.sep, '/')
+                    if name in self.referenced:
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime > self.cutoff:
+                        continue
+                    if self.remove(entry.path, name):
+                        count += 1
+                        total += stat.st_size
+        return count, total
+
+    def remove(self, path, name):
+        if self.dry_run:
+            if self.verbosity > 1:
+                self.stdout.write(f"  {name}")
+            return True
+        try:
+            if self.quarantine:
+                destination = os.path.join(self.quarantine, name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.move(path, destination)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            self.stderr.write(f"Could not remove {name}: {str(e)}")
+            return False
+        return True
+
+    def expire_uploads(self, before):
+        """Delete ChunkedUpload rows not resumed since ``before``; returns their ids."""
+        stale = ChunkedUpload.objects.filter(updated_at__lt=before)
+        expired = {str(upload_id) for upload_id in stale.values_list('id', flat=True)}
+        if expired and not self.dry_run:
+            # Re-check the age so an upload resumed meanwhile is kept, and report
+            # only what was deleted so its .part file is kept too
+            stale.filter(id__in=expired).delete()
+            expired -= {
+                str(upload_id)
+                for upload_id in ChunkedUpload.objects.filter(id__in=expired).values_list('id', flat=True)
+            }
+        return expired
+
+    def collect_chunks(self, expired=()):
+        """Partial chunked uploads whose ChunkedUpload row is gone (or ``expired``)."""
+        directory = getattr(settings, 'CHUNKED_UPLOAD_DIR', None)
+        if not directory or not os.path.isdir(directory):
+            return 0, 0
+        active = {str(upload_id) for upload_id in ChunkedUpload.objects.values_list('id', flat=True)} - set(expired)
+        count = total = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                upload_id, extension = os.path.splitext(entry.name)
+                if extension != '.part' or upload_id in active or not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat()
+                # The grace period protects parts whose row is still being created
+                if upload_id not in expired and stat.st_mtime > self.cutoff:
+                    continue
+                if not self.dry_run:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        continue
+                count += 1
+                total += stat.st_size
+        return count, total
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from products import saved_search
+
+
+class Command(BaseCommand):
+    help = 'Match newly created listings against saved searches and email coalesced alerts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of queued listings matched per micro-batch',
+            default=500,
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling the queue every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Seconds to sleep between polls when the queue is empty (with --loop)',
+            default=30,
+        )
+
+    def handle(self, *args, **options):
+        index, fingerprint = None, None
+        while True:
+            # Only rebuild the index when saved searches were added or edited
+            current = saved_search.index_fingerprint()
+            if index is None or current != fingerprint:
+                index, fingerprint = saved_search.load_index(), current
+
+            processed = 0
+            while True:
+                batch = saved_search.match_pending(index, options['batch_size'])
+                if not batch:
+                    break
+                processed += batch
+            # Every run, not only after new matches: retries alerts whose send failed
+            # (one indexed query when nothing is pending)
+            notified = saved_search.notify_matches()
+            if processed or notified:
+                self.stdout.write(f"Matched {processed} listings against {len(index)} saved searches, "
+                                  f"notified {notified} users.")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
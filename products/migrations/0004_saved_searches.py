@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0001_initial'),
+        ('products', '0003_merchantproduct_phone_number_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingListingMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('merchant-product', 'Merchant Product'), ('student-product', 'Student Product'), ('tutor-service', 'Tutor Service')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(blank=True, max_length=255)),
+                ('listing_type', models.CharField(blank=True, choices=[('merchant-product', 'Merchant Product'), ('student-product', 'Student Product'), ('tutor-service', 'Tutor Service')], max_length=20)),
+                ('condition', models.CharField(blank=True, choices=[('used', 'Used'), ('slightly used', 'Slightly Used'), ('new', 'New')], max_length=20)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='products.category')),
+                ('university', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='users.university')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('merchant-product', 'Merchant Product'), ('student-product', 'Student Product'), ('tutor-service', 'Tutor Service')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='products.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['notified_at', 'saved_search'], name='savedsearchmatch_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchmatch',
+            constraint=models.UniqueConstraint(fields=('saved_search', 'listing_type', 'object_id'), name='unique_saved_search_match'),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:24
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.core.serializers.json
+import django.db.models.deletion
+from django.utils import timezone
+import products.models
+
+
+def hide_legacy_listings(apps, schema_editor):
+    # Replaces the hard-coded id__gte filters the viewsets used to hide old rows
+    apps.get_model('products', 'StudentProduct').objects.filter(id__lt=231).update(is_visible=False)
+    apps.get_model('products', 'TutorService').objects.filter(id__lt=210).update(is_visible=False)
+
+
+def stagger_expiry(apps, schema_editor):
+    # Existing rows all got the same default; spread them over one lifetime in
+    # creation (id) order so they don't all expire in the same archive run
+    lifetime = getattr(settings, 'LISTING_LIFETIME_DAYS', 60)
+    now = timezone.now()
+    for name in ('MerchantProduct', 'StudentProduct', 'TutorService'):
+        model = apps.get_model('products', name)
+        ids = list(model.objects.order_by('id').values_list('id', flat=True))
+        for day in range(lifetime):
+            chunk = ids[day * len(ids) // lifetime:(day + 1) * len(ids) // lifetime]
+            if chunk:
+                model.objects.filter(id__range=(chunk[0], chunk[-1])).update(
+                    expires_at=now + timedelta(days=day + 1),
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0004_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('merchant-product', 'Merchant Product'), ('student-product', 'Student Product'), ('tutor-service', 'Tutor Service')], max_length=20)),
+                ('original_id', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('sold', 'Sold'), ('expired', 'Expired')], max_length=10)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='merchantproduct',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=products.models.default_listing_expiry, null=True),
+        ),
+        migrations.AddField(
+            model_name='merchantproduct',
+            name='is_visible',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='merchantproduct',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('sold', 'Sold'), ('expired', 'Expired')], default='active', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=products.models.default_listing_expiry, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='is_visible',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('sold', 'Sold'), ('expired', 'Expired')], default='active', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='tutorservice',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=products.models.default_listing_expiry, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutorservice',
+            name='is_visible',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='tutorservice',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('sold', 'Sold'), ('expired', 'Expired')], default='active', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='merchantproduct',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['id'], name='merchantproduct_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='merchantproduct',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['category', 'id'], name='merchantproduct_live_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentproduct',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['id'], name='studentproduct_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentproduct',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['category', 'id'], name='studentproduct_live_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorservice',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['id'], name='tutorservice_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorservice',
+            index=models.Index(condition=models.Q(('is_visible', True), ('status', 'active')), fields=['category', 'id'], name='tutorservice_live_cat_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedlisting',
+            index=models.Index(fields=['owner', 'id'], name='archivedlisting_owner_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedlisting',
+            constraint=models.UniqueConstraint(fields=('listing_type', 'original_id'), name='unique_archived_listing'),
+        ),
+        migrations.RunPython(hide_legacy_listings, migrations.RunPython.noop),
+        migrations.RunPython(stagger_expiry, migrations.RunPython.noop),
+    ]
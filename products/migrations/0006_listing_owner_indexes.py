@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_listing_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='merchantproduct',
+            index=models.Index(fields=['owner', 'id'], name='merchantproduct_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentproduct',
+            index=models.Index(fields=['owner', 'id'], name='studentproduct_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorservice',
+            index=models.Index(fields=['owner', 'id'], name='tutorservice_owner_idx'),
+        ),
+    ]
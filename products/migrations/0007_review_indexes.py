@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_listing_owner_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['content_type', 'object_id', 'id'], name='review_target_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['content_type', 'object_id', 'rating', 'id'], name='review_target_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:48
+
+from django.db import migrations, models
+import unibazzar.media
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_review_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='merchantproduct',
+            name='photo',
+            field=models.ImageField(upload_to=unibazzar.media.UniqueUploadTo('merchant_products/')),
+        ),
+        migrations.AlterField(
+            model_name='studentproduct',
+            name='photo',
+            field=models.ImageField(upload_to=unibazzar.media.UniqueUploadTo('student_products/')),
+        ),
+        migrations.AlterField(
+            model_name='tutorservice',
+            name='banner_photo',
+            field=models.ImageField(upload_to=unibazzar.media.UniqueUploadTo('tutor_services/')),
+        ),
+    ]
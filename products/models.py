@@ -1,7 +1,12 @@
+from datetime import timedelta
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from unibazzar.media import UniqueUploadTo
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -11,10 +16,68 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class MerchantProduct(models.Model):
+def default_listing_expiry():
+    return timezone.now() + timedelta(days=getattr(settings, 'LISTING_LIFETIME_DAYS', 60))
+
+class ListingQuerySet(models.QuerySet):
+    def live(self):
+        """Listings shown in public browse/search results."""
+        # Past expires_at counts as expired even before archive_listings marks it
+        return self.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()),
+            status=Listing.STATUS_ACTIVE, is_visible=True,
+        )
+
+class Listing(models.Model):
+    """
+    Lifecycle fields shared by the three listing models. Sold and expired
+    rows are moved to ArchivedListing by the archive_listings command so the
+    browse tables only hold live data.
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_SOLD = 'sold'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_SOLD, 'Sold'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    expires_at = models.DateTimeField(default=default_listing_expiry, null=True, blank=True)
+    is_visible = models.BooleanField(default=True)
+
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['id'], condition=Q(status='active', is_visible=True), name='%(class)s_live_idx'),
+            models.Index(fields=['category', 'id'], condition=Q(status='active', is_visible=True), name='%(class)s_live_cat_idx'),
+            models.Index(fields=['owner', 'id'], name='%(class)s_owner_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        now = timezone.now()
+        if self.status != self.STATUS_ACTIVE:
+            # Start the archive grace period when a listing stops being active
+            if self.expires_at is None or self.expires_at > now:
+                self.expires_at = now
+        elif self.expires_at is None or self.expires_at <= now:
+            # Reactivated (or edited past its expiry): give it a full lifetime again
+            self.expires_at = default_listing_expiry()
+        super().save(*args, **kwargs)
+
+    @property
+    def is_live(self):
+        return (
+            self.status == self.STATUS_ACTIVE and self.is_visible
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
+
+class MerchantProduct(Listing):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='merchant_products')
     name = models.CharField(max_length=255)
-    photo = models.ImageField(upload_to='merchant_products/')
+    photo = models.ImageField(upload_to=UniqueUploadTo('merchant_products/'))
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='merchant_products')
     description = models.TextField()
     tags = models.CharField(max_length=255, blank=True)
@@ -30,7 +93,7 @@ class MerchantProduct(models.Model):
     def __str__(self):
         return self.name
 
-class StudentProduct(models.Model):
+class StudentProduct(Listing):
     CONDITION_CHOICES = [
         ('used', 'Used'),
         ('slightly used', 'Slightly Used'),
@@ -40,7 +103,7 @@ class StudentProduct(models.Model):
     name = models.CharField(max_length=255)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='student_products')
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
-    photo = models.ImageField(upload_to='student_products/')
+    photo = models.ImageField(upload_to=UniqueUploadTo('student_products/'))
     description = models.TextField()
     tags = models.CharField(max_length=255, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -55,9 +118,9 @@ class StudentProduct(models.Model):
     def __str__(self):
         return self.name
 
-class TutorService(models.Model):
+class TutorService(Listing):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tutor_services')
-    banner_photo = models.ImageField(upload_to='tutor_services/')
+    banner_photo = models.ImageField(upload_to=UniqueUploadTo('tutor_services/'))
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='tutor_services')
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -80,5 +143,97 @@ class Review(models.Model):
     comment = models.TextField()
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'id'], name='review_target_idx'),
+            models.Index(fields=['content_type', 'object_id', 'rating', 'id'], name='review_target_rating_idx'),
+        ]
+
     def __str__(self):
         return f"Review by {self.reviewer} ({self.rating})"
+
+
+# Stable string keys for the three listing types, used in URLs and payloads
+# instead of raw content type ids.
+LISTING_TYPE_CHOICES = [
+    ('merchant-product', 'Merchant Product'),
+    ('student-product', 'Student Product'),
+    ('tutor-service', 'Tutor Service'),
+]
+
+LISTING_MODELS = {
+    'merchant-product': MerchantProduct,
+    'student-product': StudentProduct,
+    'tutor-service': TutorService,
+}
+
+def listing_type_for(model):
+    for listing_type, listing_model in LISTING_MODELS.items():
+        if listing_model is model:
+            return listing_type
+    return None
+
+def content_type_for_listing_type(listing_type):
+    """ContentType for a key like 'merchant-product' (served from ContentType's cache)."""
+    model = LISTING_MODELS.get(listing_type)
+    return ContentType.objects.get_for_model(model) if model else None
+
+def listing_type_for_content_type_id(content_type_id):
+    try:
+        return listing_type_for(ContentType.objects.get_for_id(content_type_id).model_class())
+    except ContentType.DoesNotExist:
+        return None
+
+class SavedSearch(models.Model):
+    """A user's stored query and filters, matched against new listings."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_searches')
+    query = models.CharField(max_length=255, blank=True)
+    listing_type = models.CharField(max_length=20, choices=LISTING_TYPE_CHOICES, blank=True)
+    category = models.ForeignKey('Category', on_delete=models.CASCADE, null=True, blank=True, related_name='saved_searches')
+    university = models.ForeignKey('users.University', on_delete=models.CASCADE, null=True, blank=True, related_name='saved_searches')
+    condition = models.CharField(max_length=20, choices=StudentProduct.CONDITION_CHOICES, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"SavedSearch '{self.query}' by {self.user}"
+
+class PendingListingMatch(models.Model):
+    """New listings waiting to be matched by the match_saved_searches worker."""
+    listing_type = models.CharField(max_length=20, choices=LISTING_TYPE_CHOICES)
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class SavedSearchMatch(models.Model):
+    saved_search = models.ForeignKey('SavedSearch', on_delete=models.CASCADE, related_name='matches')
+    listing_type = models.CharField(max_length=20, choices=LISTING_TYPE_CHOICES)
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'listing_type', 'object_id'], name='unique_saved_search_match'),
+        ]
+        indexes = [
+            models.Index(fields=['notified_at', 'saved_search'], name='savedsearchmatch_pending_idx'),
+        ]
+
+class ArchivedListing(models.Model):
+    """A sold or expired listing removed from its browse table."""
+    listing_type = models.CharField(max_length=20, choices=LISTING_TYPE_CHOICES)
+    original_id = models.PositiveIntegerField()
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_listings')
+    status = models.CharField(max_length=10, choices=Listing.STATUS_CHOICES)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing_type', 'original_id'], name='unique_archived_listing'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'id'], name='archivedlisting_owner_idx'),
+        ]
@@ -0,0 +1,231 @@
+"""
+Matching of new listings against saved searches.
+
+Every saved search is reduced to a set of required keys (query terms plus
+listing type, category, university and condition filters) and an optional
+price range. The index maps each key to the searches that require it, so
+matching a listing only touches searches sharing at least one key with it:
+a search matches when all of its keys were hit and the price is in range.
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import LISTING_MODELS, PendingListingMatch, SavedSearch, SavedSearchMatch
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Accent/case-folded words with a naive plural strip ("laptops" -> "laptop")."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    tokens = set()
+    for word in _WORD_RE.findall(text):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.add(word)
+    return tokens
+
+
+def normalize_university(name):
+    return ' '.join(sorted(tokenize(name)))
+
+
+def search_keys(search):
+    keys = {('term', term) for term in tokenize(search.query)}
+    if search.listing_type:
+        keys.add(('type', search.listing_type))
+    if search.category_id:
+        keys.add(('category', search.category_id))
+    if search.university_id:
+        keys.add(('university', normalize_university(search.university.name)))
+    if search.condition:
+        keys.add(('condition', search.condition))
+    return keys
+
+
+def listing_keys(listing_type, listing):
+    text = ' '.join(
+        getattr(listing, field, '') or ''
+        for field in ('name', 'tags', 'description', 'condition')
+    )
+    keys = {('term', term) for term in tokenize(text)}
+    keys.add(('type', listing_type))
+    if listing.category_id:
+        keys.add(('category', listing.category_id))
+    university = getattr(listing, 'university', None) or getattr(listing, 'nearest_university', '')
+    if university:
+        keys.add(('university', normalize_university(university)))
+    if getattr(listing, 'condition', ''):
+        keys.add(('condition', listing.condition))
+    return keys
+
+
+class SavedSearchIndex:
+    def __init__(self, searches):
+        self._postings = defaultdict(list)  # key -> [search id, ...]
+        self._required = {}                 # search id -> number of keys
+        self._unkeyed = []                  # searches with only a price range
+        self._prices = {}                   # search id -> (min, max)
+        self._owners = {}                   # search id -> user id
+        for search in searches:
+            keys = search_keys(search)
+            self._owners[search.id] = search.user_id
+            self._prices[search.id] = (search.min_price, search.max_price)
+            if not keys:
+                self._unkeyed.append(search.id)
+                continue
+            self._required[search.id] = len(keys)
+            for key in keys:
+                self._postings[key].append(search.id)
+
+    def __len__(self):
+        return len(self._owners)
+
+    def match(self, listing_type, listing):
+        """Return ids of the saved searches ``listing`` satisfies."""
+        hits = defaultdict(int)
+        for key in listing_keys(listing_type, listing):
+            for search_id in self._postings.get(key, ()):
+                hits[search_id] += 1
+        candidates = [sid for sid, count in hits.items() if count == self._required[sid]]
+        candidates.extend(self._unkeyed)
+
+        matched = []
+        for search_id in candidates:
+            if self._owners[search_id] == listing.owner_id:
+                continue
+            min_price, max_price = self._prices[search_id]
+            if min_price is not None and listing.price < min_price:
+                continue
+            if max_price is not None and listing.price > max_price:
+                continue
+            matched.append(search_id)
+        return matched
+
+
+def load_index():
+    return SavedSearchIndex(SavedSearch.objects.select_related('university').iterator(chunk_size=2000))
+
+
+def index_fingerprint():
+    """Cheap summary of the saved search table, used to decide when to rebuild."""
+    stats = SavedSearch.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return stats['count'], stats['updated']
+
+
+def enqueue_listing(listing_type, listing_id):
+    PendingListingMatch.objects.create(listing_type=listing_type, object_id=listing_id)
+
+
+def match_pending(index, batch_size=500):
+    """
+    Match one micro-batch of queued listings. Returns the number of listings
+    processed; queued rows are removed once their matches are stored.
+    """
+    with transaction.atomic():
+        # skip_locked lets several workers drain the queue side by side
+        pending = list(
+            PendingListingMatch.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not pending:
+            return 0
+
+        ids_by_type = defaultdict(set)
+        for row in pending:
+            ids_by_type[row.listing_type].add(row.object_id)
+
+        matches = []
+        for listing_type, ids in ids_by_type.items():
+            model = LISTING_MODELS.get(listing_type)
+            if model is None:
+                continue
+            for listing in model.objects.live().filter(pk__in=ids):
+                for search_id in index.match(listing_type, listing):
+                    matches.append(SavedSearchMatch(
+                        saved_search_id=search_id, listing_type=listing_type, object_id=listing.pk,
+                    ))
+
+        # The index can still hold searches deleted since it was loaded, and
+        # ignore_conflicts does not cover foreign keys: keep the ones that exist,
+        # locked so they are not deleted before the matches are inserted
+        live_searches = set(
+            SavedSearch.objects.select_for_update()
+            .filter(id__in={match.saved_search_id for match in matches})
+            .values_list('id', flat=True)
+        )
+        matches = [match for match in matches if match.saved_search_id in live_searches]
+        SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+        PendingListingMatch.objects.filter(id__in=[row.id for row in pending]).delete()
+    return len(pending)
+
+
+def _listing_label(listing):
+    name = getattr(listing, 'name', None) or str(listing)
+    return f"{name} - {listing.price}"
+
+
+def notify_matches(connection=None):
+    """
+    Send one email per user covering all of their un-notified matches.
+    Returns the number of users notified.
+    """
+    unsent = list(
+        SavedSearchMatch.objects.filter(notified_at__isnull=True)
+        .select_related('saved_search__user')
+        .order_by('saved_search__user_id', 'id')
+    )
+    if not unsent:
+        return 0
+
+    ids_by_type = defaultdict(set)
+    for match in unsent:
+        ids_by_type[match.listing_type].add(match.object_id)
+    listings = {
+        (listing_type, pk): listing
+        for listing_type, ids in ids_by_type.items()
+        for pk, listing in LISTING_MODELS[listing_type].objects.in_bulk(ids).items()
+    }
+
+    by_user = defaultdict(list)
+    for match in unsent:
+        by_user[match.saved_search.user].append(match)
+
+    notified = 0
+    # One SMTP connection for the whole batch
+    with (connection or get_connection()) as connection:
+        for user, user_matches in by_user.items():
+            lines = []
+            seen = set()
+            for match in user_matches:
+                # A listing matched by several of the user's searches is listed once
+                key = (match.listing_type, match.object_id)
+                listing = listings.get(key)
+                if listing is not None and key not in seen:
+                    seen.add(key)
+                    lines.append(f"- {_listing_label(listing)}")
+            try:
+                if lines:
+                    EmailMessage(
+                        f"{len(lines)} new listing{'s' if len(lines) != 1 else ''} match your saved searches",
+                        f"Hello {user.full_name},\n\nNew on UniBazzar:\n" + "\n".join(lines) + "\n\nThe UniBazzar Team",
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=[user.email],
+                        connection=connection,
+                    ).send()
+            except Exception as e:
+                logger.error(f"Saved search notification to {user.email} failed: {str(e)}")
+                continue
+            SavedSearchMatch.objects.filter(id__in=[m.id for m in user_matches]).update(notified_at=timezone.now())
+            notified += 1
+    return notified
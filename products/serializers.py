@@ -1,13 +1,27 @@
+from collections import defaultdict
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
-from .models import MerchantProduct, StudentProduct, TutorService, Review, Category
+from .models import (
+    MerchantProduct, StudentProduct, TutorService, Review, Category, SavedSearch, SavedSearchMatch,
+    listing_type_for, listing_type_for_content_type_id,
+)
+from .category_cache import registry as category_registry
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
+class CachedCategorySerializer(CategorySerializer):
+    """
+    Read-only nested category rendered from the in-memory category registry.
+    Use with source='category_id' so product rows never load the Category.
+    """
+    def to_representation(self, category_id):
+        return category_registry.get(category_id)
+
 class MerchantProductSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+    category = CachedCategorySerializer(source='category_id', read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
     nearest_university = serializers.CharField(read_only=True)
     phone_number = serializers.CharField()
@@ -15,10 +29,10 @@ class MerchantProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = MerchantProduct
         fields = '__all__'
-        read_only_fields = ['owner', 'nearest_university']
+        read_only_fields = ['owner', 'nearest_university', 'expires_at', 'is_visible']
 
 class StudentProductSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+    category = CachedCategorySerializer(source='category_id', read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
     university = serializers.CharField(read_only=True)
     phone_number = serializers.CharField()
@@ -26,10 +40,10 @@ class StudentProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentProduct
         fields = '__all__'
-        read_only_fields = ['owner', 'university']
+        read_only_fields = ['owner', 'university', 'expires_at', 'is_visible']
 
 class TutorServiceSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+    category = CachedCategorySerializer(source='category_id', read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
     university = serializers.CharField(read_only=True)
     phone_number = serializers.CharField()
@@ -37,12 +51,99 @@ class TutorServiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = TutorService
         fields = '__all__'
-        read_only_fields = ['owner', 'university']
+        read_only_fields = ['owner', 'university', 'expires_at', 'is_visible']
+
+# (name field, image field) used for the compact review target summary
+REVIEW_TARGET_FIELDS = {
+    MerchantProduct: ('name', 'photo'),
+    StudentProduct: ('name', 'photo'),
+    TutorService: ('description', 'banner_photo'),
+}
+
+class ReviewListSerializer(serializers.ListSerializer):
+    """
+    Resolves the reviewed objects for a whole page at once when the request
+    asks for ?expand=target: review rows are grouped per content type and
+    each model's objects are fetched with a single query.
+    """
+    def to_representation(self, data):
+        reviews = list(data.all() if hasattr(data, 'all') else data)
+        if self.context.get('expand_target'):
+            self._context['review_targets'] = self.resolve_targets(reviews)
+        return super().to_representation(reviews)
+
+    def resolve_targets(self, reviews):
+        ids_by_content_type = defaultdict(set)
+        for review in reviews:
+            ids_by_content_type[review.content_type_id].add(review.object_id)
+
+        request = self.context.get('request')
+        targets = {}
+        for content_type_id, ids in ids_by_content_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model not in REVIEW_TARGET_FIELDS:
+                continue
+            name_field, image_field = REVIEW_TARGET_FIELDS[model]
+            for obj in model.objects.filter(pk__in=ids).only('id', 'price', name_field, image_field):
+                image = getattr(obj, image_field)
+                image_url = image.url if image else None
+                if image_url and request is not None:
+                    image_url = request.build_absolute_uri(image_url)
+                targets[(content_type_id, obj.pk)] = {
+                    'type': listing_type_for(model),
+                    'id': obj.pk,
+                    'name': getattr(obj, name_field)[:100],
+                    'price': str(obj.price),
+                    'thumbnail': image_url,
+                }
+        return targets
 
 class ReviewSerializer(serializers.ModelSerializer):
     reviewer = serializers.PrimaryKeyRelatedField(read_only=True)
+    reviewer_name = serializers.CharField(source='reviewer.full_name', read_only=True)
+    target_type = serializers.SerializerMethodField()
+    target = serializers.SerializerMethodField()
 
     class Meta:
         model = Review
         fields = '__all__'
-        read_only_fields = ['reviewer']
+        read_only_fields = ['reviewer', 'reviewer_name']
+        list_serializer_class = ReviewListSerializer
+
+    def get_target_type(self, obj):
+        return listing_type_for_content_type_id(obj.content_type_id)
+
+    def get_target(self, obj):
+        targets = self.context.get('review_targets')
+        if targets is None:
+            return None
+        return targets.get((obj.content_type_id, obj.object_id))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not self.context.get('expand_target'):
+            data.pop('target', None)
+        return data
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = [
+            'id', 'query', 'listing_type', 'category', 'university', 'condition',
+            'min_price', 'max_price', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate(self, attrs):
+        criteria = ['query', 'listing_type', 'category', 'university', 'condition', 'min_price', 'max_price']
+        merged = {field: attrs.get(field, getattr(self.instance, field, None)) for field in criteria}
+        if not any(merged.values()):
+            raise serializers.ValidationError("Provide a query or at least one filter.")
+        if merged['min_price'] is not None and merged['max_price'] is not None and merged['min_price'] > merged['max_price']:
+            raise serializers.ValidationError({"max_price": "max_price must not be lower than min_price."})
+        return attrs
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'listing_type', 'object_id', 'created_at', 'notified_at']
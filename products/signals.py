@@ -0,0 +1,88 @@
+from django.dispatch import receiver
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from . import autocomplete, category_cache, saved_search
+from .models import Category, MerchantProduct, StudentProduct, TutorService, listing_type_for
+
+
+# --- Autocomplete index maintenance --- #
+
+@receiver(pre_save, sender=MerchantProduct)
+@receiver(pre_save, sender=StudentProduct)
+def remember_listing_terms(sender, instance, **kwargs):
+    # Keep the terms of the stored row so post_save can apply the difference.
+    instance._autocomplete_old_terms = []
+    if instance.pk and autocomplete.loaded_index() is not None:
+        old = sender.objects.live().filter(pk=instance.pk).values_list('name', 'tags').first()
+        if old:
+            instance._autocomplete_old_terms = autocomplete.listing_terms(*old)
+
+
+@receiver(post_save, sender=MerchantProduct)
+@receiver(post_save, sender=StudentProduct)
+def index_listing_terms(sender, instance, **kwargs):
+    index = autocomplete.loaded_index()
+    if index is None:
+        return
+    for kind, label in getattr(instance, '_autocomplete_old_terms', []):
+        index.discard(kind, label)
+    if instance.is_live:
+        for kind, label in autocomplete.listing_terms(instance.name, instance.tags):
+            index.add(kind, label)
+
+
+@receiver(post_delete, sender=MerchantProduct)
+@receiver(post_delete, sender=StudentProduct)
+def unindex_listing_terms(sender, instance, **kwargs):
+    index = autocomplete.loaded_index()
+    if index is None or not instance.is_live:
+        return
+    for kind, label in autocomplete.listing_terms(instance.name, instance.tags):
+        index.discard(kind, label)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_name(sender, instance, **kwargs):
+    instance._autocomplete_old_name = None
+    if instance.pk and autocomplete.loaded_index() is not None:
+        instance._autocomplete_old_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def index_category_name(sender, instance, created, **kwargs):
+    index = autocomplete.loaded_index()
+    if index is None:
+        return
+    old_name = getattr(instance, '_autocomplete_old_name', None)
+    if old_name and old_name != instance.name:
+        # Carry the popularity of the old name over to the renamed category.
+        weight = index.remove(autocomplete.KIND_CATEGORY, old_name)
+        index.add(autocomplete.KIND_CATEGORY, instance.name, weight or 1)
+    elif created:
+        index.add(autocomplete.KIND_CATEGORY, instance.name)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category_name(sender, instance, **kwargs):
+    index = autocomplete.loaded_index()
+    if index is not None:
+        index.remove(autocomplete.KIND_CATEGORY, instance.name)
+
+
+# --- Category registry invalidation --- #
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, instance, **kwargs):
+    category_cache.on_category_changed()
+
+
+# --- Saved search matching queue --- #
+
+@receiver(post_save, sender=MerchantProduct)
+@receiver(post_save, sender=StudentProduct)
+@receiver(post_save, sender=TutorService)
+def queue_listing_for_saved_searches(sender, instance, created, raw=False, **kwargs):
+    # Matching itself happens in the match_saved_searches worker
+    if created and not raw:
+        saved_search.enqueue_listing(listing_type_for(sender), instance.pk)
@@ -1,3 +1,849 @@
+import os
+import shutil
+import tempfile
+import time
+from base64 import b64decode, b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import QuerySet
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import autocomplete
+from .category_cache import in_event_loop, registry as category_registry
+from .saved_search import load_index, match_pending
+from .models import (
+    Category, MerchantProduct, StudentProduct, TutorService, SavedSearch, SavedSearchMatch,
+    PendingListingMatch, ArchivedListing, Listing, Review,
+)
+from unibazzar.middleware import async_middleware
+from unibazzar.replicas import _replica, sticky_key
+from users import university_index
+from users.models import ChunkedUpload, University
+
+User = get_user_model()
+
+
+class PrefixIndexTests(TestCase):
+    def test_suggest_orders_by_weight(self):
+        """Test that more popular terms are suggested first"""
+        index = autocomplete.PrefixIndex()
+        index.add(autocomplete.KIND_TAG, 'laptop', 1)
+        index.add(autocomplete.KIND_LISTING, 'Used Laptop', 5)
+        index.add(autocomplete.KIND_LISTING, 'Lamp', 3)
+
+        results = index.suggest('lap')
+        self.assertEqual([r['text'] for r in results], ['Used Laptop', 'laptop'])
+
+    def test_suggest_is_accent_and_case_insensitive(self):
+        """Test that prefixes match regardless of case and accents"""
+        index = autocomplete.PrefixIndex()
+        index.add(autocomplete.KIND_CATEGORY, 'Électronique')
+        self.assertEqual(index.suggest('ELEC')[0]['text'], 'Électronique')
+
+    def test_memory_is_bounded(self):
+        """Test that the least popular terms are evicted past max_terms"""
+        index = autocomplete.PrefixIndex(max_terms=10)
+        for i in range(20):
+            index.add(autocomplete.KIND_TAG, f'tag{i}', i + 1)
+        self.assertLessEqual(len(index), 11)
+        self.assertEqual(index.suggest('tag19')[0]['text'], 'tag19')
+        self.assertEqual(index.suggest('tag0'), [])
+
+    def test_snapshot_round_trip(self):
+        """Test that a snapshot reloads the same terms and weights"""
+        index = autocomplete.PrefixIndex()
+        index.add(autocomplete.KIND_LISTING, 'Calculus Textbook', 4)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = autocomplete.write_snapshot(index, os.path.join(tmp, 'snap.gz'))
+            loaded = autocomplete.read_snapshot(path)
+        self.assertEqual(loaded.suggest('calc'), index.suggest('calc'))
+
+
+class AutocompleteEndpointTests(TestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.client = APIClient()
+        self.url = reverse('autocomplete')
+        self.user = User.objects.create_user(
+            email='seller@example.com',
+            password='Test@123',
+            full_name='Seller',
+            role='merchant',
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        MerchantProduct.objects.create(
+            owner=self.user, name='Laptop Stand', photo='merchant_products/a.jpg',
+            category=self.category, description='...', tags='laptop, desk', price='10.00',
+        )
+
+    def tearDown(self):
+        autocomplete.reset()
+
+    def test_builds_from_database(self):
+        """Test that the first request builds the index from existing rows"""
+        response = self.client.get(self.url, {'prefix': 'lap'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        texts = [r['text'] for r in response.data['results']]
+        self.assertIn('Laptop Stand', texts)
+        self.assertIn('laptop', texts)
+
+    def test_updates_from_save_signals(self):
+        """Test that saves, renames and deletes update a built index"""
+        self.client.get(self.url, {'prefix': 'x'})
+        product = StudentProduct.objects.create(
+            owner=self.user, name='Graphing Calculator', photo='student_products/b.jpg',
+            condition='used', description='...', price='20.00',
+        )
+        response = self.client.get(self.url, {'prefix': 'calc'})
+        self.assertEqual(response.data['results'][0]['text'], 'Graphing Calculator')
+
+        product.name = 'Scientific Calculator'
+        product.save()
+        texts = [r['text'] for r in self.client.get(self.url, {'prefix': 'graph'}).data['results']]
+        self.assertNotIn('Graphing Calculator', texts)
+
+        product.delete()
+        self.assertEqual(self.client.get(self.url, {'prefix': 'scien'}).data['results'], [])
+
+    def test_expired_listings_leave_other_workers_indexes(self):
+        """Test that an archive run makes an index built before it drop expired listings"""
+        self.client.get(self.url, {'prefix': 'lap'})
+        stale_index, stale_version = autocomplete._index, autocomplete._index_version
+        MerchantProduct.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        call_command('archive_listings', stdout=open(os.devnull, 'w'))
+
+        # Another worker still holding the index it built before the run
+        with self.settings(AUTOCOMPLETE_CHECK_INTERVAL=0), \
+                mock.patch.object(autocomplete, '_index', stale_index), \
+                mock.patch.object(autocomplete, '_index_version', stale_version):
+            texts = [r['text'] for r in self.client.get(self.url, {'prefix': 'lap'}).data['results']]
+        self.assertNotIn('Laptop Stand', texts)
+        self.assertNotIn('laptop', texts)
+
+    def test_category_names_are_suggested(self):
+        """Test that category names appear in suggestions"""
+        response = self.client.get(self.url, {'prefix': 'elec'})
+        self.assertEqual(response.data['results'][0]['type'], autocomplete.KIND_CATEGORY)
+
+
+class CategoryRegistryTests(TestCase):
+    def setUp(self):
+        category_registry.invalidate()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='seller@example.com',
+            password='Test@123',
+            full_name='Seller',
+            role='merchant',
+        )
+        self.books = Category.objects.create(name='Books', slug='books')
+        self.electronics = Category.objects.create(name='Electronics', slug='electronics')
+        for i, category in enumerate([self.books, self.electronics, None]):
+            MerchantProduct.objects.create(
+                owner=self.user, name=f'Item {i}', photo='merchant_products/a.jpg',
+                category=category, description='...', price='10.00',
+            )
+
+    def test_categories_served_from_memory(self):
+        """Test that a warm registry answers /categories/ without queries"""
+        url = reverse('category-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual([c['slug'] for c in response.data['results']], ['books', 'electronics'])
+
+    def test_product_list_does_not_load_categories(self):
+        """Test that nested categories add no queries to product lists"""
+        category_registry.all()
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse('merchantproduct-list'))
+        categories = [row['category'] for row in response.data['results']]
+        self.assertEqual(categories[0], {'id': self.books.id, 'name': 'Books', 'slug': 'books', 'description': None})
+        self.assertIsNone(categories[2])
+
+    def test_cache_outage_falls_back_to_database(self):
+        """Test that categories are still served (and updated) when the shared cache is down"""
+        category_registry.all()
+        broken = {name: mock.patch(f'products.category_cache.cache.{name}', side_effect=ConnectionError)
+                  for name in ('get', 'add', 'set')}
+        for patcher in broken.values():
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with self.settings(RATELIMIT_ENABLED=False, CATEGORY_CACHE_CHECK_INTERVAL=0):
+            response = self.client.get(reverse('category-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.books.name = 'Textbooks'
+            self.books.save()
+            self.assertEqual(self.client.get(reverse('category-list')).data['results'][0]['name'], 'Textbooks')
+
+    def test_registry_invalidated_on_save_and_delete(self):
+        """Test that category changes are visible immediately"""
+        category_registry.all()
+        self.books.name = 'Textbooks'
+        self.books.save()
+        self.assertEqual(category_registry.get(self.books.id)['name'], 'Textbooks')
+        self.electronics.delete()
+        self.assertIsNone(category_registry.get(self.electronics.id))
+
+
+class SavedSearchMatchingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.university = University.objects.create(name="Addis Ababa University")
+        self.seller = User.objects.create_user(
+            email='seller@example.com', password='Test@123', full_name='Seller',
+            role='student', university=self.university,
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com', password='Test@123', full_name='Buyer', role='student',
+        )
+        self.electronics = Category.objects.create(name='Electronics', slug='electronics')
+
+    def create_student_product(self, name, price, **kwargs):
+        return StudentProduct.objects.create(
+            owner=self.seller, name=name, photo='student_products/a.jpg', condition=kwargs.pop('condition', 'used'),
+            description=kwargs.pop('description', '...'), price=price, **kwargs,
+        )
+
+    def test_create_saved_search(self):
+        """Test creating a saved search through the API"""
+        self.client.force_authenticate(user=self.buyer)
+        url = reverse('savedsearch-list')
+        response = self.client.post(url, {'query': 'laptop', 'max_price': '300', 'university': self.university.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_new_listings_are_queued(self):
+        """Test that creating a listing queues it for matching"""
+        product = self.create_student_product('Laptop', '100.00')
+        self.assertTrue(PendingListingMatch.objects.filter(listing_type='student-product', object_id=product.id).exists())
+
+    def test_matching_and_coalesced_notification(self):
+        """Test that matches are found by terms and filters and emailed once per user"""
+        SavedSearch.objects.create(user=self.buyer, query='used laptops', max_price='300', university=self.university)
+        SavedSearch.objects.create(user=self.buyer, category=self.electronics, listing_type='student-product')
+        SavedSearch.objects.create(user=self.buyer, query='bicycle')
+        SavedSearch.objects.create(user=self.seller, query='laptop')  # own listings never match
+
+        cheap = self.create_student_product('Dell Laptop', '250.00', category=self.electronics)
+        self.create_student_product('Gaming Laptop', '900.00')
+        TutorService.objects.create(owner=self.seller, banner_photo='tutor_services/a.jpg', category=self.electronics,
+                                    description='Laptop repair lessons', price='10.00')
+
+        call_command('match_saved_searches', stdout=open(os.devnull, 'w'))
+
+        matched = SavedSearchMatch.objects.values_list('saved_search__query', 'object_id')
+        self.assertEqual(sorted(matched), [('', cheap.id), ('used laptops', cheap.id)])
+        self.assertFalse(PendingListingMatch.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+        # Matched by two of the buyer's searches, listed once
+        self.assertEqual(mail.outbox[0].body.count('Dell Laptop'), 1)
+        self.assertFalse(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+
+    def test_failed_notifications_retried_without_new_listings(self):
+        """Test that unsent matches are emailed on the next run even if nothing new was listed"""
+        SavedSearch.objects.create(user=self.buyer, query='laptop')
+        self.create_student_product('Dell Laptop', '250.00')
+        with mock.patch('products.saved_search.EmailMessage.send', side_effect=ConnectionError):
+            call_command('match_saved_searches', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+
+        call_command('match_saved_searches', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+
+    def test_search_deleted_after_index_load(self):
+        """Test that matching skips searches deleted since the index was loaded"""
+        kept = SavedSearch.objects.create(user=self.buyer, query='laptop')
+        deleted = SavedSearch.objects.create(user=self.buyer, query='dell')
+        index = load_index()
+        deleted.delete()
+        product = self.create_student_product('Dell Laptop', '250.00')
+
+        self.assertEqual(match_pending(index), 1)
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('saved_search_id', 'object_id')), [(kept.id, product.id)])
+        self.assertFalse(PendingListingMatch.objects.exists())
+
+
+class ListingLifecycleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='seller@example.com', password='Test@123', full_name='Seller', role='student',
+        )
+        self.live = self.create_product('Desk Lamp')
+        self.sold = self.create_product('Old Bike', status=Listing.STATUS_SOLD)
+        self.hidden = self.create_product('Hidden Item', is_visible=False)
+
+    def create_product(self, name, **kwargs):
+        return StudentProduct.objects.create(
+            owner=self.user, name=name, photo='student_products/a.jpg', condition='used',
+            description='...', price='5.00', **kwargs,
+        )
+
+    def test_list_only_returns_live_listings(self):
+        """Test that sold and hidden listings are excluded from browsing"""
+        response = self.client.get(reverse('studentproduct-list'))
+        self.assertEqual([row['name'] for row in response.data['results']], ['Desk Lamp'])
+        response = self.client.get(reverse('studentproduct-detail', args=[self.sold.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_past_expiry_hidden_before_archive_run(self):
+        """Test that a listing past its expiry leaves browsing even while still marked active"""
+        StudentProduct.objects.filter(id=self.live.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(reverse('studentproduct-list'))
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('studentproduct-detail', args=[self.live.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_owner_can_mark_sold(self):
+        """Test that owners can still update a listing after it is sold"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('studentproduct-detail', args=[self.live.id])
+        response = self.client.patch(url, {'status': 'sold'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(url, {'price': '4.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.live.refresh_from_db()
+        self.assertLessEqual(self.live.expires_at, timezone.now())
+
+    def test_reactivated_listing_is_renewed(self):
+        """Test that setting a sold or expired listing back to active gives it a new lifetime"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(reverse('studentproduct-detail', args=[self.sold.id]), {'status': 'active'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.sold.refresh_from_db()
+        self.assertGreater(self.sold.expires_at, timezone.now() + timedelta(days=settings.LISTING_LIFETIME_DAYS - 1))
+
+        call_command('archive_listings', stdout=open(os.devnull, 'w'))
+        self.sold.refresh_from_db()
+        self.assertEqual(self.sold.status, Listing.STATUS_ACTIVE)
+
+    def test_archive_listings(self):
+        """Test that stale listings expire and old sold/expired rows move to the archive"""
+        StudentProduct.objects.filter(id=self.live.id).update(expires_at=timezone.now() - timedelta(days=1))
+        StudentProduct.objects.filter(id=self.sold.id).update(expires_at=timezone.now() - timedelta(days=30))
+        content_type = ContentType.objects.get_for_model(StudentProduct)
+        for product in (self.live, self.sold):
+            Review.objects.create(content_type=content_type, object_id=product.id, rating=4, comment='ok', reviewer=self.user)
+            SavedSearchMatch.objects.create(
+                saved_search=SavedSearch.objects.create(user=self.user, query='bike'),
+                listing_type='student-product', object_id=product.id,
+            )
+
+        call_command('archive_listings', '--batch-size', '1', stdout=open(os.devnull, 'w'))
+
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.status, Listing.STATUS_EXPIRED)  # still within the grace period
+        self.assertFalse(StudentProduct.objects.filter(id=self.sold.id).exists())
+        archived = ArchivedListing.objects.get(listing_type='student-product', original_id=self.sold.id)
+        self.assertEqual(archived.data['name'], 'Old Bike')
+        self.assertEqual(archived.owner, self.user)
+        # Dependents of the archived row go with it; the expired one keeps its own
+        self.assertEqual(list(Review.objects.values_list('object_id', flat=True)), [self.live.id])
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('object_id', flat=True)), [self.live.id])
+
+
+class MyListingsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('my-listings')
+        self.user = User.objects.create_user(
+            email='seller@example.com', password='Test@123', full_name='Seller', role='merchant',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com', password='Test@123', full_name='Other', role='student',
+        )
+        self.books = Category.objects.create(name='Books', slug='books')
+        self.client.force_authenticate(user=self.user)
+        ContentType.objects.clear_cache()
+
+    def create_listings(self, count):
+        for i in range(count):
+            MerchantProduct.objects.create(
+                owner=self.user, name=f'Book {i}', photo='merchant_products/a.jpg', category=self.books,
+                description='...', price='3.00', status=Listing.STATUS_SOLD if i == 0 else Listing.STATUS_ACTIVE,
+            )
+        TutorService.objects.create(owner=self.user, banner_photo='tutor_services/a.jpg', description='Maths', price='8.00')
+        StudentProduct.objects.create(
+            owner=self.other, name='Not mine', photo='student_products/a.jpg', condition='new',
+            description='...', price='1.00',
+        )
+
+    def test_dashboard_counts_and_reviews(self):
+        """Test that the dashboard returns only the caller's listings with aggregates"""
+        self.create_listings(3)
+        product = MerchantProduct.objects.filter(owner=self.user).first()
+        content_type = ContentType.objects.get_for_model(MerchantProduct)
+        Review.objects.create(content_type=content_type, object_id=product.id, rating=4, comment='ok', reviewer=self.other)
+        Review.objects.create(content_type=content_type, object_id=product.id, rating=5, comment='good', reviewer=self.other)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = response.data['counts']
+        self.assertEqual(counts['total'], 4)
+        self.assertEqual(counts['by_type'], {'merchant-product': 3, 'student-product': 0, 'tutor-service': 1})
+        self.assertEqual(counts['by_status'], {'active': 3, 'sold': 1})
+        self.assertEqual(counts['by_category'][0], {'category_id': self.books.id, 'name': 'Books', 'count': 3})
+        self.assertEqual(response.data['reviews'], {'count': 2, 'average_rating': 4.5})
+        reviewed = next(row for row in response.data['merchant_products'] if row['id'] == product.id)
+        self.assertEqual((reviewed['review_count'], reviewed['average_rating']), (2, 4.5))
+
+    def test_query_count_is_fixed(self):
+        """Test that the number of queries does not grow with the number of listings"""
+        self.create_listings(2)
+        self.client.get(self.url)  # warm content type and category caches
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        self.create_listings(10)
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+
+class ReviewPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tutor = User.objects.create_user(
+            email='tutor@example.com', password='Test@123', full_name='Tutor', role='tutor',
+        )
+        self.service = TutorService.objects.create(
+            owner=self.tutor, banner_photo='tutor_services/a.jpg', description='Physics', price='8.00',
+        )
+        self.content_type = ContentType.objects.get_for_model(TutorService)
+        for i in range(25):
+            reviewer = User.objects.create(email=f'student{i}@example.com', full_name=f'Student {i}', role='student')
+            Review.objects.create(
+                content_type=self.content_type, object_id=self.service.id,
+                rating=i % 5 + 1, comment='...', reviewer=reviewer,
+            )
+        self.url = reverse('review-detail', args=[self.service.id])
+
+    def test_retrieve_is_paginated(self):
+        """Test that reviews of one object come back in cursor pages, newest first"""
+        response = self.client.get(self.url, {'content_type': self.content_type.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['reviewer_name'], 'Student 24')
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 5)
+        self.assertIsNone(next_page.data['next'])
+
+    def test_ordering(self):
+        """Test highest and lowest rating orderings"""
+        params = {'content_type': self.content_type.id, 'object_id': self.service.id, 'page_size': 5}
+        highest = self.client.get(reverse('review-list'), {**params, 'ordering': 'highest'}).data['results']
+        lowest = self.client.get(reverse('review-list'), {**params, 'ordering': 'lowest'}).data['results']
+        self.assertEqual([r['rating'] for r in highest], [5] * 5)
+        self.assertEqual([r['rating'] for r in lowest], [1] * 5)
+
+    def test_rating_pages_use_keyset(self):
+        """Test that rating orderings page by (rating, id) without offsets, both ways"""
+        params = {'content_type': self.content_type.id, 'object_id': self.service.id, 'page_size': 3}
+        expected = list(Review.objects.order_by('-rating', '-id').values_list('id', flat=True))
+        seen = []
+        response = self.client.get(reverse('review-list'), {**params, 'ordering': 'highest'})
+        while True:
+            seen += [r['id'] for r in response.data['results']]
+            if not response.data['next']:
+                break
+            cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+            self.assertNotIn('o=', b64decode(cursor).decode())
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(response.data['previous']).data['results']
+        self.assertEqual([r['id'] for r in previous], expected[-4:-1])
+
+    def test_malformed_cursor_is_not_found(self):
+        """Test that a cursor with a non-numeric or short position is rejected with 404"""
+        params = {'content_type': self.content_type.id, 'object_id': self.service.id, 'ordering': 'highest'}
+        for position in ('abc,1', '4', '4,1,9'):
+            cursor = b64encode(f'p={position}'.encode()).decode()
+            response = self.client.get(reverse('review-list'), {**params, 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_own_review(self):
+        """Test that a reviewer can still edit a review"""
+        review = Review.objects.order_by('id').first()
+        self.client.force_authenticate(user=review.reviewer)
+        response = self.client.patch(reverse('review-detail', args=[review.id]), {'comment': 'Updated'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        review.refresh_from_db()
+        self.assertEqual(review.comment, 'Updated')
+
+    def test_reviewer_names_loaded_in_one_query(self):
+        """Test that reviewer names do not cost a query per review"""
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'content_type': self.content_type.id})
+
+
+class ReviewTargetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create(email='seller@example.com', full_name='Seller', role='merchant')
+        self.reviewer = User.objects.create(email='reviewer@example.com', full_name='Reviewer', role='student')
+        self.listings = []
+        for i in range(3):
+            self.listings.append(MerchantProduct.objects.create(
+                owner=self.seller, name=f'Lamp {i}', photo=f'merchant_products/lamp{i}.jpg',
+                description='...', price='12.50',
+            ))
+            self.listings.append(TutorService.objects.create(
+                owner=self.seller, banner_photo='tutor_services/a.jpg', description=f'Chemistry {i}', price='9.00',
+            ))
+        for listing in self.listings:
+            Review.objects.create(
+                content_type=ContentType.objects.get_for_model(listing), object_id=listing.id,
+                rating=4, comment='...', reviewer=self.reviewer,
+            )
+        self.url = reverse('review-list')
+
+    def test_expand_target(self):
+        """Test that review targets are embedded with one query per content type"""
+        self.client.get(self.url)  # warm the content type cache
+        with self.assertNumQueries(3):  # reviews + merchant products + tutor services
+            response = self.client.get(self.url, {'expand': 'target'})
+        lamp = next(r for r in response.data['results'] if r['target_type'] == 'merchant-product')
+        self.assertEqual(lamp['target']['name'][:4], 'Lamp')
+        self.assertEqual(lamp['target']['price'], '12.50')
+        self.assertTrue(lamp['target']['thumbnail'].startswith('http://testserver/media/merchant_products/'))
+        self.assertNotIn('target', self.client.get(self.url).data['results'][0])
+
+    def test_filter_by_type_key(self):
+        """Test filtering reviews with a stable type key instead of a content type id"""
+        response = self.client.get(self.url, {'type': 'tutor-service'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual({r['target_type'] for r in response.data['results']}, {'tutor-service'})
+        response = self.client.get(self.url, {'type': 'spaceship'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GcMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.chunk_dir = tempfile.mkdtemp()
+        for directory in (self.media_root, self.chunk_dir):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_DIR=self.chunk_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            email='gc@example.com', password='Test@123', full_name='GC', role='student',
+        )
+        StudentProduct.objects.create(
+            owner=self.user, name='Lamp', photo='student_products/live.jpg', condition='used',
+            description='...', price='5.00',
+        )
+        ArchivedListing.objects.create(
+            listing_type='student-product', original_id=99, owner=self.user, status=Listing.STATUS_SOLD,
+            data={'name': 'Bike', 'photo': 'student_products/archived.jpg'},
+        )
+        old = time.time() - 48 * 3600
+        for name in ('student_products/live.jpg', 'student_products/archived.jpg',
+                     'student_products/orphan.jpg', 'merchant_products/nested/orphan.png', 'stray.txt'):
+            self.write(os.path.join(self.media_root, name), b'x' * 100, old)
+        self.write(os.path.join(self.media_root, 'student_products/fresh.jpg'), b'x' * 100)
+        self.write(os.path.join(self.chunk_dir, '8d5e6a8c-2b1f-4d3e-9c7a-1b2c3d4e5f60.part'), b'x' * 10, old)
+
+    def write(self, path, content, mtime=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(content)
+        if mtime:
+            os.utime(path, (mtime, mtime))
+
+    def remaining(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root).replace(os.sep, '/')
+            for directory, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_dry_run_reports_without_deleting(self):
+        """Test that a dry run only reports reclaimable bytes"""
+        before = self.remaining()
+        out = StringIO()
+        call_command('gc_media', '--dry-run', stdout=out)
+        self.assertIn('3 unreferenced media files', out.getvalue())
+        self.assertIn('(300 bytes) reclaimable', out.getvalue())
+        self.assertIn('1 abandoned upload chunks', out.getvalue())
+        self.assertEqual(self.remaining(), before)
+
+    def test_deletes_old_unreferenced_files(self):
+        """Test that referenced, archived and recent files survive collection"""
+        call_command('gc_media', '--workers', '2', stdout=StringIO())
+        self.assertEqual(self.remaining(), [
+            'student_products/archived.jpg', 'student_products/fresh.jpg', 'student_products/live.jpg',
+        ])
+        self.assertEqual(os.listdir(self.chunk_dir), [])
+
+    def test_expires_abandoned_uploads(self):
+        """Test that uploads idle past the expiry lose their row and partial file"""
+        abandoned = ChunkedUpload.objects.create(user=self.user, target='edu_docs', filename='a.pdf', size=100, sha256='0' * 64)
+        resumed = ChunkedUpload.objects.create(user=self.user, target='edu_docs', filename='b.pdf', size=100, sha256='0' * 64)
+        ChunkedUpload.objects.filter(id=abandoned.id).update(updated_at=timezone.now() - timedelta(days=4))
+        for upload in (abandoned, resumed):
+            self.write(os.path.join(self.chunk_dir, f'{upload.id}.part'), b'x' * 10)
+
+        out = StringIO()
+        call_command('gc_media', '--upload-expiry-hours', '72', stdout=out)
+        self.assertIn('1 expired uploads, 2 abandoned upload chunks', out.getvalue())
+        self.assertEqual(list(ChunkedUpload.objects.values_list('id', flat=True)), [resumed.id])
+        self.assertEqual(os.listdir(self.chunk_dir), [f'{resumed.id}.part'])
+
+    def test_upload_resumed_during_expiry_keeps_chunks(self):
+        """Test that an upload resumed between the scan and the delete keeps its row and partial file"""
+        upload = ChunkedUpload.objects.create(user=self.user, target='edu_docs', filename='a.pdf', size=100, sha256='0' * 64)
+        ChunkedUpload.objects.filter(id=upload.id).update(updated_at=timezone.now() - timedelta(days=4))
+        self.write(os.path.join(self.chunk_dir, f'{upload.id}.part'), b'x' * 10)
+        delete = QuerySet.delete
+
+        def resume_then_delete(queryset):
+            ChunkedUpload.objects.filter(id=upload.id).update(updated_at=timezone.now())
+            return delete(queryset)
+
+        out = StringIO()
+        with mock.patch.object(QuerySet, 'delete', resume_then_delete):
+            call_command('gc_media', '--upload-expiry-hours', '72', stdout=out)
+        self.assertIn('0 expired uploads', out.getvalue())
+        self.assertTrue(ChunkedUpload.objects.filter(id=upload.id).exists())
+        self.assertEqual(os.listdir(self.chunk_dir), [f'{upload.id}.part'])
+
+    def test_quarantine(self):
+        """Test that quarantined files are moved with their relative paths"""
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+        call_command('gc_media', '--quarantine', quarantine, stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(quarantine, 'merchant_products/nested/orphan.png')))
+        self.assertNotIn('student_products/orphan.jpg', self.remaining())
+
+
+class ReplicaRoutingTests(TestCase):
+    """Primary is the test database; the replica is a separate (empty) SQLite file."""
+    replica = 'replica_test'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings[cls.replica] = dict(
+            connections.settings['default'], NAME=os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        )
+        call_command('migrate', database=cls.replica, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.replica].close()
+        del connections[cls.replica]
+        del connections.settings[cls.replica]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        override = self.settings(DATABASE_REPLICAS=[self.replica], RATELIMIT_ENABLED=False)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='replica@example.com', password='Test@123', full_name='Replica', role='student',
+        )
+        self.product = StudentProduct.objects.create(
+            owner=self.user, name='Desk Lamp', photo='student_products/a.jpg', condition='used',
+            description='...', price='5.00',
+        )
+        self.list_url = reverse('studentproduct-list')
+
+    def test_catalog_reads_use_replica(self):
+        """Test that anonymous catalog reads are served by the replica"""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)  # the row exists only on the primary
+
+    def test_auth_and_writes_use_primary_with_stickiness(self):
+        """Test that authentication and writes hit the primary, and the writer then reads from it"""
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # user loaded from the primary
+        self.assertEqual(response.data['count'], 0)
+
+        url = reverse('studentproduct-detail', args=[self.product.id])
+        response = self.client.patch(url, {'price': '4.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.list_url).data['count'], 1)
+
+        cache.delete(sticky_key(self.user.id))
+        self.assertEqual(self.client.get(self.list_url).data['count'], 0)
+
+    def test_process_caches_load_from_primary(self):
+        """Test that the category registry and university index are never built from a replica"""
+        Category.objects.create(name='Books', slug='books')
+        University.objects.create(name='Addis Ababa University')
+        category_registry.invalidate()
+        university_index.invalidate()
+        response = self.client.get(reverse('category-list'))
+        self.assertEqual([row['name'] for row in response.data['results']], ['Books'])
+        token = _replica.set(self.replica)  # as during a replica-routed request
+        try:
+            matches = university_index.search_universities('addis')
+        finally:
+            _replica.reset(token)
+        self.assertEqual(len(matches), 1)
+
+    def test_autocomplete_index_builds_from_primary(self):
+        """Test that the autocomplete index is built from the primary during a replica-routed request"""
+        autocomplete.reset()
+        self.addCleanup(autocomplete.reset)
+        token = _replica.set(self.replica)
+        try:
+            texts = [row['text'] for row in autocomplete.suggest('desk')]
+        finally:
+            _replica.reset(token)
+        self.assertIn('Desk Lamp', texts)
+
+
+class AsyncReadPathTests(TestCase):
+    """The async views of unibazzar/urls_async.py against the DRF views they replace."""
+
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate()
+        override = self.settings(RATELIMIT_ENABLED=False)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@example.com', password='Test@123', full_name='Seller', role='merchant',
+        )
+        self.books = Category.objects.create(name='Books', slug='books')
+        for i in range(12):
+            MerchantProduct.objects.create(
+                owner=self.seller, name=f'Book {i}', photo='merchant_products/a.jpg',
+                category=self.books if i % 2 else None, description='...', price='3.00',
+            )
+        self.product = MerchantProduct.objects.order_by('id').first()
+        content_type = ContentType.objects.get_for_model(MerchantProduct)
+        for rating in (5, 4, 5):
+            Review.objects.create(
+                content_type=content_type, object_id=self.product.id, rating=rating, comment='...', reviewer=self.seller,
+            )
+
+    def async_request(self, method, path, data=None):
+        async def request():
+            return await getattr(self.async_client, method)(path, data)
+
+        with self.settings(ROOT_URLCONF='unibazzar.urls_async'):
+            return async_to_sync(request)()
+
+    def async_get(self, path, data=None):
+        return self.async_request('get', path, data)
+
+    def assertSameResponse(self, path, data=None):
+        expected = self.client.get(path, data)
+        response = self.async_get(path, data)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    def test_listing_pages_match_sync(self):
+        """Test that async listing pages equal the DRF ones, links included"""
+        url = reverse('merchantproduct-list')
+        first = self.assertSameResponse(url).json()
+        self.assertEqual((first['count'], len(first['results'])), (12, 10))
+        self.assertEqual(first['results'][1]['category']['slug'], 'books')
+        self.assertEqual(len(self.assertSameResponse(url, {'page': 2}).json()['results']), 2)
+        self.assertEqual(self.async_get(url, {'page': 3}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_listing_detail_matches_sync(self):
+        """Test async listing detail, including hidden and missing listings"""
+        self.assertSameResponse(reverse('merchantproduct-detail', args=[self.product.id]))
+        self.product.status = Listing.STATUS_SOLD
+        self.product.save()
+        response = self.async_get(reverse('merchantproduct-detail', args=[self.product.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_categories_match_sync(self):
+        """Test async category list and detail"""
+        self.assertSameResponse(reverse('category-list'))
+        self.assertSameResponse(reverse('category-detail', args=[self.books.id]))
+        self.assertEqual(self.async_get(reverse('category-detail', args=[0])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_review_summary(self):
+        """Test the review summary on both paths, by type key and by content type id"""
+        url = reverse('review-summary')
+        response = self.assertSameResponse(url, {'type': 'merchant-product', 'object_id': self.product.id})
+        self.assertEqual(response.json(), {'count': 3, 'average_rating': 4.67, 'distribution': {'4': 1, '5': 2}})
+        content_type = ContentType.objects.get_for_model(MerchantProduct)
+        self.assertSameResponse(url, {'content_type': content_type.id, 'object_id': self.product.id})
+        self.assertEqual(self.async_get(url, {'type': 'merchant-product'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'type': 'merchant-product'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.async_get(url, {'type': 'spaceship', 'object_id': 1}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_use_drf_views(self):
+        """Test that non-GET requests on async routes still go through DRF"""
+        response = self.async_get(reverse('merchantproduct-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.async_request('post', reverse('merchantproduct-list'), {'name': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_middleware_cache_calls_leave_event_loop(self):
+        """Test that rate limit and replica stickiness cache reads run in worker threads under ASGI"""
+        on_event_loop = []
+
+        def record(result):
+            def call(*args, **kwargs):
+                on_event_loop.append(in_event_loop())
+                return result
+            return call
+
+        token = RefreshToken.for_user(self.seller).access_token
+
+        async def request():
+            return await self.async_client.get(reverse('merchantproduct-list'), headers={'authorization': f'Bearer {token}'})
+
+        with self.settings(MIDDLEWARE=async_middleware(settings.MIDDLEWARE), DATABASE_REPLICAS=['default'],
+                           RATELIMIT_ENABLED=True), \
+                mock.patch('unibazzar.middleware.shared_hit', side_effect=record(0)), \
+                mock.patch('unibazzar.replicas.ReplicaMiddleware.is_sticky', side_effect=record(False)):
+            response = async_to_sync(request)()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(on_event_loop)
+        self.assertNotIn(True, on_event_loop)
+
+    def test_async_middleware_chain(self):
+        """Test that the ASGI middleware chain has no sync-only middleware"""
+        for path in async_middleware(settings.MIDDLEWARE):
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
 
-# Create your tests here.
+class AsgiBenchmarkTests(TestCase):
+    def test_benchmark_runs_both_handlers(self):
+        """Test that the ASGI benchmark reports both handlers without errors"""
+        out = StringIO()
+        call_command('benchmark_asgi', requests=8, concurrency=4, threads=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].strip().startswith('wsgi (2 threads)'))
+        self.assertTrue(lines[2].strip().startswith('asgi'))
+        self.assertTrue(all(line.endswith(', 0 errors') for line in lines[1:]))
@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     MerchantProductViewSet,
@@ -5,6 +6,9 @@ from .views import (
     TutorServiceViewSet,
     ReviewViewSet,
     CategoryViewSet,
+    AutocompleteView,
+    SavedSearchViewSet,
+    MyListingsView,
 )
 
 router = DefaultRouter()
@@ -13,5 +17,11 @@ router.register(r'student-products', StudentProductViewSet, basename='studentpro
 router.register(r'tutor-services', TutorServiceViewSet, basename='tutorservice')
 router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'categories', CategoryViewSet, basename='category')
+router.register(r'saved-searches', SavedSearchViewSet, basename='savedsearch')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('mine/', MyListingsView.as_view(), name='my-listings'),
+]
+
+urlpatterns += router.urls
@@ -1,12 +1,27 @@
+from collections import Counter
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Avg, Count, Q
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
-from .models import MerchantProduct, StudentProduct, TutorService, Review, Category
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import autocomplete
+from .category_cache import registry as category_registry
+from .models import (
+    MerchantProduct, StudentProduct, TutorService, Review, Category, SavedSearch, LISTING_MODELS,
+    content_type_for_listing_type,
+)
 from .serializers import (
     MerchantProductSerializer,
     StudentProductSerializer,
     TutorServiceSerializer,
     ReviewSerializer,
     CategorySerializer,
+    SavedSearchSerializer,
+    SavedSearchMatchSerializer,
 )
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -23,7 +38,10 @@ class MerchantProductViewSet(viewsets.ModelViewSet):
         return []
 
     def get_queryset(self):
-        return MerchantProduct.objects.all().order_by('id')
+        # Owners can still edit or delete their sold/hidden listings
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return MerchantProduct.objects.all().order_by('id')
+        return MerchantProduct.objects.live().order_by('id')
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -38,11 +56,12 @@ class StudentProductViewSet(viewsets.ModelViewSet):
         return []
 
     def get_queryset(self):
-        queryset = StudentProduct.objects.all().order_by('id')
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return StudentProduct.objects.all().order_by('id')
+        queryset = StudentProduct.objects.live().order_by('id')
         category_id = self.request.query_params.get('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
-        queryset = queryset.filter(id__gte=231)
         return queryset
 
     def perform_create(self, serializer):
@@ -58,48 +77,175 @@ class TutorServiceViewSet(viewsets.ModelViewSet):
         return []
 
     def get_queryset(self):
-        queryset = TutorService.objects.all().order_by('id')
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return TutorService.objects.all().order_by('id')
+        queryset = TutorService.objects.live().order_by('id')
         category_id = self.request.query_params.get('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
-        queryset = queryset.filter(id__gte=210)
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+class ReviewCursorPagination(CursorPagination):
+    """
+    Cursor pagination for reviews with ?ordering=newest|highest|lowest.
+    Every ordering ends on id so it is stable and served by the
+    (content_type, object_id, ...) indexes on Review. DRF's cursor only
+    positions on the first field and offsets past ties, which scans every
+    review sharing a rating; here the cursor is a (rating, id) keyset.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    orderings = {
+        'newest': ('-id',),
+        'highest': ('-rating', '-id'),
+        'lowest': ('rating', 'id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(request.query_params.get('ordering'), self.orderings['newest'])
+
+    def _get_position_from_instance(self, instance, ordering):
+        # The position holds every ordering field, e.g. "4,1093", so it is unique
+        # and pages never need DRF's offset over rows sharing a rating
+        return ','.join(str(getattr(instance, field.lstrip('-'))) for field in ordering)
+
+    def keyset_filter(self, ordering, position):
+        """Rows after ``position`` in ``ordering``: (rating, id) < (4, 1093) for -rating, -id."""
+        # Every ordering field (rating, id) is an integer; anything else is a tampered cursor
+        try:
+            values = [int(value) for value in position.split(',')]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        query = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            query |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+            equal[name] = value
+        # Bound the leading column too so the index range scan starts at the cursor
+        leading = ordering[0]
+        return Q(**{f"{leading.lstrip('-')}__{'lte' if leading.startswith('-') else 'gte'}": values[0]}) & query
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None if self.cursor is None else self.cursor.position
+
+        ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = (
+            self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        )
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+def summarize_ratings(rows):
+    """Summary payload from ``{'rating', 'count'}`` rows grouped by rating."""
+    rows = list(rows)
+    count = sum(row['count'] for row in rows)
+    total = sum(row['rating'] * row['count'] for row in rows)
+    return {
+        'count': count,
+        'average_rating': round(total / count, 2) if count else None,
+        'distribution': {str(row['rating']): row['count'] for row in rows},
+    }
+
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = []  # Allow any user to read reviews
+    pagination_class = ReviewCursorPagination
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated()]
         return []
 
+    def get_content_type_param(self):
+        """
+        Content type from ?type=merchant-product (preferred) or ?content_type=,
+        which accepts the same string keys as well as raw ids.
+        """
+        value = self.request.query_params.get('type') or self.request.query_params.get('content_type')
+        if not value:
+            return None
+        if value.isdigit():
+            return int(value)
+        content_type = content_type_for_listing_type(value)
+        if content_type is None:
+            raise NotFound(f"Unknown review target type '{value}'.")
+        return content_type.id
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand_target'] = 'target' in self.request.query_params.get('expand', '').split(',')
+        return context
+
     def get_queryset(self):
         # Allow unauthenticated users to list/retrieve reviews
         if getattr(self, 'swagger_fake_view', False):
             return Review.objects.none()
-        queryset = Review.objects.all()
-        content_type = self.request.query_params.get('content_type')
+        # Reviewer names come from the same query
+        queryset = Review.objects.select_related('reviewer').only(
+            'id', 'content_type_id', 'object_id', 'rating', 'comment', 'reviewer__id', 'reviewer__full_name',
+        )
+        if self.action != 'list':
+            return queryset
+        content_type = self.get_content_type_param()
         object_id = self.request.query_params.get('object_id')
         if content_type and object_id:
             queryset = queryset.filter(content_type_id=content_type, object_id=object_id)
+        elif content_type:
+            queryset = queryset.filter(content_type_id=content_type)
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(reviewer=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Review count, average rating and rating distribution for one listing."""
+        content_type = self.get_content_type_param()
+        object_id = request.query_params.get('object_id', '')
+        if not content_type or not object_id.isdigit():
+            return Response({'detail': 'type (or content_type) and object_id query parameters are required.'}, status=400)
+        rows = (
+            Review.objects.filter(content_type_id=content_type, object_id=object_id)
+            .values('rating').annotate(count=Count('id')).order_by('rating')
+        )
+        return Response(summarize_ratings(rows))
+
     def retrieve(self, request, *args, **kwargs):
         # Treat pk as object_id (product id)
         object_id = kwargs.get('pk')
-        content_type = request.query_params.get('content_type')
+        content_type = self.get_content_type_param()
         if not content_type:
-            return Response({'detail': 'content_type query parameter is required.'}, status=400)
-        reviews = Review.objects.filter(content_type_id=content_type, object_id=object_id)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+            return Response({'detail': 'type or content_type query parameter is required.'}, status=400)
+        reviews = self.get_queryset().filter(content_type_id=content_type, object_id=object_id)
+        page = self.paginate_queryset(reviews)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('id')
@@ -110,3 +256,140 @@ class CategoryViewSet(viewsets.ModelViewSet):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated()]
         return []
+
+    def list(self, request, *args, **kwargs):
+        # Served from the process-level registry instead of the database
+        categories = category_registry.all()
+        page = self.paginate_queryset(categories)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(categories)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            category = category_registry.get(int(kwargs['pk']))
+        except (TypeError, ValueError):
+            category = None
+        if category is None:
+            raise NotFound()
+        return Response(category)
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    A user's saved searches. New listings are matched against them in the
+    background (see the match_saved_searches command) and matches are emailed.
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return SavedSearch.objects.none()
+        return SavedSearch.objects.filter(user=self.request.user).order_by('id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def matches(self, request, pk=None):
+        saved_search = self.get_object()
+        queryset = saved_search.matches.order_by('-id')
+        page = self.paginate_queryset(queryset)
+        serializer = SavedSearchMatchSerializer(page if page is not None else queryset, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+class MyListingsView(APIView):
+    """
+    Dashboard of the caller's own listings across all three types, in any
+    status, with per-type/category/status counts and review aggregates.
+    Uses one query per listing type plus one review aggregate, however
+    large the catalog is.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    listing_serializers = {
+        'merchant-product': ('merchant_products', MerchantProductSerializer),
+        'student-product': ('student_products', StudentProductSerializer),
+        'tutor-service': ('tutor_services', TutorServiceSerializer),
+    }
+
+    def get(self, request):
+        user = request.user
+        content_types = ContentType.objects.get_for_models(*LISTING_MODELS.values())
+
+        # One grouped query for the review stats of every owned listing
+        review_filter = Q()
+        for model in LISTING_MODELS.values():
+            review_filter |= Q(
+                content_type=content_types[model],
+                object_id__in=model.objects.filter(owner=user).values('id'),
+            )
+        review_stats = {
+            (row['content_type_id'], row['object_id']): row
+            for row in Review.objects.filter(review_filter)
+            .values('content_type_id', 'object_id')
+            .annotate(count=Count('id'), average=Avg('rating'))
+        }
+
+        data = {}
+        by_type, by_category, by_status = {}, Counter(), Counter()
+        review_count, rating_total = 0, 0
+        for listing_type, model in LISTING_MODELS.items():
+            key, serializer_class = self.listing_serializers[listing_type]
+            listings = list(model.objects.filter(owner=user).order_by('-id'))
+            rows = serializer_class(listings, many=True, context={'request': request}).data
+            content_type_id = content_types[model].id
+            for listing, row in zip(listings, rows):
+                stats = review_stats.get((content_type_id, listing.id))
+                row['review_count'] = stats['count'] if stats else 0
+                row['average_rating'] = round(stats['average'], 2) if stats else None
+                if stats:
+                    review_count += stats['count']
+                    rating_total += stats['average'] * stats['count']
+                by_category[listing.category_id] += 1
+                by_status[listing.status] += 1
+            by_type[listing_type] = len(listings)
+            data[key] = rows
+
+        return Response({
+            'counts': {
+                'total': sum(by_type.values()),
+                'by_type': by_type,
+                'by_status': dict(by_status),
+                'by_category': [
+                    {
+                        'category_id': category_id,
+                        'name': (category_registry.get(category_id) or {}).get('name'),
+                        'count': count,
+                    }
+                    for category_id, count in by_category.most_common()
+                ],
+            },
+            'reviews': {
+                'count': review_count,
+                'average_rating': round(rating_total / review_count, 2) if review_count else None,
+            },
+            **data,
+        })
+
+class AutocompleteView(APIView):
+    """
+    Typeahead suggestions for the search box.
+    Served from the in-memory prefix index, so no database query is made per keystroke.
+    """
+    permission_classes = []
+    authentication_classes = []
+    max_limit = 25
+
+    def get(self, request):
+        prefix = request.query_params.get('prefix', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        return Response({
+            'prefix': prefix,
+            'results': autocomplete.suggest(prefix, limit) if limit > 0 else [],
+        })
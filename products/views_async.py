@@ -0,0 +1,95 @@
+"""
+Async catalog reads, routed by ``unibazzar/urls_async.py`` when the project
+runs under ASGI (see ``unibazzar/async_read.py``). Each view mirrors the GET
+side of the DRF view in ``views.py`` it replaces.
+
+These endpoints are public, so the request is not authenticated.
+"""
+from django.db.models import Count
+from django.http import JsonResponse
+from unibazzar.async_read import fetch_queryset, not_found, paginate
+from .category_cache import registry as category_registry
+from .models import LISTING_MODELS, Review
+from .serializers import MerchantProductSerializer, StudentProductSerializer, TutorServiceSerializer
+from .views import summarize_ratings
+
+# listing type -> (serializer, supports ?category=)
+LISTING_READS = {
+    'merchant-product': (MerchantProductSerializer, False),
+    'student-product': (StudentProductSerializer, True),
+    'tutor-service': (TutorServiceSerializer, True),
+}
+
+
+def listing_list(listing_type):
+    model = LISTING_MODELS[listing_type]
+    serializer_class, category_filter = LISTING_READS[listing_type]
+
+    async def view(request):
+        queryset = model.objects.live().order_by('id')
+        category_id = request.GET.get('category')
+        if category_filter and category_id:
+            queryset = queryset.filter(category_id=category_id)
+
+        # Nested categories come from the registry; refresh it before serializing
+        await category_registry.arefresh()
+        count = await queryset.acount()
+        return await paginate(
+            request, count,
+            lambda offset, limit: fetch_queryset(queryset, offset, limit),
+            lambda rows: serializer_class(rows, many=True, context={'request': request}).data,
+        )
+    return view
+
+
+def listing_detail(listing_type):
+    model = LISTING_MODELS[listing_type]
+    serializer_class, _ = LISTING_READS[listing_type]
+
+    async def view(request, pk):
+        listing = await model.objects.live().filter(pk=pk).afirst()
+        if listing is None:
+            return not_found()
+        await category_registry.arefresh()
+        return JsonResponse(serializer_class(listing, context={'request': request}).data)
+    return view
+
+
+async def category_list(request):
+    await category_registry.arefresh()
+    categories = category_registry.all()
+
+    async def fetch(offset, limit):
+        return categories[offset:offset + limit]
+
+    return await paginate(request, len(categories), fetch, list)
+
+
+async def category_detail(request, pk):
+    await category_registry.arefresh()
+    category = category_registry.get(pk)
+    if category is None:
+        return not_found()
+    return JsonResponse(category)
+
+
+async def review_summary(request):
+    value = request.GET.get('type') or request.GET.get('content_type') or ''
+    object_id = request.GET.get('object_id', '')
+    if not value or not object_id.isdigit():
+        return JsonResponse(
+            {'detail': 'type (or content_type) and object_id query parameters are required.'}, status=400,
+        )
+
+    reviews = Review.objects.filter(object_id=object_id)
+    if value.isdigit():
+        reviews = reviews.filter(content_type_id=int(value))
+    elif value in LISTING_MODELS:
+        # Join on the content type instead of a separate (sync) ContentType lookup
+        opts = LISTING_MODELS[value]._meta
+        reviews = reviews.filter(content_type__app_label=opts.app_label, content_type__model=opts.model_name)
+    else:
+        return not_found(f"Unknown review target type '{value}'.")
+
+    rows = reviews.values('rating').annotate(count=Count('id')).order_by('rating')
+    return JsonResponse(summarize_ratings([row async for row in rows]))
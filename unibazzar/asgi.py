@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'unibazzar.settings')
+# Serve the hot catalog reads with async views (unibazzar/urls_async.py)
+os.environ.setdefault('ROOT_URLCONF', 'unibazzar.urls_async')
+# Each ASGI request runs its sync code (ORM included) in a thread of its own,
+# so a persistent connection would never be reused; pool with PgBouncer instead
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
-application = get_asgi_application() 
\ No newline at end of file
+django.setup(set_prefix=False)
+
+from unibazzar.middleware import async_middleware  # noqa: E402 (needs configured settings)
+
+# What get_asgi_application() does, with the middleware chain kept fully async
+settings.MIDDLEWARE = async_middleware(settings.MIDDLEWARE)
+application = ASGIHandler() 
\ No newline at end of file
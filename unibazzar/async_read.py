@@ -0,0 +1,75 @@
+"""
+Helpers for the async read path (``unibazzar/urls_async.py``).
+
+Under ASGI the hottest public GET endpoints are served by plain async views
+that query with Django's async ORM, so a slow database read parks a
+coroutine instead of a worker thread. Responses match the DRF views they
+stand in for (same serializers, same page-number pagination). Any other
+method on those URLs, e.g. a POST that creates a listing, is passed to the
+original DRF view in a thread.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def read_path(async_view, sync_view):
+    """Serve GET/HEAD with ``async_view`` and every other method with the DRF ``sync_view``."""
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+
+    # DRF views handle CSRF themselves (only for session authentication)
+    view.csrf_exempt = True
+    return view
+
+
+def not_found(message='Not found.'):
+    return JsonResponse({'detail': message}, status=404)
+
+
+async def paginate(request, count, fetch, serialize):
+    """
+    PageNumberPagination for async views. ``fetch(offset, limit)`` is awaited
+    for the rows of the requested page and ``serialize(rows)`` turns them into
+    the ``results`` list.
+    """
+    paginator = Paginator(range(count), api_settings.PAGE_SIZE)
+    page_number = request.GET.get('page') or 1
+    if page_number == 'last':
+        page_number = paginator.num_pages
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage:
+        return not_found('Invalid page.')
+
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if page.has_next():
+        next_link = replace_query_param(url, 'page', page.next_page_number())
+    if page.has_previous():
+        previous_number = page.previous_page_number()
+        previous_link = (
+            remove_query_param(url, 'page') if previous_number == 1
+            else replace_query_param(url, 'page', previous_number)
+        )
+
+    # An empty page needs no query (DRF's paginator slices [0:0] for it)
+    rows = await fetch(page.start_index() - 1, paginator.per_page) if count else []
+    return JsonResponse({
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': serialize(rows),
+    })
+
+
+async def fetch_queryset(queryset, offset, limit):
+    return [obj async for obj in queryset[offset:offset + limit]]
@@ -0,0 +1,249 @@
+"""
+Serving user-uploaded media (``MEDIA_URL``).
+
+``settings.MEDIA_SERVE_MODE`` chooses how file bytes reach the client:
+
+* ``x-accel-redirect`` (nginx) / ``x-sendfile`` (Apache, lighttpd): Django
+  only resolves the path, answers conditional requests and sets the cache
+  headers; the front proxy sends the file, including range requests.
+* ``django``: the file is sent from the worker, with single-range support.
+  Meant for local development only.
+* ``none``: media is not served by this project.
+
+Only the directories in ``MEDIA_PUBLIC_PREFIXES`` (avatars, listing
+photos) are served to anyone. Uploads stored under unique names (uuid or
+hex digest, see ``UniqueUploadTo``) never change content, so they are
+cached for a year with ``immutable``; other names get a short max-age and
+revalidate with ETag / Last-Modified.
+
+Verification documents (``PRIVATE_DOCUMENTS``) go through
+``serve_private_media`` instead: the requester must be authenticated and
+either own the profile the file belongs to or be staff, and the response is
+``private, no-store``.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import uuid
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.deconstruct import deconstructible
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+COPY_BUFFER = 64 * 1024
+
+UNIQUE_NAME = re.compile(
+    r'[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}|\.[0-9a-f]{12,64}\.',
+)
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Directory -> (profile model, file field) whose owner may download the file
+PRIVATE_DOCUMENTS = {
+    'business_docs/': ('users.MerchantProfile', 'business_docs'),
+    'edu_docs/': ('users.TutorProfile', 'edu_docs'),
+}
+
+mimetypes.add_type('image/webp', '.webp')
+
+
+@deconstructible
+class UniqueUploadTo:
+    """``upload_to`` that stores every upload under a fresh uuid name in ``directory``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def __call__(self, instance, filename):
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(self.directory, f"{uuid.uuid4().hex}{extension}")
+
+    def __eq__(self, other):
+        return isinstance(other, UniqueUploadTo) and self.directory == other.directory
+
+
+def is_immutable(path):
+    return bool(UNIQUE_NAME.search(posixpath.basename(path)))
+
+
+def cache_control(path):
+    if is_immutable(path):
+        max_age = getattr(settings, 'MEDIA_IMMUTABLE_MAX_AGE', 365 * 24 * 3600)
+        return f'public, max-age={max_age}, immutable'
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def etag_for(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [
+            tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+        ]
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single ``bytes=`` range,
+    ``None`` if the header should be ignored, or ``False`` if it cannot be
+    satisfied. Multiple ranges are ignored and answered with the whole file.
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if not length or not size:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            data = fh.read(min(COPY_BUFFER, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def offload(mode, path, full_path):
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def send_file(request, full_path, stat):
+    if request.method == 'HEAD':
+        response = HttpResponse()
+        response['Content-Length'] = str(stat.st_size)
+        return response
+
+    if 'HTTP_RANGE' in request.META:
+        if_range = request.META.get('HTTP_IF_RANGE')
+        byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+        if if_range and if_range.strip() != etag_for(stat):
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(full_path, start, end), status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+            return response
+    return FileResponse(open(full_path, 'rb'))
+
+
+def serve_mode():
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'none')
+    if mode not in ('django', 'x-accel-redirect', 'x-sendfile'):
+        raise Http404('Media is not served by this application.')
+    return mode
+
+
+def resolve(path):
+    """Return ``(path, full_path, stat)`` for a file under MEDIA_ROOT, or raise Http404."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found.')
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('File not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found.')
+    return path, full_path, stat
+
+
+def file_response(request, mode, path, full_path, stat):
+    if mode == 'django':
+        response = send_file(request, full_path, stat)
+    else:
+        response = offload(mode, path, full_path)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def is_public(path):
+    return path.startswith(tuple(getattr(settings, 'MEDIA_PUBLIC_PREFIXES', ())))
+
+
+@require_safe
+def serve_media(request, path):
+    mode = serve_mode()
+    path, full_path, stat = resolve(path)
+    if not is_public(path):
+        raise Http404('File not found.')
+
+    etag = etag_for(stat)
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = file_response(request, mode, path, full_path, stat)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(path)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def may_download(user, path):
+    if user.is_staff:
+        return True
+    for prefix, (model_name, field) in PRIVATE_DOCUMENTS.items():
+        if path.startswith(prefix):
+            return apps.get_model(model_name).objects.filter(user=user, **{field: path}).exists()
+    return False
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def serve_private_media(request, path):
+    """A verification document, for the profile owner or staff only."""
+    mode = serve_mode()
+    path, full_path, stat = resolve(path)
+    # 404 rather than 403 so other users cannot probe which documents exist
+    if not path.startswith(tuple(PRIVATE_DOCUMENTS)) or not may_download(request.user, path):
+        raise Http404('File not found.')
+    response = file_response(request, mode, path, full_path, stat)
+    response['Cache-Control'] = 'private, no-store'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,256 @@
+"""
+Token-bucket rate limiting for the API.
+
+Rules come from ``settings.RATELIMIT_RULES``; every rule whose path prefix
+and method match a request is applied, so an endpoint limit (e.g. login per
+IP) stacks on top of the general per-user / anonymous limits. Buckets live
+in the shared cache and are updated with atomic ``incr``/``decr`` (the
+GCRA form of a token bucket: one integer per bucket). If the cache is
+unreachable, buckets fall back to process memory.
+
+The middleware runs before sessions, DRF parsing and authentication, so a
+rejected request costs one or two cache round trips and no database work.
+
+The module also holds async-capable versions of the third-party middleware
+in ``settings.MIDDLEWARE`` (WhiteNoise, allauth). Under ASGI a single
+sync-only middleware makes Django run the whole chain, views included, in
+one thread, so the async catalog views (``unibazzar/urls_async.py``) would
+gain nothing. allauth refuses to start unless its own middleware is listed,
+so ``async_middleware`` swaps it out only when the ASGI handler is built.
+"""
+import logging
+import threading
+import time
+
+from allauth.account.middleware import AccountMiddleware as BaseAccountMiddleware
+from allauth.core import context
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> milliseconds between requests."""
+    count, period = rate.split('/')
+    return PERIODS[period[0]] * 1000 // int(count)
+
+
+class LocalBuckets:
+    """In-process stand-in for the shared cache, used when it is unavailable."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, now, interval, burst):
+        with self._lock:
+            if len(self._tats) > self.maxsize:
+                self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+            tat = max(self._tats.get(key, now), now) + interval
+            if tat - now > burst:
+                return tat - burst - now
+            self._tats[key] = tat
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+local_buckets = LocalBuckets()
+
+
+def shared_hit(key, now, interval, burst):
+    """
+    Take one token from the bucket ``key``. Returns 0 if allowed, otherwise
+    the milliseconds until a token is available.
+    """
+    timeout = (burst + interval) // 1000 + 1
+    cache.add(key, now, timeout=timeout)
+    tat = cache.incr(key, interval)
+    if tat < now + interval:
+        # Bucket was full (idle since its last request); restart from now.
+        # A concurrent request may be lost here, which only errs towards allowing.
+        tat = now + interval
+        cache.set(key, tat, timeout=timeout)
+    elif tat - now > burst:
+        cache.decr(key, interval)
+        return tat - burst - now
+    else:
+        cache.touch(key, timeout=timeout)
+    return 0
+
+
+class RateLimitMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = [
+            dict(rule, interval=parse_rate(rule['rate']),
+                 methods={method.upper() for method in rule.get('methods', ())})
+            for rule in getattr(settings, 'RATELIMIT_RULES', [])
+        ]
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.reject(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # The bucket update makes blocking cache calls, so it runs in a worker
+        # thread. Not thread-sensitive: it never touches the database, and
+        # queueing behind the shared sync thread would serialize every request.
+        if self.rules and getattr(settings, 'RATELIMIT_ENABLED', True):
+            response = await sync_to_async(self.reject, thread_sensitive=False)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def reject(self, request):
+        """A 429 response if ``request`` is over any of its limits, else None."""
+        if not getattr(settings, 'RATELIMIT_ENABLED', True):
+            return None
+        wait_ms = self.check(request)
+        if not wait_ms:
+            return None
+        retry_after = max(1, -(-wait_ms // 1000))
+        response = JsonResponse({
+            'status': 'error',
+            'message': f'Too many requests. Try again in {retry_after} seconds.',
+        }, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def check(self, request):
+        user_id = None
+        now = int(time.time() * 1000)
+        for rule in self.rules:
+            if not request.path.startswith(rule['path']):
+                continue
+            if rule['methods'] and request.method not in rule['methods']:
+                continue
+            if rule['per'] in ('user', 'anon') and user_id is None:
+                user_id = self.user_id(request) or ''
+            if rule['per'] == 'user':
+                if not user_id:
+                    continue
+                ident = f'u{user_id}'
+            elif rule['per'] == 'anon':
+                if user_id:
+                    continue
+                ident = self.client_ip(request)
+            else:
+                ident = self.client_ip(request)
+
+            key = f"rl:{rule['name']}:{ident}"
+            burst = rule['interval'] * rule.get('burst', 1)
+            try:
+                wait_ms = shared_hit(key, now, rule['interval'], burst)
+            except Exception as e:
+                logger.warning(f"Rate limit cache unavailable, using process buckets: {str(e)}")
+                wait_ms = local_buckets.hit(key, now, rule['interval'], burst)
+            if wait_ms:
+                return wait_ms
+        return 0
+
+    @staticmethod
+    def client_ip(request):
+        if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+            forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+            if forwarded:
+                # The last hop was added by our proxy; earlier ones are client-supplied
+                return forwarded.split(',')[-1].strip()
+        return request.META.get('REMOTE_ADDR', '')
+
+    @staticmethod
+    def user_id(request):
+        """
+        User id from a signature-checked JWT, without touching the database.
+        Anything else (no token, invalid or expired token) counts as anonymous.
+        """
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        scheme, _, credentials = header.partition(' ')
+        if scheme != 'Bearer' or not credentials:
+            return None
+        from rest_framework_simplejwt.exceptions import TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+        try:
+            return str(AccessToken(credentials)[api_settings.USER_ID_CLAIM])
+        except (TokenError, KeyError):
+            return None
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise's middleware, also usable in an async chain."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Development only: looks the file up on disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class AccountMiddleware(BaseAccountMiddleware):
+    """allauth's middleware, also usable in an async chain."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        with context.request_context(request):
+            response = await self.get_response(request)
+            # Only HTML (or untyped) responses may touch the session, which is sync
+            content_type = response.headers.get('content-type', '').partition(';')[0]
+            if not content_type or content_type == 'text/html':
+                await sync_to_async(self._remove_dangling_login)(request, response)
+            return response
+
+
+ASYNC_MIDDLEWARE = {
+    'allauth.account.middleware.AccountMiddleware': 'unibazzar.middleware.AccountMiddleware',
+}
+
+
+def async_middleware(middleware):
+    """``middleware`` (a MIDDLEWARE list) with async-capable replacements."""
+    return [ASYNC_MIDDLEWARE.get(path, path) for path in middleware]
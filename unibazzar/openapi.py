@@ -0,0 +1,142 @@
+"""
+Precomputed OpenAPI schema.
+
+drf_yasg builds the schema by introspecting every view and serializer,
+which takes tens to hundreds of milliseconds per request. Instead,
+``python manage.py generate_openapi_schema`` writes it once (at build time,
+before ``collectstatic``) to ``OPENAPI_SCHEMA_DIR``:
+
+- the Swagger and ReDoc pages load it as a static file served by WhiteNoise
+  (``SPEC_URL`` in ``SWAGGER_SETTINGS``/``REDOC_SETTINGS``);
+- ``?format=openapi`` (and ``.json``/``.yaml``) on the docs URLs returns the
+  same file instead of generating the schema.
+
+``generate_openapi_schema --check`` and the ``openapi`` deploy check fail
+when the files no longer match what the URLconf and serializers produce.
+The deploy check also compares the copies ``collectstatic`` put in
+``STATIC_ROOT``, since those are what WhiteNoise actually serves.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core import checks
+from django.http import HttpResponse
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view as yasg_get_schema_view
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="UniBazzar API",
+    default_version='v1',
+    description="Complete API documentation for UniBazzar marketplace application",
+    terms_of_service="https://www.unibazzar.com/terms/",
+    contact=openapi.Contact(email="contact@unibazzar.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+CODECS = {
+    'json': lambda: OpenAPICodecJson(validators=[], pretty=True),
+    'yaml': lambda: OpenAPICodecYaml(validators=[]),
+}
+
+# drf_yasg spec renderer format -> schema file
+RENDERER_FORMATS = {'openapi': 'json', '.json': 'json', '.yaml': 'yaml'}
+
+_files = {}
+
+
+def schema_path(fmt):
+    return os.path.join(settings.OPENAPI_SCHEMA_DIR, f'schema.{fmt}')
+
+
+def generate():
+    """The schema of the API URLconf, encoded in every format: ``{fmt: bytes}``."""
+    from unibazzar.urls import schema_patterns
+
+    # An empty url leaves out the host, so clients use the one the file was served from
+    generator = OpenAPISchemaGenerator(API_INFO, url='', patterns=schema_patterns)
+    # Views read self.request while being introspected; give them an anonymous GET
+    request = APIView().initialize_request(APIRequestFactory().get('/api/docs/', {'format': 'openapi'}))
+    schema = generator.get_schema(request=request, public=True)
+    return {fmt: codec().encode(schema) for fmt, codec in CODECS.items()}
+
+
+def collected_path(fmt):
+    """The copy of the schema file that ``collectstatic`` writes to STATIC_ROOT (``SPEC_URL``)."""
+    return os.path.join(settings.STATIC_ROOT, 'openapi', f'schema.{fmt}')
+
+
+def stale_formats(schemas=None, path=schema_path):
+    """Formats whose file (at ``path(fmt)``) is missing or differs from a fresh ``generate()``."""
+    schemas = schemas or generate()
+    stale = []
+    for fmt, content in schemas.items():
+        try:
+            with open(path(fmt), 'rb') as f:
+                if f.read() == content:
+                    continue
+        except FileNotFoundError:
+            pass
+        stale.append(fmt)
+    return stale
+
+
+def read_schema(fmt):
+    """The precomputed schema file, kept in memory until it changes on disk."""
+    path = schema_path(fmt)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _files.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = _files[path] = (mtime, f.read())
+    return cached[1]
+
+
+def get_schema_view(**kwargs):
+    """drf_yasg's ``get_schema_view``, answering spec requests from the precomputed files."""
+    base = yasg_get_schema_view(API_INFO, **kwargs)
+
+    class SchemaView(base):
+        def get(self, request, version='', format=None):
+            fmt = RENDERER_FORMATS.get(request.accepted_renderer.format)
+            if fmt is None:
+                # The UI page: drf_yasg renders it from an empty (cheap) schema
+                return super().get(request, version, format)
+            try:
+                content = read_schema(fmt)
+            except FileNotFoundError:
+                logger.warning("OpenAPI schema file missing, generating it per request; "
+                               "run 'python manage.py generate_openapi_schema'")
+                return super().get(request, version, format)
+            return HttpResponse(content, content_type=request.accepted_renderer.media_type)
+
+    return SchemaView
+
+
+@checks.register('openapi', deploy=True)
+def check_schema_files(app_configs, **kwargs):
+    schemas = generate()
+    errors = [
+        checks.Error(
+            f"{schema_path(fmt)} is missing or out of date with the API.",
+            hint="Run 'python manage.py generate_openapi_schema'.",
+            id='unibazzar.E001',
+        )
+        for fmt in stale_formats(schemas)
+    ]
+    if settings.STATIC_ROOT:
+        errors += [
+            checks.Error(
+                f"{collected_path(fmt)} is missing or out of date with the API.",
+                hint="Run 'python manage.py generate_openapi_schema' and then 'python manage.py collectstatic'.",
+                id='unibazzar.E002',
+            )
+            for fmt in stale_formats(schemas, collected_path)
+        ]
+    return errors
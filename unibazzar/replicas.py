@@ -0,0 +1,137 @@
+"""
+Read-replica routing.
+
+``ReplicaMiddleware`` marks GET/HEAD/OPTIONS requests to the catalog
+endpoints (``settings.DATABASE_REPLICA_PATHS``) as replica-safe and picks
+one replica for the whole request. While a request is marked,
+``ReplicaRouter`` sends reads of the catalog models
+(``settings.DATABASE_REPLICA_MODELS``) to that replica; every other read
+(users, tokens, sessions — anything authentication depends on) and every
+write goes to ``default``.
+
+After a user's write succeeds they are pinned to the primary for
+``DATABASE_REPLICA_STICKY_SECONDS`` (a flag in the shared cache keyed by the
+JWT user id), so they read their own changes even while replicas lag.
+"""
+import contextvars
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .middleware import RateLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+def sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def replica_eligible(model):
+    names = getattr(settings, 'DATABASE_REPLICA_MODELS', [])
+    return model._meta.app_label in names or model._meta.label_lower in names
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or not replica_eligible(model):
+            return 'default'
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {'default', *getattr(settings, 'DATABASE_REPLICAS', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            return self.get_response(request)
+
+        if request.method in SAFE_METHODS:
+            if not self.routed(request.path) or self.is_sticky(RateLimitMiddleware.user_id(request)):
+                return self.get_response(request)
+            token = _replica.set(random.choice(replicas))
+            try:
+                return self.get_response(request)
+            finally:
+                _replica.reset(token)
+
+        response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        # Same as __call__. sync_to_async copies the context into the worker
+        # thread, so the replica chosen here also applies to sync views.
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            return await self.get_response(request)
+
+        if request.method in SAFE_METHODS:
+            if not self.routed(request.path):
+                return await self.get_response(request)
+            # The stickiness flag is a blocking cache read; keep it off the event loop
+            user_id = RateLimitMiddleware.user_id(request)
+            if user_id and await sync_to_async(self.is_sticky, thread_sensitive=False)(user_id):
+                return await self.get_response(request)
+            token = _replica.set(random.choice(replicas))
+            try:
+                return await self.get_response(request)
+            finally:
+                _replica.reset(token)
+
+        response = await self.get_response(request)
+        await sync_to_async(self.pin)(request, response)
+        return response
+
+    @staticmethod
+    def pin(request, response):
+        """Pin the user to the primary after a successful write."""
+        user_id = RateLimitMiddleware.user_id(request)
+        if user_id and response.status_code < 400:
+            try:
+                cache.set(sticky_key(user_id), 1, timeout=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10))
+            except Exception as e:
+                logger.warning(f"Could not pin user {user_id} to the primary: {str(e)}")
+
+    @staticmethod
+    def routed(path):
+        return any(path.startswith(prefix) for prefix in getattr(settings, 'DATABASE_REPLICA_PATHS', []))
+
+    @staticmethod
+    def is_sticky(user_id):
+        if not user_id:
+            return False
+        try:
+            return bool(cache.get(sticky_key(user_id)))
+        except Exception as e:
+            # Without the flag we cannot promise read-your-writes; use the primary
+            logger.warning(f"Replica stickiness unavailable, reading from primary: {str(e)}")
+            return True
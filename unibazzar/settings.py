@@ -49,17 +49,20 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise for static files
+    'unibazzar.middleware.WhiteNoiseMiddleware',  # Whitenoise for static files (async-capable)
+    'unibazzar.middleware.RateLimitMiddleware',  # Before sessions/auth so rejections stay cheap
+    'unibazzar.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware',
+    'allauth.account.middleware.AccountMiddleware',  # asgi.py swaps in unibazzar.middleware.AccountMiddleware
 ]
 
-ROOT_URLCONF = 'unibazzar.urls'
+# asgi.py switches to unibazzar.urls_async (async catalog reads)
+ROOT_URLCONF = config('ROOT_URLCONF', default='unibazzar.urls')
 
 TEMPLATES = [
     {
@@ -82,13 +85,65 @@ WSGI_APPLICATION = 'unibazzar.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# Switched to SQLite for local development
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite for local development; set DATABASE_URL (Postgres) in production
+DATABASE_URL = config('DATABASE_URL', default='')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+if DATABASE_URL:
+    DATABASES = {
+        'default': dj_database_url.parse(
+            DATABASE_URL,
+            # Keep connections open across requests instead of reconnecting each time,
+            # and check them before reuse so a dropped connection is replaced
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True,
+            ssl_require=config('DB_SSL_REQUIRE', default=False, cast=bool),
+        )
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        DATABASES['default'].setdefault('OPTIONS', {})['connect_timeout'] = config('DB_CONNECT_TIMEOUT', default=5, cast=int)
+        # Behind PgBouncer / Supabase pooler in transaction mode, a cursor cannot
+        # outlive its transaction, so .iterator() must not use server-side cursors
+        if config('DB_POOL_MODE', default='') == 'transaction':
+            DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Read replicas (unibazzar/replicas.py): comma-separated URLs, e.g.
+# sqlite:///replica.sqlite3 as a local stand-in (migrate it with --database replica1).
+# Leave unset for the test suite: TestCase only allows queries to 'default'.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{index}'] = dict(
+        dj_database_url.parse(replica_url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True),
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['unibazzar.replicas.ReplicaRouter']
+DATABASE_REPLICA_PATHS = ['/api/products/', '/api/users/universities/']  # GET/HEAD/OPTIONS only
+DATABASE_REPLICA_MODELS = ['products', 'users.university']  # app labels or app.model
+DATABASE_REPLICA_STICKY_SECONDS = 10  # reads go to the primary this long after a user's write
+
+# Cache
+# A shared cache (Redis) is needed for cross-worker invalidation; local memory is used otherwise
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -110,14 +165,12 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Authentication Backends
 AUTHENTICATION_BACKENDS = [
-    # Custom backend for email-based authentication
+    # Email/password authentication and model permissions (extends ModelBackend).
+    # A failed password stops the chain, so each attempt costs one hash check.
     'users.backends.EmailBackend',
-    
-    # Default backend for username-based authentication
-    'django.contrib.auth.backends.ModelBackend',
 
-    # `allauth` specific authentication methods, such as login by e-mail
-    'allauth.account.auth_backends.AuthenticationBackend',
+    # `allauth` specific authentication methods, such as login by e-mail (timed subclass)
+    'users.backends.AllauthBackend',
 ]
 
 # Internationalization
@@ -136,11 +189,36 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media serving (unibazzar/media.py): 'x-accel-redirect' (nginx), 'x-sendfile',
+# 'django' (development only: the worker sends the bytes) or 'none'
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django' if DEBUG else 'none')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = 3600  # seconds, for names that can be reused
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # seconds, for unique (uuid / hashed) names
+# Served to anyone; business_docs/ and edu_docs/ need their owner or staff (serve_private_media)
+MEDIA_PUBLIC_PREFIXES = ('profile_pictures/', 'merchant_products/', 'student_products/', 'tutor_services/')
+
+# Profile pictures (users/uploads.py)
+AVATAR_MAX_UPLOAD_SIZE = config('AVATAR_MAX_UPLOAD_SIZE', default=10 * 1024 * 1024, cast=int)  # bytes
+AVATAR_MAX_DIMENSION = 512  # px, longest side after downscaling
+AVATAR_MAX_PIXELS = 40_000_000  # refuse to decode anything larger
+AVATAR_FORMAT = 'WEBP'  # or 'JPEG'
+AVATAR_QUALITY = 82
+AVATAR_WORKERS = 2  # concurrent image decodes per process
+
+# Resumable verification document uploads (users/uploads.py)
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'chunked_uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024  # bytes per document
+CHUNKED_UPLOAD_MAX_CHUNK = 8 * 1024 * 1024  # bytes per request
+CHUNKED_UPLOAD_EXTENSIONS = ['pdf', 'jpg', 'jpeg', 'png']
+CHUNKED_UPLOAD_EXPIRY_HOURS = config('CHUNKED_UPLOAD_EXPIRY_HOURS', default=72, cast=float)  # idle uploads removed by gc_media
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -156,8 +234,8 @@ SITE_ID = 1
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-        # Use JWT Authentication
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Use JWT Authentication (user rows served from users.user_cache)
+        'users.authentication.CachedJWTAuthentication',
         # Keep SessionAuthentication for browsable API/admin
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -185,6 +263,7 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,                 # Send new refresh token on refresh
     'BLACKLIST_AFTER_ROTATION': True,             # Blacklist old refresh token
     'UPDATE_LAST_LOGIN': True,                    # Update user's last_login field
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CachedBlacklistTokenRefreshSerializer',  # In-memory blacklist check
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -211,6 +290,30 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Authenticated user cache (users/user_cache.py)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)  # shared cache, seconds
+AUTH_USER_LOCAL_CACHE_TTL = config('AUTH_USER_LOCAL_CACHE_TTL', default=5, cast=int)  # per process, seconds
+AUTH_USER_LOCAL_CACHE_SIZE = 1024
+
+# Refresh token blacklist (users/token_blacklist.py)
+TOKEN_BLACKLIST_SYNC_INTERVAL = config('TOKEN_BLACKLIST_SYNC_INTERVAL', default=30, cast=int)  # seconds
+TOKEN_BLACKLIST_SYNC_MARGIN = config('TOKEN_BLACKLIST_SYNC_MARGIN', default=60, cast=int)  # seconds, re-read for late commits
+
+# API rate limiting (unibazzar/middleware.py)
+# Every matching rule applies. 'per' is 'ip', 'user' (valid JWT only) or
+# 'anon' (requests without a valid JWT, keyed by IP); 'burst' is the bucket size.
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+RATELIMIT_TRUST_X_FORWARDED_FOR = config('RATELIMIT_TRUST_X_FORWARDED_FOR', default=False, cast=bool)  # Only behind a proxy that sets it
+RATELIMIT_RULES = [
+    {'name': 'login', 'path': '/api/users/login/', 'methods': ['POST'], 'per': 'ip', 'rate': '20/m', 'burst': 10},
+    {'name': 'register', 'path': '/api/users/register/', 'methods': ['POST'], 'per': 'ip', 'rate': '10/h', 'burst': 5},
+    {'name': 'resend-verification', 'path': '/api/users/resend-verification-email/', 'methods': ['POST'], 'per': 'ip', 'rate': '5/h', 'burst': 3},
+    {'name': 'password-reset', 'path': '/api/password_reset/', 'methods': ['POST'], 'per': 'ip', 'rate': '10/h', 'burst': 5},
+    {'name': 'catalog-anon', 'path': '/api/products/', 'methods': ['GET'], 'per': 'anon', 'rate': '120/m', 'burst': 60},
+    {'name': 'api-anon', 'path': '/api/', 'per': 'anon', 'rate': '300/m', 'burst': 100},
+    {'name': 'api-user', 'path': '/api/', 'per': 'user', 'rate': '600/m', 'burst': 200},
+]
+
 # CORS Settings (Adjust as needed for your frontend)
 CORS_ALLOW_ALL_ORIGINS = DEBUG # Allow all in DEBUG
 # Or configure specific origins for production:
@@ -242,10 +345,13 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
-# Fallback email backend for when SMTP fails (used in utils.py)
-FALLBACK_EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_TIMEOUT = 5  # Timeout for SMTP connections in seconds
 
+# Email outbox (users/outbox.py, delivered by `manage.py send_outbox`)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_RETRY_BASE = 60  # seconds; doubled after every failed attempt
+EMAIL_OUTBOX_LEASE = 300  # seconds a claimed batch stays reserved for its worker
+
 # Password Reset Token Timeout (in hours)
 DJANGO_REST_PASSWORDRESET_TOKEN_CONFIG = {
     "CLASS": "django_rest_passwordreset.tokens.RandomStringTokenGenerator",
@@ -284,7 +390,28 @@ SWAGGER_SETTINGS = {
         'delete',
     ],
     'VALIDATOR_URL': None,
+    'SPEC_URL': STATIC_URL + 'openapi/schema.json',
 }
+REDOC_SETTINGS = {
+    'SPEC_URL': STATIC_URL + 'openapi/schema.json',
+}
+
+# Precomputed OpenAPI schema (unibazzar/openapi.py), written by generate_openapi_schema
+OPENAPI_SCHEMA_DIR = os.path.join(BASE_DIR, 'static', 'openapi')
+
+# Search autocomplete (products/autocomplete.py)
+AUTOCOMPLETE_SNAPSHOT_PATH = config('AUTOCOMPLETE_SNAPSHOT_PATH', default=os.path.join(BASE_DIR, 'autocomplete.snapshot.gz'))
+AUTOCOMPLETE_MAX_TERMS = config('AUTOCOMPLETE_MAX_TERMS', default=50000, cast=int)
+AUTOCOMPLETE_CHECK_INTERVAL = config('AUTOCOMPLETE_CHECK_INTERVAL', default=30, cast=int)  # seconds between version checks
+
+# Listings expire after this many days unless renewed (see the archive_listings command)
+LISTING_LIFETIME_DAYS = config('LISTING_LIFETIME_DAYS', default=60, cast=int)
+
+# Category registry (products/category_cache.py): seconds between version checks
+CATEGORY_CACHE_CHECK_INTERVAL = config('CATEGORY_CACHE_CHECK_INTERVAL', default=5, cast=int)
+
+# University search index (users/university_index.py): seconds between version checks
+UNIVERSITY_INDEX_CHECK_INTERVAL = config('UNIVERSITY_INDEX_CHECK_INTERVAL', default=5, cast=int)
 
 # django-allauth Settings (Keep SITE_ID, remove ACCOUNT_* settings)
 # ACCOUNT_EMAIL_REQUIRED = True
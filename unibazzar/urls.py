@@ -1,11 +1,11 @@
+import re
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.views.generic.base import RedirectView, TemplateView
+from unibazzar.media import PRIVATE_DOCUMENTS, serve_media, serve_private_media
+from unibazzar.openapi import get_schema_view
 
 # Import SimpleJWT views
 from rest_framework_simplejwt.views import (
@@ -13,30 +13,25 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
-# Schema view for Swagger documentation
+# Endpoints included in the OpenAPI schema (unibazzar/openapi.py)
+schema_patterns = [
+    path('admin/', admin.site.urls),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/users/', include('users.urls')),
+
+    path('api/products/', include('products.urls')),
+    path('api/password_reset/', include('django_rest_passwordreset.urls', namespace='password_reset')),
+    path('accounts/', include('allauth.urls')),
+    path('api/auth-drf/', include('rest_framework.urls', namespace='rest_framework'))
+]
+
+# Schema view for Swagger documentation; the schema itself is precomputed
 schema_view = get_schema_view(
-    openapi.Info(
-        title="UniBazzar API",
-        default_version='v1',
-        description="Complete API documentation for UniBazzar marketplace application",
-        terms_of_service="https://www.unibazzar.com/terms/",
-        contact=openapi.Contact(email="contact@unibazzar.com"),
-        license=openapi.License(name="BSD License"),
-    ),
     public=True,
     permission_classes=(permissions.AllowAny,),
     authentication_classes=[],
-    patterns=[
-        path('admin/', admin.site.urls),
-        path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-        path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
-        path('api/users/', include('users.urls')),
-
-        path('api/products/', include('products.urls')),
-        path('api/password_reset/', include('django_rest_passwordreset.urls', namespace='password_reset')),
-        path('accounts/', include('allauth.urls')),
-        path('api/auth-drf/', include('rest_framework.urls', namespace='rest_framework'))
-    ],
+    patterns=schema_patterns,
 )
 
 urlpatterns = [
@@ -73,6 +68,10 @@ urlpatterns = [
     path('api/auth-drf/', include('rest_framework.urls', namespace='rest_framework')),
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# User uploads; how they are sent is set by MEDIA_SERVE_MODE (unibazzar/media.py)
+media_prefix = re.escape(settings.MEDIA_URL.lstrip('/'))
+private_dirs = '|'.join(re.escape(prefix) for prefix in PRIVATE_DOCUMENTS)
+urlpatterns += [
+    re_path(r'^%s(?P<path>(?:%s).+)$' % (media_prefix, private_dirs), serve_private_media, name='private_media'),
+    re_path(r'^%s(?P<path>.+)$' % media_prefix, serve_media, name='media'),
+]
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+URLconf used under ASGI (``unibazzar/asgi.py`` selects it through the
+ROOT_URLCONF environment variable). The hot catalog reads are answered by
+async views; every other route, and every non-GET request on these
+routes, is the same as in ``unibazzar/urls.py``.
+"""
+from django.urls import path
+
+from products import views as product_views
+from products import views_async as product_reads
+from users import views as user_views
+from users import views_async as user_reads
+from unibazzar.async_read import read_path
+from unibazzar.urls import urlpatterns as sync_urlpatterns
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+LISTING_VIEWSETS = {
+    'merchant-products': ('merchant-product', product_views.MerchantProductViewSet),
+    'student-products': ('student-product', product_views.StudentProductViewSet),
+    'tutor-services': ('tutor-service', product_views.TutorServiceViewSet),
+}
+
+urlpatterns = []
+for prefix, (listing_type, viewset) in LISTING_VIEWSETS.items():
+    urlpatterns += [
+        path(f'api/products/{prefix}/', read_path(
+            product_reads.listing_list(listing_type), viewset.as_view(LIST_ACTIONS),
+        )),
+        path(f'api/products/{prefix}/<int:pk>/', read_path(
+            product_reads.listing_detail(listing_type), viewset.as_view(DETAIL_ACTIONS),
+        )),
+    ]
+
+urlpatterns += [
+    path('api/products/categories/', read_path(
+        product_reads.category_list, product_views.CategoryViewSet.as_view(LIST_ACTIONS),
+    )),
+    path('api/products/categories/<int:pk>/', read_path(
+        product_reads.category_detail, product_views.CategoryViewSet.as_view(DETAIL_ACTIONS),
+    )),
+    path('api/products/reviews/summary/', read_path(
+        product_reads.review_summary, product_views.ReviewViewSet.as_view({'get': 'summary'}),
+    )),
+    path('api/users/universities/', read_path(
+        user_reads.university_list, user_views.UniversityListView.as_view(),
+    )),
+]
+
+urlpatterns += sync_urlpatterns
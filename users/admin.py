@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User, University
+from .models import User, University, EmailOutbox
 
 @admin.register(University)
 class UniversityAdmin(admin.ModelAdmin):
@@ -32,4 +32,12 @@ class UserAdmin(BaseUserAdmin):
             'classes': ('wide',),
             'fields': ('email', 'full_name', 'password1', 'password2', 'role'),
         }),
-    ) 
\ No newline at end of file
+    )
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'last_error')
+    readonly_fields = ('created_at', 'sent_at')
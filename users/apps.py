@@ -6,4 +6,5 @@ class UsersConfig(AppConfig):
     name = 'users'
 
     def ready(self):
-        import users.signals 
\ No newline at end of file
+        import users.signals
+        import unibazzar.openapi  # noqa: F401 (registers the schema freshness check) 
\ No newline at end of file
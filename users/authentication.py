@@ -1,7 +1,11 @@
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
+from .user_cache import get_cached_user, cache_user
 
 class SupabaseJWTAuthentication(BaseAuthentication):
     """
@@ -55,4 +59,31 @@ class SupabaseJWTAuthentication(BaseAuthentication):
         header in a `401 Unauthenticated` response, or `None` if the
         authentication scheme should return `403 Permission Denied` responses.
         """
-        return f'{self.keyword} realm="api"' 
\ No newline at end of file
+        return f'{self.keyword} realm="api"'
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the user from users.user_cache instead of
+    loading the User row on every request. The active and revoked-token
+    checks still run against the cached user.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The cache holds this digest, not the password hash itself
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user.password_digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -1,32 +1,64 @@
-import jwt
-from django.contrib.auth.backends import BaseBackend
+import logging
+import time
+from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from allauth.account.auth_backends import AuthenticationBackend
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 # Add email authentication handling:
 
-class EmailBackend:
+class TimedBackendMixin:
     """
-    Authenticate against django.contrib.auth.models.User using email.
+    Logs how long each authenticate() call takes, per backend, on the
+    ``users.backends`` logger at DEBUG level. Backends implement
+    ``_authenticate`` rather than overriding ``authenticate``.
     """
-    def authenticate(self, request, email=None, password=None, **kwargs):
-        from django.contrib.auth import get_user_model
-        UserModel = get_user_model()
+    def authenticate(self, request, **credentials):
+        started = time.perf_counter()
+        outcome = 'denied'
         try:
-            user = UserModel.objects.get(email=email)
-            if user.check_password(password):
-                return user
-        except UserModel.DoesNotExist:
-            return None
-        except Exception as e:
-            return None
+            user = self._authenticate(request, **credentials)
+            outcome = 'success' if user is not None else 'no match'
+            return user
+        finally:
+            logger.debug(
+                f"{type(self).__name__}.authenticate: {outcome} in "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms"
+            )
 
-    def get_user(self, user_id):
-        from django.contrib.auth import get_user_model
-        UserModel = get_user_model()
+    def _authenticate(self, request, **credentials):
+        return super().authenticate(request, **credentials)
+
+
+class EmailBackend(TimedBackendMixin, ModelBackend):
+    """
+    Authenticate against the User model using email.
+
+    This is the only password backend: it does one lookup on the unique email
+    column and at most one password hash check. Unknown emails still pay for
+    one hash (of a throwaway user) so response times do not reveal which
+    addresses are registered. A wrong password stops the backend chain
+    instead of letting later backends look the user up and hash again.
+    Permission checks are inherited from ModelBackend.
+    """
+    def _authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        if email is None:
+            email = username  # admin and other username-style forms (USERNAME_FIELD is email)
+        if email is None or password is None:
+            return None
         try:
-            return UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return None
\ No newline at end of file
+            user = User._default_manager.get(email=email)
+        except User.DoesNotExist:
+            User().set_password(password)
+            raise PermissionDenied
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        raise PermissionDenied
+
+
+class AllauthBackend(TimedBackendMixin, AuthenticationBackend):
+    """allauth's authentication backend, timed like EmailBackend."""
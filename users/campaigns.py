@@ -0,0 +1,185 @@
+"""
+Bulk email campaigns (see the ``send_campaign`` command).
+
+Recipients are streamed in id order and handled in batches: a batch is
+rendered with the compiled ``announcement`` template, then sent by a small
+thread pool in which every worker keeps one backend connection open for the
+whole run. A shared limiter caps the overall messages per second. After
+each batch the campaign row records the last recipient handled (plus any
+later ones already sent to when an earlier send could not be attempted),
+so a rerun continues where the previous one stopped.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from . import email_templates
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls from all threads at least ``1 / per_second`` apart."""
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ConnectionPool:
+    """One reusable backend connection per worker thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection()
+            connection.open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def discard(self):
+        """Drop this thread's connection after an error; the next send reconnects."""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            with self._lock:
+                self._connections.remove(connection)
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def recipients(filters, after_id=0, exclude_ids=()):
+    queryset = User.objects.filter(is_active=True, is_email_verified=True, id__gt=after_id)
+    if exclude_ids:
+        queryset = queryset.exclude(id__in=exclude_ids)
+    if filters.get('university'):
+        queryset = queryset.filter(university_id=filters['university'])
+    if filters.get('role'):
+        queryset = queryset.filter(role=filters['role'])
+    return queryset.order_by('id').only('id', 'email', 'full_name')
+
+
+def send_one(pool, limiter, to, subject, text, html):
+    """
+    Returns True if sent, False if this message failed, and None if no
+    connection to the mail server could be made (nothing was attempted).
+    """
+    limiter.wait()
+    try:
+        connection = pool.get()
+    except Exception as e:
+        logger.error(f"Campaign mail connection failed: {str(e)}")
+        pool.discard()
+        return None
+    try:
+        message = EmailMultiAlternatives(
+            subject, text, from_email=settings.DEFAULT_FROM_EMAIL, to=[to], connection=connection,
+        )
+        message.attach_alternative(html, 'text/html')
+        message.send()
+        return True
+    except Exception as e:
+        logger.error(f"Campaign email to {to} failed: {str(e)}")
+        pool.discard()
+        return False
+
+
+def run_campaign(campaign, workers=4, rate=10, batch_size=200, limit=None):
+    """
+    Send ``campaign`` to the recipients after its checkpoint. Returns True
+    when every recipient has been handled, False if the run stopped early
+    (``limit`` reached, mail server unreachable, or interrupted).
+    """
+    template = email_templates.get('announcement')
+    shared = {'title': campaign.subject, 'message': campaign.message, 'site_name': 'UniBazzar'}
+
+    users = recipients(campaign.filters, campaign.last_user_id, campaign.handled_ids).iterator(chunk_size=batch_size)
+    if limit is not None:
+        users = islice(users, limit)
+
+    pool = ConnectionPool()
+    limiter = RateLimiter(rate)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                batch = list(islice(users, batch_size))
+                if not batch:
+                    break
+                rendered = template.render_many(
+                    ({'full_name': user.full_name, 'email': user.email} for user in batch), shared,
+                )
+                futures = [
+                    executor.submit(send_one, pool, limiter, user.email, campaign.subject, text, html)
+                    for user, (_, text, html) in zip(batch, rendered)
+                ]
+                try:
+                    wait(futures)
+                except KeyboardInterrupt:
+                    # Let in-flight sends finish and checkpoint exactly up to them
+                    for future in futures:
+                        future.cancel()
+                    wait(futures)
+
+                # None (no connection) and cancelled sends were not attempted
+                results = [None if f.cancelled() else f.result() for f in futures]
+                attempted = [(user.id, result) for user, result in zip(batch, results) if result is not None]
+                if attempted:
+                    # The checkpoint covers the leading run of attempts; later ones are listed
+                    leading = next((i for i, result in enumerate(results) if result is None), len(results))
+                    if leading:
+                        campaign.last_user_id = batch[leading - 1].id
+                    campaign.handled_ids = sorted(
+                        user_id for user_id in {*campaign.handled_ids, *(user_id for user_id, _ in attempted)}
+                        if user_id > campaign.last_user_id
+                    )
+                    campaign.sent += sum(result for _, result in attempted)
+                    campaign.failed += sum(not result for _, result in attempted)
+                    campaign.save(update_fields=['last_user_id', 'handled_ids', 'sent', 'failed', 'updated_at'])
+                if len(attempted) < len(futures):
+                    return False
+    finally:
+        pool.close_all()
+
+    if limit is not None and recipients(campaign.filters, campaign.last_user_id, campaign.handled_ids).exists():
+        return False
+    campaign.last_user_id = max([campaign.last_user_id, *campaign.handled_ids])
+    campaign.handled_ids = []
+    campaign.finished_at = timezone.now()
+    campaign.save(update_fields=['last_user_id', 'handled_ids', 'finished_at', 'updated_at'])
+    return True
@@ -0,0 +1,97 @@
+"""
+Registry of compiled email templates.
+
+Each email type is registered once with its subject and template names. The
+templates are resolved and parsed on first use and kept for the life of the
+process; rendering then only evaluates the per-recipient fields against a
+plain Context (no loader lookups, no context processors). ``render_many``
+reuses one Context for a whole batch, which is what campaign sends use.
+Template edits need a process restart (or ``reset()``).
+"""
+import threading
+
+from django.template import Context, engines
+
+
+class EmailTemplate:
+    def __init__(self, subject, html=None, text=None):
+        self.subject = subject
+        self.html_name = html
+        self.text_name = text
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def compiled(self):
+        """Return the parsed ``(html, text)`` templates, loading them once."""
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    engine = engines['django']
+                    self._compiled = tuple(
+                        engine.get_template(name).template if name else None
+                        for name in (self.html_name, self.text_name)
+                    )
+        return self._compiled
+
+    def render_many(self, contexts, shared=None):
+        """
+        Yield ``(subject, text, html)`` for each per-recipient context dict.
+        ``shared`` holds values common to the whole batch.
+        """
+        html, text = self.compiled()
+        context = Context(shared or {})
+        for values in contexts:
+            with context.push(values):
+                yield (
+                    self.subject,
+                    text.render(context) if text else '',
+                    html.render(context) if html else '',
+                )
+
+    def render(self, context):
+        return next(self.render_many([context]))
+
+    def reset(self):
+        with self._lock:
+            self._compiled = None
+
+
+_registry = {
+    'verification': EmailTemplate(
+        'Activate your UniBazzar account',
+        html='users/email_verification.html',
+    ),
+    'password_reset': EmailTemplate(
+        'Password Reset for UniBazzar',
+        html='users/email_reset_password.html',
+        text='users/email_reset_password.txt',
+    ),
+    # Subject and message are set per campaign (users/campaigns.py)
+    'announcement': EmailTemplate(
+        None,
+        html='users/email_announcement.html',
+        text='users/email_announcement.txt',
+    ),
+}
+
+
+def register(name, template):
+    _registry[name] = template
+    return template
+
+
+def get(name):
+    return _registry[name]
+
+
+def render(name, context):
+    return get(name).render(context)
+
+
+def render_many(name, contexts, shared=None):
+    return get(name).render_many(contexts, shared)
+
+
+def reset():
+    for template in _registry.values():
+        template.reset()
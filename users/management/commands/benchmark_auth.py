@@ -0,0 +1,53 @@
+import time
+from django.conf import settings
+from django.contrib.auth import authenticate, load_backend
+from django.core.exceptions import PermissionDenied
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Time login attempts (valid, wrong password, unknown email) per authentication backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of an existing user')
+        parser.add_argument('password', help="That user's password")
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            help='Attempts per scenario',
+            default=5,
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            help='Backend path to measure (repeatable); defaults to AUTHENTICATION_BACKENDS',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ('valid', options['email'], options['password']),
+            ('wrong password', options['email'], options['password'] + '-wrong'),
+            ('unknown email', 'nobody-' + options['email'], options['password']),
+        ]
+        rounds = options['rounds']
+
+        for path in options['backend'] or settings.AUTHENTICATION_BACKENDS:
+            backend = load_backend(path)
+            self.stdout.write(path)
+            for label, email, password in scenarios:
+                ms = self.measure(rounds, lambda: backend.authenticate(None, email=email, password=password))
+                self.stdout.write(f"  {label:<15} {ms:8.1f} ms")
+
+        self.stdout.write('django.contrib.auth.authenticate (full chain)')
+        for label, email, password in scenarios:
+            ms = self.measure(rounds, lambda: authenticate(None, email=email, password=password))
+            self.stdout.write(f"  {label:<15} {ms:8.1f} ms")
+
+    def measure(self, rounds, attempt):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            try:
+                attempt()
+            except PermissionDenied:
+                pass
+        return (time.perf_counter() - started) * 1000 / rounds
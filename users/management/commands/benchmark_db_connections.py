@@ -0,0 +1,109 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+BENCHMARK_ALIAS = 'connection_benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate concurrent requests with and without persistent connections (CONN_MAX_AGE) '
+        'and report how many database connections each mode opens'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Concurrent worker threads (each holds its own connection, like a gunicorn thread)',
+            default=8,
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Requests per thread',
+            default=200,
+        )
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            help='CONN_MAX_AGE used for the persistent run',
+            default=600,
+        )
+        parser.add_argument(
+            '--sqlite',
+            help='Benchmark against a SQLite file in WAL mode at this path instead of the configured database',
+        )
+
+    def handle(self, *args, **options):
+        alias = 'default'
+        if options['sqlite']:
+            alias = BENCHMARK_ALIAS
+            connections.settings[alias] = dict(
+                connections.settings['default'], ENGINE='django.db.backends.sqlite3', NAME=options['sqlite'],
+                OPTIONS={}, CONN_HEALTH_CHECKS=True,
+            )
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+            connections[alias].close()
+        elif connections['default'].vendor == 'sqlite' and connections['default'].is_in_memory_db():
+            raise CommandError('In-memory SQLite never closes connections; use --sqlite PATH instead.')
+
+        settings_dict = connections.settings[alias]
+        original = settings_dict['CONN_MAX_AGE'], settings_dict.get('CONN_HEALTH_CHECKS', False)
+        self.stdout.write(f"{connections[alias].vendor} database, {options['threads']} threads x {options['requests']} requests")
+        try:
+            for label, max_age, health_checks in (
+                ('per-request', 0, False),
+                ('persistent', options['conn_max_age'], True),
+            ):
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                opened, elapsed = self.run(alias, options['threads'], options['requests'])
+                total = options['threads'] * options['requests']
+                self.stdout.write(
+                    f"  {label:<12} {total} requests, {opened} connections opened, "
+                    f"{elapsed:.2f}s, {total / elapsed:.0f} req/s, {elapsed * 1000 / options['requests']:.2f} ms/request"
+                )
+        finally:
+            settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = original
+            if alias == BENCHMARK_ALIAS:
+                del connections.settings[alias]
+
+    def run(self, alias, threads, requests):
+        opened = []
+        lock = threading.Lock()
+
+        def count(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    opened.append(1)
+
+        def worker():
+            try:
+                for _ in range(requests):
+                    # The same signals Django sends around every request: they
+                    # close connections that are past CONN_MAX_AGE or unusable
+                    request_started.send(sender=self.__class__)
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                    request_finished.send(sender=self.__class__)
+            finally:
+                connections[alias].close()
+
+        connection_created.connect(count)
+        try:
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count)
+        return len(opened), elapsed
@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from users import email_templates
+
+
+class Command(BaseCommand):
+    help = 'Compare render_to_string with the compiled email template registry'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            help='Messages rendered per method',
+            default=2000,
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        template = email_templates.get('password_reset')
+        contexts = [
+            {
+                'full_name': f'Student {i}',
+                'email': f'student{i}@example.com',
+                'reset_password_url': f'https://unibazzar.example/reset/?token={i:030d}',
+            }
+            for i in range(count)
+        ]
+        shared = {'site_name': 'UniBazzar'}
+
+        started = time.perf_counter()
+        for context in contexts:
+            context = dict(shared, **context)
+            render_to_string(template.html_name, context)
+            render_to_string(template.text_name, context)
+        baseline = time.perf_counter() - started
+
+        template.compiled()  # exclude the one-off parse, as a warm process would
+        started = time.perf_counter()
+        for _ in template.render_many(contexts, shared):
+            pass
+        compiled = time.perf_counter() - started
+
+        self.stdout.write(f"render_to_string:  {count / baseline:10.0f} messages/s")
+        self.stdout.write(f"compiled registry: {count / compiled:10.0f} messages/s "
+                          f"({baseline / compiled:.1f}x)")
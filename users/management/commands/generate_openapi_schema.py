@@ -0,0 +1,41 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from unibazzar import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the OpenAPI schema served by /api/docs/ and /api/redoc/ to OPENAPI_SCHEMA_DIR '
+        '(run before collectstatic)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only check that the schema files are up to date; exit with an error if not',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        schemas = openapi.generate()
+        elapsed = time.perf_counter() - started
+
+        if options['check']:
+            stale = openapi.stale_formats(schemas)
+            if stale:
+                raise CommandError(
+                    f"OpenAPI schema out of date ({', '.join(openapi.schema_path(fmt) for fmt in stale)}); "
+                    f"run 'python manage.py generate_openapi_schema'."
+                )
+            self.stdout.write(self.style.SUCCESS('OpenAPI schema is up to date.'))
+            return
+
+        for fmt, content in schemas.items():
+            path = openapi.schema_path(fmt)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.stdout.write(f"Wrote {path} ({len(content)} bytes)")
+        self.stdout.write(self.style.SUCCESS(f"Generated the OpenAPI schema in {elapsed * 1000:.0f} ms."))
@@ -1,81 +1,84 @@
 import csv
+import time
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
+from django.core.validators import URLValidator
+from django.db import transaction
 from users.models import University
+from users import university_index
 import os
 from django.conf import settings
 
 # Define the path to your CSV file relative to the BASE_DIR
 # You might want to place this in a 'data' directory within your project root
 # e.g., BASE_DIR / 'data' / 'universities.csv'
-DEFAULT_CSV_PATH = os.path.join(settings.BASE_DIR, 'universities.csv') 
+DEFAULT_CSV_PATH = os.path.join(settings.BASE_DIR, 'universities.csv')
 
 class Command(BaseCommand):
-    help = 'Loads universities from a CSV file into the database'
+    help = 'Loads universities from a CSV file into the database (bulk upsert by name)'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            '--csv_path', 
-            type=str, 
+            '--csv_path',
+            type=str,
             help='Path to the CSV file containing university names',
             default=DEFAULT_CSV_PATH
         )
         parser.add_argument(
-            '--name_column', 
-            type=str, 
+            '--name_column',
+            type=str,
             help='Name of the column containing university names in the CSV',
             default='university_name' # Default column name
         )
+        parser.add_argument(
+            '--location_column',
+            type=str,
+            help='Optional column with the university location',
+            default='location'
+        )
+        parser.add_argument(
+            '--website_column',
+            type=str,
+            help='Optional column with the university website',
+            default='website'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows inserted or updated per statement',
+            default=1000
+        )
 
     def handle(self, *args, **options):
         csv_file_path = options['csv_path']
         name_column = options['name_column']
-        
+
         self.stdout.write(f"Looking for CSV file at: {csv_file_path}")
-        
+
         if not os.path.exists(csv_file_path):
             self.stderr.write(self.style.ERROR(f"CSV file not found at {csv_file_path}"))
             self.stdout.write("Please create the CSV file or provide the correct path using --csv_path.")
-            # Example of how to create a placeholder CSV if it doesn't exist:
-            # try:
-            #     os.makedirs(os.path.dirname(csv_file_path), exist_ok=True)
-            #     with open(csv_file_path, 'w', newline='', encoding='utf-8') as file:
-            #         writer = csv.writer(file)
-            #         writer.writerow([name_column]) # Write header
-            #         writer.writerow(['Placeholder University 1'])
-            #         writer.writerow(['Placeholder University 2'])
-            #     self.stdout.write(self.style.SUCCESS(f"Created a placeholder CSV at {csv_file_path} with column '{name_column}'"))
-            # except Exception as e:
-            #     self.stderr.write(self.style.ERROR(f"Could not create placeholder CSV: {e}"))
             return # Exit if file not found
 
-        count = 0
-        created_count = 0
+        started = time.monotonic()
         try:
-            with open(csv_file_path, mode='r', encoding='utf-8') as file:
+            with open(csv_file_path, mode='r', encoding='utf-8', newline='') as file:
                 reader = csv.DictReader(file)
-                if name_column not in reader.fieldnames:
+                if name_column not in (reader.fieldnames or []):
                     self.stderr.write(self.style.ERROR(
                         f"Column '{name_column}' not found in CSV file '{csv_file_path}'."
                     ))
-                    self.stdout.write(f"Available columns: {', '.join(reader.fieldnames)}")
+                    self.stdout.write(f"Available columns: {', '.join(reader.fieldnames or [])}")
                     self.stdout.write(f"Please specify the correct column name using --name_column.")
                     return # Exit if column not found
-                    
-                for row in reader:
-                    university_name = row.get(name_column)
-                    if university_name: # Ensure the name is not empty
-                        university_name = university_name.strip()
-                        obj, created = University.objects.get_or_create(
-                            name=university_name
-                        )
-                        if created:
-                            created_count += 1
-                            self.stdout.write(self.style.SUCCESS(f'Successfully created university "{university_name}"'))
-                        else:
-                             self.stdout.write(f'University "{university_name}" already exists.')
-                        count += 1
-                    else:
-                        self.stdout.write(self.style.WARNING(f"Skipping row with empty name in column '{name_column}'."))
+
+                columns = {
+                    'location': options['location_column'] if options['location_column'] in reader.fieldnames else None,
+                    'website': options['website_column'] if options['website_column'] in reader.fieldnames else None,
+                }
+                with transaction.atomic():
+                    stats = self.load(reader, name_column, columns, options['batch_size'])
+                    transaction.on_commit(university_index.invalidate)
 
         except FileNotFoundError:
             self.stderr.write(self.style.ERROR(f"CSV file not found at {csv_file_path}"))
@@ -84,5 +87,73 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
             return
 
-        self.stdout.write(f"Processed {count} universities.")
-        self.stdout.write(self.style.SUCCESS(f'Successfully added {created_count} new universities.')) 
\ No newline at end of file
+        elapsed = time.monotonic() - started
+        rate = stats['rows'] / elapsed if elapsed else stats['rows']
+        self.stdout.write(
+            f"Processed {stats['rows']} rows in {elapsed:.2f}s ({rate:.0f} rows/s): "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged, "
+            f"{stats['skipped']} skipped (empty, too long or duplicate names), "
+            f"{stats['invalid_websites']} invalid websites and {stats['too_long']} overlong "
+            f"locations/websites ignored."
+        )
+        self.stdout.write(self.style.SUCCESS(f"Successfully added {stats['created']} new universities."))
+
+    def load(self, reader, name_column, columns, batch_size):
+        # One query for everything already stored; the oldest row wins for names stored twice
+        existing = {}
+        for university in University.objects.order_by('-id').only('id', 'name', 'location', 'website'):
+            existing[university.name] = university
+
+        validate_url = URLValidator()
+        max_name = University._meta.get_field('name').max_length
+        max_lengths = {field: University._meta.get_field(field).max_length for field in columns}
+        stats = dict(rows=0, created=0, updated=0, unchanged=0, skipped=0, invalid_websites=0, too_long=0)
+        to_create, to_update, seen = [], [], set()
+
+        for row in reader:
+            stats['rows'] += 1
+            name = (row.get(name_column) or '').strip()
+            if not name or len(name) > max_name or name in seen:
+                stats['skipped'] += 1
+                continue
+            seen.add(name)
+
+            values = {}
+            for field, column in columns.items():
+                value = (row.get(column) or '').strip() if column else ''
+                if len(value) > max_lengths[field]:
+                    # bulk_create would fail the whole load on Postgres; keep the row, drop the value
+                    stats['too_long'] += 1
+                elif value:
+                    values[field] = value
+            if 'website' in values:
+                try:
+                    validate_url(values['website'])
+                except ValidationError:
+                    stats['invalid_websites'] += 1
+                    del values['website']
+
+            university = existing.get(name)
+            if university is None:
+                to_create.append(University(name=name, **values))
+                stats['created'] += 1
+            elif any(getattr(university, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(university, field, value)
+                to_update.append(university)
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+
+            if len(to_create) >= batch_size:
+                University.objects.bulk_create(to_create, batch_size=batch_size)
+                to_create = []
+            if len(to_update) >= batch_size:
+                University.objects.bulk_update(to_update, ['location', 'website'], batch_size=batch_size)
+                to_update = []
+
+        if to_create:
+            University.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            University.objects.bulk_update(to_update, ['location', 'website'], batch_size=batch_size)
+        return stats
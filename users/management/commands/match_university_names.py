@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from users.models import StudentProfile, User
+from users.university_index import resolve_university_names
+from users.user_cache import invalidate_user
+
+
+class Command(BaseCommand):
+    help = 'Match free-text StudentProfile.university_name values to University records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Set User.university for students who do not have one yet',
+        )
+
+    def handle(self, *args, **options):
+        counts = dict(
+            StudentProfile.objects.values_list('university_name')
+            .annotate(n=Count('id')).values_list('university_name', 'n')
+        )
+        resolved = resolve_university_names(counts)
+
+        unmatched = sorted(name for name, university_id in resolved.items() if university_id is None)
+        matched_profiles = sum(counts[name] for name, university_id in resolved.items() if university_id)
+        self.stdout.write(f"{len(resolved)} distinct names, {len(resolved) - len(unmatched)} matched "
+                          f"({matched_profiles} student profiles).")
+        for name in unmatched:
+            self.stdout.write(self.style.WARNING(f'No match for "{name}" ({counts[name]} profiles)'))
+
+        if not options['apply']:
+            return
+
+        updated = []
+        with transaction.atomic():
+            for name, university_id in resolved.items():
+                if university_id is None:
+                    continue
+                ids = list(User.objects.filter(
+                    student_profile__university_name=name, university__isnull=True
+                ).values_list('id', flat=True))
+                User.objects.filter(id__in=ids).update(university_id=university_id)
+                updated += ids
+        # update() sends no post_save, so drop the users cached for token auth here
+        for user_id in updated:
+            invalidate_user(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Linked {len(updated)} users to their university."))
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Tokens deleted per statement',
+            default=1000,
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            help='Seconds to sleep between batches, to leave room for logins and refreshes',
+            default=0,
+        )
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        batch_size = options['batch_size']
+        blacklisted = outstanding = 0
+
+        while True:
+            # Walk the primary key so each batch is a short indexed delete
+            # that commits on its own instead of one long table lock.
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {outstanding} expired outstanding tokens ({blacklisted} blacklisted)."
+        ))
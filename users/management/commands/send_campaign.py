@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from users.campaigns import recipients, run_campaign
+from users.models import EmailCampaign, University, User
+
+
+class Command(BaseCommand):
+    help = 'Email an announcement to verified users, optionally by university and role; rerun to resume'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Campaign name, used to resume an interrupted run')
+        parser.add_argument('--subject', help='Email subject (new campaigns)')
+        parser.add_argument('--message', help='Message text (new campaigns)')
+        parser.add_argument('--message-file', help='Read the message text from this file')
+        parser.add_argument('--university', type=int, help='University id to target')
+        parser.add_argument(
+            '--role',
+            choices=[role for role, _ in User.ROLE_CHOICES],
+            help='Only users with this role',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Parallel connections to the mail server',
+            default=4,
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='Maximum messages per second across all workers (0 for no cap)',
+            default=10,
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Recipients rendered and checkpointed together',
+            default=200,
+        )
+        parser.add_argument('--limit', type=int, help='Stop after this many recipients in this run')
+
+    def handle(self, *args, **options):
+        campaign = EmailCampaign.objects.filter(name=options['name']).first()
+        if campaign is None:
+            message = options['message']
+            if options['message_file']:
+                with open(options['message_file'], encoding='utf-8') as fh:
+                    message = fh.read()
+            if not options['subject'] or not message:
+                raise CommandError('A new campaign needs --subject and --message or --message-file.')
+            if options['university'] and not University.objects.filter(id=options['university']).exists():
+                raise CommandError(f"University {options['university']} does not exist.")
+            campaign = EmailCampaign.objects.create(
+                name=options['name'],
+                subject=options['subject'],
+                message=message,
+                filters={'university': options['university'], 'role': options['role']},
+            )
+        elif campaign.finished_at:
+            self.stdout.write(f'Campaign "{campaign.name}" already finished ({campaign.sent} sent).')
+            return
+        else:
+            self.stdout.write(f'Resuming "{campaign.name}" after user {campaign.last_user_id} '
+                              f'(subject, message and filters from the first run).')
+
+        remaining = recipients(campaign.filters, campaign.last_user_id, campaign.handled_ids).count()
+        self.stdout.write(f"{remaining} recipients to go.")
+        try:
+            finished = run_campaign(
+                campaign,
+                workers=options['workers'],
+                rate=options['rate'],
+                batch_size=options['batch_size'],
+                limit=options['limit'],
+            )
+        finally:
+            self.stdout.write(f"Sent {campaign.sent}, failed {campaign.failed}.")
+        if finished:
+            self.stdout.write(self.style.SUCCESS(f'Campaign "{campaign.name}" finished.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Campaign "{campaign.name}" stopped early; run again to resume.'))
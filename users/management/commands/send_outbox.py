@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from users import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox, one connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Emails sent per connection',
+            default=100,
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling the outbox every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Seconds to sleep between polls when nothing is due (with --loop)',
+            default=5,
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = outbox.send_batch(options['batch_size'])
+                if not sent and not failed:
+                    break
+                total_sent += sent
+                total_failed += failed
+            if total_sent or total_failed:
+                self.stdout.write(f"Sent {total_sent} emails, {total_failed} failed (will retry).")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
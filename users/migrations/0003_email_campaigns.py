@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
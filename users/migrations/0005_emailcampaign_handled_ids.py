@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailcampaign',
+            name='handled_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
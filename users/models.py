@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+import uuid
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
@@ -170,4 +172,99 @@ class CampusAdminProfile(models.Model):
     admin_role = models.CharField(max_length=100)
 
     def __str__(self):
-        return f"{self.user.full_name} - {self.university} ({self.admin_role})"
\ No newline at end of file
+        return f"{self.user.full_name} - {self.university} ({self.admin_role})"
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email, written in the request transaction and delivered by the
+    ``send_outbox`` worker (see users/outbox.py).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('outgoing email')
+        verbose_name_plural = _('email outbox')
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class EmailCampaign(models.Model):
+    """
+    Progress of a ``send_campaign`` run. Recipients are processed in id
+    order: everyone up to ``last_user_id`` has been handled, and so have the
+    ids in ``handled_ids`` (sends that completed after an earlier one in
+    their batch could not be attempted), so a resume re-sends to no one.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    filters = models.JSONField(default=dict, blank=True)
+    last_user_id = models.BigIntegerField(default=0)
+    handled_ids = models.JSONField(default=list, blank=True)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ChunkedUpload(models.Model):
+    """
+    A verification document being uploaded in pieces (see users/uploads.py).
+    Bytes are appended to a temporary file until ``offset`` reaches
+    ``size``; completing the upload checks ``sha256`` and attaches the file
+    to the user's merchant or tutor profile.
+    """
+    TARGET_BUSINESS_DOCS = 'business_docs'
+    TARGET_EDU_DOCS = 'edu_docs'
+    TARGET_CHOICES = [
+        (TARGET_BUSINESS_DOCS, 'Merchant business documents'),
+        (TARGET_EDU_DOCS, 'Tutor education documents'),
+    ]
+    # Profile relation holding the FileField named by ``target``
+    TARGET_PROFILES = {
+        TARGET_BUSINESS_DOCS: 'merchant_profile',
+        TARGET_EDU_DOCS: 'tutor_profile',
+    }
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='chunked_uploads')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    def get_profile(self):
+        return getattr(self.user, self.TARGET_PROFILES[self.target], None)
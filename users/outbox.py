@@ -0,0 +1,103 @@
+"""
+Transactional email outbox.
+
+Request code calls ``queue_email`` instead of talking to SMTP: the message
+is stored as an EmailOutbox row in the same transaction as the change that
+caused it, so it is sent only if that change commits. The ``send_outbox``
+worker claims due rows in batches, delivers each batch over one backend
+connection and reschedules failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, body, to, html_body='', from_email=None):
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 3600))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due emails by pushing their next attempt into
+    the future, so the SMTP work happens outside any transaction and a
+    crashed worker's rows become due again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if rows:
+            lease = now + timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 300))
+            EmailOutbox.objects.filter(id__in=[row.id for row in rows]).update(next_attempt_at=lease)
+    return rows
+
+
+def build_message(row, connection):
+    message = EmailMultiAlternatives(
+        row.subject, row.body, from_email=row.from_email, to=row.to, connection=connection,
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    return message
+
+
+def send_batch(batch_size=100, connection=None):
+    """
+    Deliver one batch of due emails. Returns ``(sent, failed)`` counts; an
+    empty batch returns ``(0, 0)``.
+    """
+    rows = claim_batch(batch_size)
+    if not rows:
+        return 0, 0
+
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+    sent = failed = 0
+    try:
+        # One connection for the whole batch
+        with (connection or get_connection()) as connection:
+            for row in rows:
+                try:
+                    build_message(row, connection).send()
+                except Exception as e:
+                    row.attempts += 1
+                    row.last_error = str(e)
+                    if row.attempts >= max_attempts:
+                        row.status = EmailOutbox.STATUS_FAILED
+                        logger.error(f"Giving up on email {row.id} to {row.to}: {str(e)}")
+                    else:
+                        row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+                    row.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+                    failed += 1
+                    continue
+                row.status = EmailOutbox.STATUS_SENT
+                row.sent_at = timezone.now()
+                row.attempts += 1
+                row.save(update_fields=['status', 'sent_at', 'attempts'])
+                sent += 1
+    except Exception as e:
+        # Could not open the connection: rows not yet attempted keep their
+        # lease and are retried when it expires.
+        logger.error(f"Email outbox connection failed: {str(e)}")
+    return sent, failed
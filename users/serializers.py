@@ -1,10 +1,15 @@
 from rest_framework import serializers
+from django.conf import settings
+import os
+import re
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from .models import University
 from .utils import validate_password_strength
-from .models import StudentProfile, MerchantProfile, TutorProfile, CampusAdminProfile
+from .models import StudentProfile, MerchantProfile, TutorProfile, CampusAdminProfile, ChunkedUpload
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
@@ -183,4 +188,62 @@ class TutorProfileSerializer(serializers.ModelSerializer):
 class CampusAdminProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = CampusAdminProfile
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class UserFullProfileSerializer(UserProfileSerializer):
+    """
+    The user with university and every role profile, for app startup.
+    Expects the relations to be loaded with select_related.
+    """
+    student_profile = StudentProfileSerializer(read_only=True)
+    merchant_profile = MerchantProfileSerializer(read_only=True)
+    tutor_profile = TutorProfileSerializer(read_only=True)
+    campus_admin_profile = CampusAdminProfileSerializer(read_only=True)
+
+    class Meta(UserProfileSerializer.Meta):
+        fields = UserProfileSerializer.Meta.fields + [
+            'student_profile', 'merchant_profile', 'tutor_profile', 'campus_admin_profile',
+        ]
+
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that checks and records rotated tokens in the in-memory blacklist
+    """
+    token_class = CachedBlacklistRefreshToken
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'target', 'filename', 'size', 'sha256', 'offset', 'created_at']
+        read_only_fields = ['id', 'offset', 'created_at']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        extension = value.rsplit('.', 1)[-1].lower() if '.' in value else ''
+        if extension not in settings.CHUNKED_UPLOAD_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Allowed file types: {', '.join(settings.CHUNKED_UPLOAD_EXTENSIONS)}."
+            )
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size must be between 1 byte and {settings.CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)} MB."
+            )
+        return value
+
+    def validate_sha256(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest.")
+        return value.lower()
+
+    def validate(self, attrs):
+        upload = ChunkedUpload(user=self.context['request'].user, target=attrs['target'])
+        if upload.get_profile() is None:
+            raise serializers.ValidationError(
+                {'target': f"Create your {upload.TARGET_PROFILES[attrs['target']].replace('_', ' ')} first."}
+            )
+        return attrs
@@ -1,11 +1,12 @@
 from django.dispatch import receiver
 from django.urls import reverse
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django_rest_passwordreset.signals import reset_password_token_created
-from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
-from .models import User
+from .models import User, University
+from . import university_index, email_templates
+from .user_cache import invalidate_user
+from .outbox import queue_email
 
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
@@ -22,19 +23,37 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
         'site_name': 'UniBazzar',
     }
 
-    # Render email templates
-    email_html_message = render_to_string('users/email_reset_password.html', context)
-    email_plaintext_message = render_to_string('users/email_reset_password.txt', context)
+    # Render email templates (compiled once per process)
+    subject, email_plaintext_message, email_html_message = email_templates.render('password_reset', context)
 
-    # Send email
-    msg = EmailMultiAlternatives(
-        subject="Password Reset for UniBazzar",
-        body=email_plaintext_message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[reset_password_token.user.email]
+    # Queue email (delivered by the send_outbox worker)
+    queue_email(
+        subject,
+        email_plaintext_message,
+        [reset_password_token.user.email],
+        html_body=email_html_message,
     )
-    msg.attach_alternative(email_html_message, "text/html")
-    msg.send()
+
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=University)
+def invalidate_university_index(sender, instance, **kwargs):
+    """
+    Drop the in-memory university search index (in every worker) so it is rebuilt on next use
+    """
+    university_index.invalidate()
+    # Again once the write is visible, so a worker that rebuilt mid-transaction does not keep the old names
+    transaction.on_commit(university_index.invalidate)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cached copy used by CachedJWTAuthentication (covers is_active changes)
+    """
+    pk = instance.pk
+    invalidate_user(pk)
+    # Again after commit: a request may have re-cached the old row in between
+    transaction.on_commit(lambda: invalidate_user(pk))
 
 # Removed Supabase sync signal handler
 # @receiver(post_save, sender=User)
@@ -1,10 +1,43 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import checks, mail
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
-from .models import University
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import CachedJWTAuthentication
+from unibazzar.middleware import local_buckets
+from .models import University, EmailOutbox, EmailCampaign, ChunkedUpload, MerchantProfile, StudentProfile
+from .outbox import queue_email, send_batch
+from . import campaigns, email_templates, university_index
+from .university_index import resolve_university_names
+from .user_cache import cache_key, cache_user, invalidate_user
+from .token_blacklist import blacklisted
+from .tokens import CachedBlacklistRefreshToken
+import hashlib
+import io
 import json
+import os
+import shutil
+import tempfile
+import time
+from PIL import Image
+from io import StringIO
 
 User = get_user_model()
 
@@ -167,4 +200,889 @@ class UniversityListTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2) # Assuming pagination is enabled
         self.assertEqual(response.data['results'][0]['name'], "Test University 1")
-        self.assertEqual(response.data['results'][1]['name'], "Test University 2")
\ No newline at end of file
+        self.assertEqual(response.data['results'][1]['name'], "Test University 2")
+
+class UniversitySearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('users:university-list')
+        self.aau = University.objects.create(name="Addis Ababa University")
+        self.aastu = University.objects.create(name="Addis Ababa Science and Technology University")
+        self.bdu = University.objects.create(name="Bahir Dar University")
+        self.unam = University.objects.create(name="Universidad Nacional Autónoma de México")
+
+    def search(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['name'] for result in response.data['results']]
+
+    def test_prefix_search(self):
+        """Test that name prefixes rank before later-word prefixes"""
+        self.assertEqual(self.search('bahir')[0], "Bahir Dar University")
+        self.assertEqual(self.search('dar'), ["Bahir Dar University"])
+
+    def test_accent_and_case_insensitive(self):
+        """Test that accents and case are ignored"""
+        self.assertEqual(self.search('AUTONOMA'), ["Universidad Nacional Autónoma de México"])
+
+    def test_fuzzy_search(self):
+        """Test that misspelled queries still find the university"""
+        self.assertEqual(self.search('adis abeba univercity')[0], "Addis Ababa University")
+
+    def test_index_invalidated_on_save(self):
+        """Test that new universities are searchable immediately"""
+        self.search('jimma')
+        University.objects.create(name="Jimma University")
+        self.assertEqual(self.search('jimma'), ["Jimma University"])
+
+    @override_settings(UNIVERSITY_INDEX_CHECK_INTERVAL=0)
+    def test_rebuilt_when_another_process_bumps_version(self):
+        """Test that the index follows the shared version key, not just this process's signals"""
+        self.search('jimma')
+        University.objects.bulk_create([University(name="Jimma University")])  # sends no signals
+        self.assertEqual(self.search('jimma'), [])
+        cache.set(university_index.VERSION_KEY, 'bumped by another worker')
+        self.assertEqual(self.search('jimma'), ["Jimma University"])
+
+    def test_resolve_names_in_bulk(self):
+        """Test mapping free-text names to university ids"""
+        resolved = resolve_university_names([
+            'addis ababa university', 'Bahir-Dar Universty', 'Addis Ababa', 'Unknown College',
+        ])
+        self.assertEqual(resolved['addis ababa university'], self.aau.id)
+        self.assertEqual(resolved['Bahir-Dar Universty'], self.bdu.id)
+        self.assertIsNone(resolved['Addis Ababa'])  # ambiguous prefix
+        self.assertIsNone(resolved['Unknown College'])
+
+
+    def test_async_search_matches_sync(self):
+        """Test that the async university list (ASGI path) returns the same results"""
+        async def get(params):
+            return await self.async_client.get(self.url, params)
+
+        for params in ({}, {'q': 'addis'}):
+            expected = self.client.get(self.url, params).json()
+            with self.settings(ROOT_URLCONF='unibazzar.urls_async', RATELIMIT_ENABLED=False):
+                response = async_to_sync(get)(params)
+            self.assertEqual(response.json(), expected)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cached@example.com',
+            password='Test@123',
+            full_name='Cached User',
+            role='student',
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.factory = APIRequestFactory()
+        self.auth = CachedJWTAuthentication()
+        invalidate_user(self.user.pk)
+
+    def authenticate(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return self.auth.authenticate(request)[0]
+
+    def test_repeat_requests_skip_database(self):
+        """Test that only the first request loads the user row"""
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.email, 'cached@example.com')
+
+    def test_returns_independent_copies(self):
+        """Test that mutating request.user does not alter the cached user"""
+        self.authenticate().full_name = 'Changed'
+        self.assertEqual(self.authenticate().full_name, 'Cached User')
+
+    def test_save_invalidates_cache(self):
+        """Test that profile changes are visible on the next request"""
+        self.authenticate()
+        self.user.full_name = 'Renamed User'
+        self.user.save()
+        self.assertEqual(self.authenticate().full_name, 'Renamed User')
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a cached user blocks further requests"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_cache_outage_loads_from_database(self):
+        """Test that authentication still works when the shared cache is down"""
+        with mock.patch('users.user_cache.cache.get', side_effect=ConnectionError), \
+                mock.patch('users.user_cache.cache.set', side_effect=ConnectionError), \
+                mock.patch('users.user_cache.cache.delete', side_effect=ConnectionError):
+            self.assertEqual(self.authenticate(), self.user)
+            self.user.save()
+
+    def test_password_hash_not_cached(self):
+        """Test that the cache holds a projection without the password hash"""
+        self.authenticate()
+        self.assertNotIn(self.user.password, str(cache.get(cache_key(self.user.pk))))
+        user = self.authenticate()
+        self.assertIn('password', user.get_deferred_fields())
+        user.full_name = 'Saved From Cache'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Test@123'))
+
+    def test_invalidated_again_on_commit(self):
+        """Test that a row re-cached before the save commits is dropped after it"""
+        stale = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.full_name = 'Renamed User'
+            self.user.save()
+            cache_user(stale)  # a concurrent request reading the uncommitted-over row
+        self.assertEqual(self.authenticate().full_name, 'Renamed User')
+
+    def test_match_university_names_invalidates(self):
+        """Test that linking universities with update() drops the cached users"""
+        university = University.objects.create(name='Addis Ababa University')
+        StudentProfile.objects.create(user=self.user, university_id='AAU-1', university_name='Addis Ababa University')
+        self.authenticate()
+        call_command('match_university_names', '--apply', stdout=StringIO())
+        self.assertEqual(self.authenticate().university_id, university.id)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklisted.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='tokens@example.com',
+            password='Test@123',
+            full_name='Token User',
+            role='student',
+        )
+        self.refresh = CachedBlacklistRefreshToken.for_user(self.user)
+
+    def test_rotated_token_rejected(self):
+        """Test that a refresh token cannot be reused after rotation"""
+        url = reverse('token_refresh')
+        response = self.client.post(url, {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data)
+        response = self.client.post(url, {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_check_uses_memory(self):
+        """Test that blacklist checks do not query the database once loaded"""
+        self.refresh.blacklist()
+        fresh = CachedBlacklistRefreshToken.for_user(self.user)
+        with self.assertNumQueries(0):
+            fresh.check_blacklist()
+            with self.assertRaises(TokenError):
+                self.refresh.check_blacklist()
+
+    def test_loaded_from_table(self):
+        """Test that tokens blacklisted elsewhere are picked up on load"""
+        RefreshToken(str(self.refresh)).blacklist()
+        cache.clear()
+        blacklisted.reset()
+        with self.assertRaises(TokenError):
+            CachedBlacklistRefreshToken(str(self.refresh))
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0)
+    def test_sync_picks_up_rows_committed_out_of_id_order(self):
+        """Test that a row with a lower id than one already synced is still loaded"""
+        later = CachedBlacklistRefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(id=1000, token=OutstandingToken.objects.get(jti=later['jti']))
+        self.assertIn(later['jti'], blacklisted)
+        BlacklistedToken.objects.create(id=5, token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+        self.assertIn(self.refresh['jti'], blacklisted)
+
+    def test_prune_expired_tokens(self):
+        """Test that the prune command only removes expired tokens"""
+        self.refresh.blacklist()
+        expired = CachedBlacklistRefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+        call_command('prune_tokens', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [self.refresh['jti']])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='backend@example.com',
+            password='Test@123',
+            full_name='Backend User',
+            role='student',
+        )
+
+    def count_hashes(self, **credentials):
+        with mock.patch('django.contrib.auth.base_user.check_password', wraps=check_password) as checked, \
+                mock.patch('django.contrib.auth.base_user.make_password', wraps=make_password) as made:
+            user = authenticate(None, **credentials)
+        return user, checked.call_count + made.call_count
+
+    def test_valid_login(self):
+        """Test that email and username credentials both authenticate"""
+        self.assertEqual(authenticate(None, email='backend@example.com', password='Test@123'), self.user)
+        self.assertEqual(authenticate(None, username='backend@example.com', password='Test@123'), self.user)
+
+    def test_wrong_password_hashes_once(self):
+        """Test that a wrong password costs one lookup and one hash check"""
+        with self.assertNumQueries(1):
+            user, hashes = self.count_hashes(email='backend@example.com', password='wrong')
+        self.assertIsNone(user)
+        self.assertEqual(hashes, 1)
+
+    def test_unknown_email_hashes_once(self):
+        """Test that unknown emails still pay for exactly one hash"""
+        user, hashes = self.count_hashes(email='nobody@example.com', password='Test@123')
+        self.assertIsNone(user)
+        self.assertEqual(hashes, 1)
+
+    def test_inactive_user_rejected(self):
+        """Test that inactive users cannot log in"""
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(None, email='backend@example.com', password='Test@123'))
+
+    def test_authenticate_is_timed(self):
+        """Test that each backend logs how long authenticate() took"""
+        with self.assertLogs('users.backends', 'DEBUG') as logs:
+            authenticate(None, email='backend@example.com', password='Test@123')
+            authenticate(None, email='backend@example.com', password='wrong')
+            authenticate(None, token='unsupported')
+        self.assertRegex(logs.output[0], r'EmailBackend\.authenticate: success in [\d.]+ ms')
+        self.assertRegex(logs.output[1], r'EmailBackend\.authenticate: denied in')
+        self.assertTrue(any('AllauthBackend.authenticate: no match' in line for line in logs.output[2:]))
+
+
+@override_settings(RATELIMIT_RULES=[
+    {'name': 'login', 'path': '/api/users/login/', 'methods': ['POST'], 'per': 'ip', 'rate': '2/m', 'burst': 2},
+    {'name': 'api-anon', 'path': '/api/', 'per': 'anon', 'rate': '3/m', 'burst': 3},
+    {'name': 'api-user', 'path': '/api/', 'per': 'user', 'rate': '5/m', 'burst': 5},
+])
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        self.client = APIClient()
+        self.login_url = reverse('users:login')
+        self.universities_url = reverse('users:university-list')
+
+    def login(self):
+        return self.client.post(self.login_url, {'email': 'nobody@example.com', 'password': 'x'}, format='json')
+
+    def test_endpoint_limit(self):
+        """Test that the login limit rejects extra attempts without touching the database"""
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_authenticated_users_have_own_bucket(self):
+        """Test that a JWT user is not limited by the anonymous bucket of their IP"""
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.universities_url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.universities_url).status_code, 429)
+
+        user = User.objects.create_user(email='limits@example.com', password='Test@123', full_name='L', role='student')
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.universities_url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.universities_url).status_code, 429)
+
+    def test_falls_back_to_process_buckets(self):
+        """Test that limits still apply when the shared cache is unavailable"""
+        with mock.patch('unibazzar.middleware.cache.add', side_effect=ConnectionError):
+            self.login()
+            self.login()
+            self.assertEqual(self.login().status_code, 429)
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_registration_queues_email(self):
+        """Test that registering stores the verification email instead of sending it"""
+        response = self.client.post(reverse('users:register'), {
+            'full_name': 'Outbox User',
+            'email': 'outbox@example.com',
+            'password': 'Test@123',
+            'confirm_password': 'Test@123',
+            'role': 'student',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.to, ['outbox@example.com'])
+        self.assertIn('/api/users/verify-email/', queued.body)
+
+    def test_worker_sends_batch_over_one_connection(self):
+        """Test that send_outbox delivers due emails and marks them sent"""
+        for i in range(3):
+            queue_email('Hello', 'Body', [f'user{i}@example.com'], html_body='<p>Body</p>')
+        with mock.patch('users.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body</p>', 'text/html')])
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.STATUS_SENT).exists())
+
+    def test_failed_send_retried_with_backoff(self):
+        """Test that failures are rescheduled and eventually given up"""
+        queued = queue_email('Hello', 'Body', ['user@example.com'])
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('refused')):
+            self.assertEqual(send_batch(), (0, 1))
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, 1)
+            self.assertGreater(queued.next_attempt_at, timezone.now())
+            self.assertEqual(send_batch(), (0, 0))  # not due yet
+
+            with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2):
+                EmailOutbox.objects.update(next_attempt_at=timezone.now())
+                send_batch()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.STATUS_FAILED)
+        self.assertEqual(queued.last_error, 'refused')
+
+
+class EmailTemplateRegistryTests(TestCase):
+    def setUp(self):
+        email_templates.reset()
+        self.context = {
+            'full_name': 'Abebe <Kebede>',
+            'reset_password_url': 'https://example.com/reset/?token=abc',
+            'site_name': 'UniBazzar',
+        }
+
+    def test_matches_render_to_string(self):
+        """Test that compiled rendering gives the same output as render_to_string"""
+        subject, text, html = email_templates.render('password_reset', self.context)
+        self.assertEqual(subject, 'Password Reset for UniBazzar')
+        self.assertEqual(text, render_to_string('users/email_reset_password.txt', self.context))
+        self.assertEqual(html, render_to_string('users/email_reset_password.html', self.context))
+        self.assertIn('Abebe &lt;Kebede&gt;', html)
+
+    def test_templates_loaded_once(self):
+        """Test that templates are resolved once and batches only render fields"""
+        engine = engines['django']
+        with mock.patch.object(engine, 'get_template', wraps=engine.get_template) as get_template:
+            rendered = list(email_templates.render_many(
+                'password_reset',
+                [{'full_name': f'User {i}', 'reset_password_url': f'/r/{i}'} for i in range(50)],
+                shared={'site_name': 'UniBazzar'},
+            ))
+            email_templates.render('password_reset', self.context)
+        self.assertEqual(get_template.call_count, 2)  # html + txt
+        self.assertIn('User 49', rendered[49][1])
+        self.assertNotIn('User 48', rendered[49][1])
+
+
+class EmailCampaignTests(TestCase):
+    def setUp(self):
+        self.aau = University.objects.create(name="Addis Ababa University")
+        other = University.objects.create(name="Bahir Dar University")
+        for i in range(5):
+            User.objects.create(email=f'aau{i}@example.com', full_name=f'AAU {i}', role='student',
+                                university=self.aau, is_email_verified=True)
+        User.objects.create(email='tutor@example.com', full_name='Tutor', role='tutor',
+                            university=self.aau, is_email_verified=True)
+        User.objects.create(email='unverified@example.com', full_name='New', role='student',
+                            university=self.aau, is_email_verified=False)
+        User.objects.create(email='bdu@example.com', full_name='BDU', role='student',
+                            university=other, is_email_verified=True)
+
+    def run_campaign(self, **options):
+        options = dict({'subject': 'Campus fair', 'message': 'See you on Friday.', 'university': self.aau.id,
+                        'role': 'student', 'rate': 0, 'batch_size': 2}, **options)
+        out = StringIO()
+        call_command('send_campaign', 'fair', stdout=out, **options)
+        return out.getvalue()
+
+    def test_sends_to_filtered_recipients(self):
+        """Test that only verified users matching university and role are emailed"""
+        self.run_campaign()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'aau{i}@example.com' for i in range(5)])
+        self.assertIn('See you on Friday.', mail.outbox[0].body)
+        self.assertIn('AAU', mail.outbox[0].alternatives[0][0])
+        campaign = EmailCampaign.objects.get(name='fair')
+        self.assertEqual(campaign.sent, 5)
+        self.assertIsNotNone(campaign.finished_at)
+
+        self.run_campaign()
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_resume_without_duplicates(self):
+        """Test that an interrupted campaign continues after its checkpoint"""
+        self.run_campaign(limit=3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIsNone(EmailCampaign.objects.get(name='fair').finished_at)
+        self.run_campaign()
+        recipients = [m.to[0] for m in mail.outbox]
+        self.assertEqual(len(recipients), 5)
+        self.assertEqual(len(set(recipients)), 5)
+
+    def test_unreachable_server_keeps_checkpoint(self):
+        """Test that recipients are not skipped when no connection can be made"""
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('down'), create=True):
+            self.run_campaign()
+        campaign = EmailCampaign.objects.get(name='fair')
+        self.assertEqual((campaign.last_user_id, campaign.sent), (0, 0))
+        self.run_campaign()
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_resume_after_gap_without_duplicates(self):
+        """Test that sends completed after an unattempted one are not repeated"""
+        send_one = campaigns.send_one
+
+        def flaky_send(pool, limiter, to, *args):
+            if to == 'aau1@example.com':
+                return None  # no connection for this one
+            return send_one(pool, limiter, to, *args)
+
+        with mock.patch('users.campaigns.send_one', side_effect=flaky_send):
+            self.run_campaign(batch_size=5)
+        campaign = EmailCampaign.objects.get(name='fair')
+        self.assertEqual(campaign.sent, 4)
+        self.assertEqual(campaign.last_user_id, User.objects.get(email='aau0@example.com').id)
+        self.assertIsNone(campaign.finished_at)
+
+        output = self.run_campaign(batch_size=5)
+        self.assertIn('1 recipients to go.', output)
+        recipients = [m.to[0] for m in mail.outbox]
+        self.assertEqual(sorted(recipients), [f'aau{i}@example.com' for i in range(5)])
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.sent, campaign.handled_ids), (5, []))
+        self.assertIsNotNone(campaign.finished_at)
+
+
+class ProfilePictureUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.url = reverse('users:profile_picture')
+        self.user = User.objects.create_user(
+            email='avatar@example.com', password='Test@123', full_name='Avatar User', role='student',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def image_upload(self, size=(2000, 1500), name='photo.jpg'):
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'
+        exif[0x0112] = 6  # rotated 90 degrees
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_normalized(self):
+        """Test that uploads are downscaled, oriented, stripped and stored as WebP"""
+        response = self.client.post(self.url, {'profile_picture': self.image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_picture.name.endswith('.webp'))
+        with Image.open(self.user.profile_picture.path) as stored:
+            self.assertEqual(stored.format, 'WEBP')
+            self.assertEqual(stored.size, (384, 512))  # EXIF rotation applied
+            self.assertFalse(stored.info.get('exif'))
+            self.assertFalse(stored.getexif())
+
+    def test_replacing_deletes_old_file_after_commit(self):
+        """Test that the previous picture is deleted in the background"""
+        self.client.post(self.url, {'profile_picture': self.image_upload()}, format='multipart')
+        self.user.refresh_from_db()
+        old_path = self.user.profile_picture.path
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(self.url, {'profile_picture': self.image_upload()}, format='multipart')
+        self.assertEqual(len(callbacks), 2)  # old file removal and user cache invalidation
+        deadline = time.monotonic() + 5
+        while os.path.exists(old_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(os.path.exists(old_path))
+        self.user.refresh_from_db()
+        self.assertTrue(os.path.exists(self.user.profile_picture.path))
+
+    def test_rejects_non_images(self):
+        """Test that files Pillow cannot decode are rejected"""
+        upload = SimpleUploadedFile('notes.jpg', b'not an image', content_type='image/jpeg')
+        response = self.client.post(self.url, {'profile_picture': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejects_oversized_upload(self):
+        """Test that the upload stops once it passes the size limit"""
+        with self.settings(AVATAR_MAX_UPLOAD_SIZE=1000):
+            response = self.client.post(self.url, {'profile_picture': self.image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_picture)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=os.path.join(self.tmp, 'media'),
+                                 CHUNKED_UPLOAD_DIR=os.path.join(self.tmp, 'chunks'))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='merchant@example.com', password='Test@123', full_name='Merchant', role='merchant',
+        )
+        self.profile = MerchantProfile.objects.create(
+            user=self.user, store_name='Shop', nearest_university='AAU', phone_number='0911', tin_number='1',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.content = os.urandom(250_000)
+
+    def start(self, content=None):
+        content = content or self.content
+        response = self.client.post(reverse('users:chunked_upload_create'), {
+            'target': 'business_docs',
+            'filename': 'license.pdf',
+            'size': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def send(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT', reverse('users:chunked_upload_chunk', args=[upload_id]), data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(reverse('users:chunked_upload_complete', args=[upload_id]))
+
+    def test_resumable_upload(self):
+        """Test uploading in chunks, resuming after a lost chunk and attaching the file"""
+        upload_id = self.start()
+        self.assertEqual(self.send(upload_id, 0, self.content[:100_000]).data['offset'], 100_000)
+
+        # Client lost track: a wrong offset is refused with the resume point
+        response = self.send(upload_id, 200_000, self.content[200_000:])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 100_000)
+        resume = self.client.get(reverse('users:chunked_upload_detail', args=[upload_id])).data['offset']
+
+        self.send(upload_id, resume, self.content[resume:])
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.profile.refresh_from_db()
+        with self.profile.business_docs.open('rb') as fh:
+            self.assertEqual(fh.read(), self.content)
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.tmp, 'chunks')), [])
+
+    def test_incomplete_upload_not_attached(self):
+        """Test that completing before all bytes arrive is refused"""
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:1000])
+        self.assertEqual(self.complete(upload_id).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checksum_mismatch_resets(self):
+        """Test that a corrupted file is rejected and the upload restarted"""
+        upload_id = self.start()
+        corrupted = bytes([self.content[0] ^ 1]) + self.content[1:]
+        self.send(upload_id, 0, corrupted)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['offset'], 0)
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.business_docs)
+
+    def test_requires_matching_profile(self):
+        """Test that tutor documents cannot be started without a tutor profile"""
+        response = self.client.post(reverse('users:chunked_upload_create'), {
+            'target': 'edu_docs', 'filename': 'degree.pdf', 'size': 10, 'sha256': '0' * 64,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django')
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.content = bytes(range(256)) * 40
+        os.makedirs(os.path.join(self.media_root, 'merchant_products'))
+        self.unique_name = 'merchant_products/0f8c2b6e4a1d4c3b9e7f5a2d1c0b9a8e.jpg'
+        for name in (self.unique_name, 'merchant_products/photo.jpg'):
+            with open(os.path.join(self.media_root, name), 'wb') as fh:
+                fh.write(self.content)
+
+    def test_full_response_and_cache_headers(self):
+        """Test that unique names are immutable and other names revalidate"""
+        response = self.client.get(f'/media/{self.unique_name}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get('/media/merchant_products/photo.jpg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertTrue(response['ETag'])
+
+    def test_conditional_request(self):
+        """Test that a matching If-None-Match gets 304 without a body"""
+        etag = self.client.get(f'/media/{self.unique_name}')['ETag']
+        response = self.client.get(f'/media/{self.unique_name}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_range_requests(self):
+        """Test that single byte ranges are served as 206 and bad ones as 416"""
+        response = self.client.get(f'/media/{self.unique_name}', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response = self.client.get(f'/media/{self.unique_name}', HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(f'/media/{self.unique_name}', HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_offload_to_proxy(self):
+        """Test that offload modes return only headers for the front proxy"""
+        with self.settings(MEDIA_SERVE_MODE='x-accel-redirect'):
+            response = self.client.get(f'/media/{self.unique_name}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.unique_name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with self.settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response = self.client.get(f'/media/{self.unique_name}')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.unique_name))
+
+    def test_missing_and_traversal(self):
+        """Test that missing files, paths outside MEDIA_ROOT and disabled mode give 404"""
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/merchant_products').status_code, status.HTTP_404_NOT_FOUND)
+        with self.settings(MEDIA_SERVE_MODE='none'):
+            self.assertEqual(self.client.get(f'/media/{self.unique_name}').status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_private_directories_not_public(self):
+        """Test that only the public upload directories are served without a check"""
+        os.makedirs(os.path.join(self.media_root, 'business_docs'))
+        with open(os.path.join(self.media_root, 'business_docs', 'licence.pdf'), 'wb') as fh:
+            fh.write(b'%PDF')
+        with open(os.path.join(self.media_root, 'notes.txt'), 'wb') as fh:
+            fh.write(b'x')
+        self.assertEqual(self.client.get('/media/notes.txt').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/media/merchant_products/../business_docs/licence.pdf')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_verification_documents_need_owner_or_staff(self):
+        """Test that verification documents go only to their owner or staff, uncached"""
+        os.makedirs(os.path.join(self.media_root, 'business_docs'))
+        with open(os.path.join(self.media_root, 'business_docs', 'licence.pdf'), 'wb') as fh:
+            fh.write(b'%PDF')
+        owner = User.objects.create_user(email='shop@example.com', password='Test@123', full_name='Shop', role='merchant')
+        MerchantProfile.objects.create(
+            user=owner, store_name='Shop', nearest_university='AAU', phone_number='0911',
+            tin_number='1', business_docs='business_docs/licence.pdf',
+        )
+        other = User.objects.create_user(email='other@example.com', password='Test@123', full_name='Other', role='merchant')
+        staff = User.objects.create_user(email='staff@example.com', password='Test@123', full_name='Staff', is_staff=True)
+        url = '/media/business_docs/licence.pdf'
+        client = APIClient()
+
+        self.assertEqual(client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        client.force_authenticate(user=other)
+        self.assertEqual(client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        for user in (owner, staff):
+            client.force_authenticate(user=user)
+            response = client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+            self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+        client.force_authenticate(user=other)
+        with self.settings(MEDIA_SERVE_MODE='x-accel-redirect'):
+            response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+
+class FullProfileTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('users:user_full_profile')
+        self.university = University.objects.create(name='Addis Ababa University')
+        self.user = User.objects.create_user(
+            email='full@example.com', password='Test@123', full_name='Full User',
+            role='merchant', university=self.university,
+        )
+        self.profile = MerchantProfile.objects.create(
+            user=self.user, store_name='Campus Books', nearest_university='AAU',
+            phone_number='0911', tin_number='123',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_single_query(self):
+        """Test that the user, university and profiles load in one query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['university_details']['name'], 'Addis Ababa University')
+        self.assertEqual(response.data['merchant_profile']['store_name'], 'Campus Books')
+        self.assertIsNone(response.data['student_profile'])
+
+    def test_etag(self):
+        """Test that an unchanged profile returns 304 and a changed one a new body"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.profile.store_name = 'Campus Books & More'
+        self.profile.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class LoadUniversitiesTests(TestCase):
+    def setUp(self):
+        self.existing = University.objects.create(name='Addis Ababa University')
+        handle, self.csv_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, self.csv_path)
+
+    def load(self, rows, header='university_name,location,website'):
+        with open(self.csv_path, 'w', encoding='utf-8') as fh:
+            fh.write(header + '\n' + '\n'.join(rows) + '\n')
+        out = StringIO()
+        call_command('load_universities', '--csv_path', self.csv_path, '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_bulk_upsert(self):
+        """Test that new names are created and existing ones updated in place"""
+        # Savepoint, one select, two insert batches, one update, release
+        with self.assertNumQueries(6):
+            output = self.load([
+                'Addis Ababa University,Addis Ababa,https://www.aau.edu.et',
+                'Bahir Dar University,Bahir Dar,',
+                'Jimma University,,not a url',
+                'Jimma University,Jimma,',
+                'Mekelle University,Mekelle,https://www.mu.edu.et',
+                ',,',
+            ])
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.location, 'Addis Ababa')
+        self.assertEqual(self.existing.website, 'https://www.aau.edu.et')
+        self.assertEqual(University.objects.count(), 4)
+        self.assertIsNone(University.objects.get(name='Jimma University').website)
+        self.assertIn('Processed 6 rows', output)
+        self.assertIn('1 updated', output)
+        self.assertIn('2 skipped', output)
+        self.assertIn('1 invalid websites', output)
+        self.assertIn('Successfully added 3 new universities.', output)
+        self.assertNotIn('already exists', output)
+
+    def test_overlong_values_ignored(self):
+        """Test that locations and websites longer than their columns are dropped and counted"""
+        output = self.load([
+            f"Haramaya University,{'x' * 256},https://www.haramaya.edu.et/{'a' * 200}",
+            f"{'y' * 256},Nowhere,",
+        ])
+        university = University.objects.get(name='Haramaya University')
+        self.assertEqual((university.location, university.website), (None, None))
+        self.assertIn('1 skipped', output)
+        self.assertIn('2 overlong locations/websites ignored', output)
+
+    def test_name_only_csv(self):
+        """Test that files without location and website columns still load"""
+        self.load(['Addis Ababa University', 'Haramaya University'], header='university_name')
+        self.assertEqual(
+            list(University.objects.values_list('name', flat=True)),
+            ['Addis Ababa University', 'Haramaya University'],
+        )
+        self.assertEqual(University.objects.filter(name='Addis Ababa University').count(), 1)
+
+
+class DatabaseConnectionBenchmarkTests(TestCase):
+    def test_persistent_connections_are_reused(self):
+        """Test that persistent mode opens one connection per thread instead of one per request"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        out = StringIO()
+        call_command(
+            'benchmark_db_connections', '--sqlite', os.path.join(directory, 'bench.sqlite3'),
+            '--threads', '3', '--requests', '10', stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('per-request  30 requests, 30 connections opened', output)
+        self.assertIn('persistent   30 requests, 3 connections opened', output)
+
+
+class OpenAPISchemaTests(TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.schema_dir, ignore_errors=True)
+        self.client = APIClient()
+
+    def test_committed_schema_is_current(self):
+        """Test that static/openapi matches the API (run generate_openapi_schema if this fails)"""
+        out = StringIO()
+        call_command('generate_openapi_schema', check=True, stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+    def test_generate_and_detect_stale(self):
+        """Test that the command writes both formats and the checks notice later changes"""
+        with self.settings(OPENAPI_SCHEMA_DIR=self.schema_dir):
+            self.assertEqual(
+                [error.id for error in checks.run_checks(tags=['openapi'], include_deployment_checks=True)],
+                ['unibazzar.E001', 'unibazzar.E001'],
+            )
+            call_command('generate_openapi_schema', stdout=StringIO())
+            with open(os.path.join(self.schema_dir, 'schema.json')) as f:
+                self.assertIn('/users/universities/', json.load(f)['paths'])
+            self.assertEqual(checks.run_checks(tags=['openapi'], include_deployment_checks=True), [])
+
+            with open(os.path.join(self.schema_dir, 'schema.yaml'), 'a') as f:
+                f.write('x-stale: true\n')
+            with self.assertRaisesMessage(CommandError, 'schema.yaml'):
+                call_command('generate_openapi_schema', check=True, stdout=StringIO())
+
+    def test_detects_stale_collected_copy(self):
+        """Test that the deploy check also compares the copies collectstatic serves"""
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        with self.settings(STATIC_ROOT=static_root):
+            errors = checks.run_checks(tags=['openapi'], include_deployment_checks=True)
+            self.assertEqual([error.id for error in errors], ['unibazzar.E002', 'unibazzar.E002'])
+            self.assertIn(os.path.join(static_root, 'openapi', 'schema.json'), errors[0].msg)
+
+            shutil.copytree(settings.OPENAPI_SCHEMA_DIR, os.path.join(static_root, 'openapi'))
+            self.assertEqual(checks.run_checks(tags=['openapi'], include_deployment_checks=True), [])
+
+    def test_docs_read_the_file(self):
+        """Test that the docs endpoints serve the precomputed file and point the UI at it"""
+        with open(os.path.join(self.schema_dir, 'schema.json'), 'w') as f:
+            f.write('{"swagger": "2.0", "paths": {}}')
+        with self.settings(OPENAPI_SCHEMA_DIR=self.schema_dir, RATELIMIT_ENABLED=False):
+            response = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, b'{"swagger": "2.0", "paths": {}}')
+            self.assertContains(self.client.get(reverse('schema-swagger-ui')), '/static/openapi/schema.json')
+            self.assertContains(self.client.get(reverse('schema-redoc')), '/static/openapi/schema.json')
@@ -0,0 +1,91 @@
+"""
+In-memory view of the refresh token blacklist.
+
+simplejwt checks the BlacklistedToken table on every refresh. Instead, each
+process keeps the JTIs of blacklisted, not yet expired tokens in a dict. It
+is loaded once from the table and then synced incrementally at most every
+``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds. Each sync re-reads the rows
+blacklisted since the previous one started, less
+``TOKEN_BLACKLIST_SYNC_MARGIN`` seconds: ids are not committed in order (a
+row with a lower id can commit after one with a higher id), but a row's
+blacklisted_at is set just before its short transaction commits. Tokens blacklisted through
+``CachedBlacklistRefreshToken`` are also written to the shared cache, so
+other workers reject them before their next sync.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+def cache_key(jti):
+    return f"jwt:blacklist:{jti}"
+
+
+class BlacklistedJTISet:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiry = None  # jti -> expiry timestamp
+        self._since = None  # blacklisted_at lower bound of the next sync
+        self._synced_at = 0.0
+
+    def _sync(self):
+        interval = getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 30)
+        now = time.monotonic()
+        if self._expiry is not None and now - self._synced_at < interval:
+            return
+        with self._lock:
+            if self._expiry is not None and now - self._synced_at < interval:
+                return
+            started = aware_utcnow()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=started)
+            if self._expiry is None:
+                self._expiry = {}
+            else:
+                margin = timedelta(seconds=getattr(settings, 'TOKEN_BLACKLIST_SYNC_MARGIN', 60))
+                rows = rows.filter(blacklisted_at__gte=self._since - margin)
+            for jti, expires_at in rows.values_list('token__jti', 'token__expires_at').iterator(chunk_size=2000):
+                self._expiry[jti] = expires_at.timestamp()
+            self._since = started
+            # Expired tokens fail signature checks anyway; drop them
+            cutoff = time.time()
+            for jti in [jti for jti, exp in self._expiry.items() if exp <= cutoff]:
+                del self._expiry[jti]
+            self._synced_at = now
+
+    def __contains__(self, jti):
+        self._sync()
+        return jti in self._expiry
+
+    def __len__(self):
+        self._sync()
+        return len(self._expiry)
+
+    def add(self, jti, expires_at):
+        self._sync()
+        with self._lock:
+            self._expiry[jti] = expires_at
+
+    def reset(self):
+        with self._lock:
+            self._expiry = None
+            self._synced_at = 0.0
+
+
+blacklisted = BlacklistedJTISet()
+
+
+def is_blacklisted(jti):
+    return jti in blacklisted or cache.get(cache_key(jti)) is not None
+
+
+def record_blacklisted(jti, expires_at):
+    """Mark ``jti`` blacklisted until ``expires_at`` (epoch seconds)."""
+    blacklisted.add(jti, expires_at)
+    timeout = int(expires_at - time.time())
+    if timeout > 0:
+        cache.set(cache_key(jti), 1, timeout=timeout)
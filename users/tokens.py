@@ -1,6 +1,12 @@
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 import six
 
+from .token_blacklist import is_blacklisted, record_blacklisted
+
 class EmailVerificationTokenGenerator(PasswordResetTokenGenerator):
     def _make_hash_value(self, user, timestamp):
         return (
@@ -8,4 +14,19 @@ class EmailVerificationTokenGenerator(PasswordResetTokenGenerator):
             six.text_type(user.is_email_verified)
         )
 
-email_verification_token = EmailVerificationTokenGenerator() 
\ No newline at end of file
+email_verification_token = EmailVerificationTokenGenerator()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check reads the in-memory JTI set
+    (users/token_blacklist.py) instead of querying BlacklistedToken
+    """
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        record_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        return result
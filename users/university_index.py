@@ -0,0 +1,196 @@
+"""
+Process-local search index over University names.
+
+Supports accent- and case-insensitive prefix matching plus fuzzy matching on
+character trigrams (the same padding scheme as Postgres' pg_trgm), so
+"adis abeba" still finds "Addis Ababa University". The index is built on
+first use. Saving or deleting a University (or ``load_universities``) bumps
+a version key in the shared cache; every worker compares its index against
+that key at most once every ``UNIVERSITY_INDEX_CHECK_INTERVAL`` seconds and
+rebuilds on change.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'users:university_index:version'
+
+_WORD_RE = re.compile(r'\w+')
+
+# Score bands: a match at the start of the name beats a match at the start of
+# a later word, which beats any fuzzy match (fuzzy scores are <= 1).
+SCORE_NAME_PREFIX = 3.0
+SCORE_WORD_PREFIX = 2.0
+
+FUZZY_THRESHOLD = 0.5
+RESOLVE_THRESHOLD = 0.6
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse punctuation/whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text.casefold()))
+
+
+def trigrams(norm):
+    grams = set()
+    for word in norm.split(' '):
+        if not word:
+            continue
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class UniversityIndex:
+    def __init__(self, rows):
+        """``rows`` is an iterable of ``(id, name)`` pairs."""
+        self.ids = []
+        self.norms = []
+        self._by_norm = {}
+        self._word_keys = []  # sorted (word suffix, position)
+        self._postings = {}   # trigram -> [position, ...]
+        self._gram_counts = []
+        for university_id, name in rows:
+            norm = normalize(name)
+            if not norm:
+                continue
+            pos = len(self.ids)
+            self.ids.append(university_id)
+            self.norms.append(norm)
+            self._by_norm.setdefault(norm, university_id)
+            words = norm.split(' ')
+            for i in range(len(words)):
+                self._word_keys.append((' '.join(words[i:]), pos))
+            grams = trigrams(norm)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(pos)
+        self._word_keys.sort()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, limit=20):
+        """Return ``[(university_id, score), ...]`` best match first."""
+        q = normalize(query)
+        if not q:
+            return []
+        scores = {}
+
+        i = bisect.bisect_left(self._word_keys, (q,))
+        while i < len(self._word_keys) and self._word_keys[i][0].startswith(q):
+            key, pos = self._word_keys[i]
+            score = SCORE_NAME_PREFIX if key == self.norms[pos] else SCORE_WORD_PREFIX
+            scores[pos] = max(scores.get(pos, 0), score)
+            i += 1
+
+        query_grams = trigrams(q)
+        if query_grams:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self._postings.get(gram, ()))
+            for pos, count in shared.items():
+                # Fraction of the query covered by the name, so a short query
+                # is not penalised for the rest of a long name.
+                coverage = count / len(query_grams)
+                if coverage < FUZZY_THRESHOLD or scores.get(pos, 0) >= 1:
+                    continue
+                similarity = count / (len(query_grams) + self._gram_counts[pos] - count)
+                scores[pos] = coverage * 0.9 + similarity * 0.1
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], self.norms[item[0]]))[:limit]
+        return [(self.ids[pos], round(score, 3)) for pos, score in best]
+
+    def resolve(self, text):
+        """Map one free-text name to a University id, or None."""
+        q = normalize(text)
+        if not q:
+            return None
+        if q in self._by_norm:
+            return self._by_norm[q]
+        matches = self.search(q, limit=2)
+        if not matches:
+            return None
+        best_id, best = matches[0]
+        if best >= SCORE_WORD_PREFIX:
+            # A prefix shared by several names ("addis ababa") is ambiguous.
+            runner_up = matches[1][1] if len(matches) > 1 else 0
+            return best_id if runner_up < best else None
+        return best_id if best >= RESOLVE_THRESHOLD else None
+
+
+_index = None
+_index_version = None
+_checked_at = float('-inf')
+_index_lock = threading.Lock()
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_index():
+    global _index, _index_version, _checked_at
+    interval = getattr(settings, 'UNIVERSITY_INDEX_CHECK_INTERVAL', 5)
+    index = _index
+    if index is not None and time.monotonic() - _checked_at < interval:
+        return index
+    from .models import University
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _checked_at < interval:
+            return _index
+        try:
+            version = current_version()
+        except Exception as e:
+            # Without the shared key, keep the index we have and look again next interval
+            logger.warning(f"University index version unavailable: {str(e)}")
+            version = _index_version if _index is not None else None
+        if _index is None or version != _index_version:
+            # The primary, not a replica: the index outlives the request that builds it
+            _index = UniversityIndex(University.objects.using('default').values_list('id', 'name').iterator())
+            _index_version = version
+        _checked_at = now
+        return _index
+
+
+def invalidate():
+    """Rebuild the index in every process (on their next check) and in this one now."""
+    global _index
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump the university index version: {str(e)}")
+    with _index_lock:
+        _index = None
+
+
+def search_universities(query, limit=20):
+    return get_index().search(query, limit)
+
+
+def resolve_university_names(names):
+    """
+    Map free-text university names (e.g. StudentProfile.university_name) to
+    University ids in bulk. Returns ``{name: id or None}``; each distinct
+    name is resolved once.
+    """
+    index = get_index()
+    return {name: index.resolve(name) for name in set(names)}
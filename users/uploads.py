@@ -0,0 +1,182 @@
+"""
+Upload handling for user images.
+
+``BoundedUploadHandler`` streams multipart files straight to a temporary
+file (never into memory) and stops reading once a size limit is passed.
+Avatars are then normalized: decoded and downscaled with Pillow,
+re-encoded without EXIF/ICC metadata, and stored as a compact WebP or JPEG.
+The work runs in a small shared thread pool so that a process never decodes
+more than a few large images at once; the request thread waits for its
+result. Replaced files are deleted in the same pool, in the background,
+after the database change commits.
+
+Verification documents use resumable chunked uploads (ChunkedUpload):
+each chunk is streamed from the request onto the end of a file in
+``CHUNKED_UPLOAD_DIR``, and the finished file is checksummed and moved into
+storage, so memory use does not depend on the file size. Uploads left
+idle for ``CHUNKED_UPLOAD_EXPIRY_HOURS`` are removed by ``gc_media``.
+"""
+import hashlib
+import io
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AVATAR_WORKERS', 2), thread_name_prefix='uploads',
+)
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Temporary-file upload handler that aborts uploads over ``max_bytes``."""
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def _encode_avatar(uploaded):
+    max_size = getattr(settings, 'AVATAR_MAX_DIMENSION', 512)
+    max_pixels = getattr(settings, 'AVATAR_MAX_PIXELS', 40_000_000)
+    image_format = getattr(settings, 'AVATAR_FORMAT', 'WEBP').upper()
+
+    uploaded.seek(0)
+    try:
+        image = Image.open(uploaded)
+        if image.width * image.height > max_pixels:
+            raise ImageRejected('Image dimensions are too large.')
+        # Let the JPEG decoder scale down by up to 8x while decoding
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageRejected(f'Upload a valid image. {str(e)}')
+
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    if image_format == 'JPEG' or not has_alpha:
+        image = image.convert('RGB')
+    elif image.mode != 'RGBA':
+        image = image.convert('RGBA')
+
+    # Drop EXIF, ICC and comments so the stored file carries no metadata
+    image.info = {}
+    output = io.BytesIO()
+    image.save(output, format=image_format, quality=getattr(settings, 'AVATAR_QUALITY', 82), optimize=True)
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    return ContentFile(output.getvalue(), name=f"{uuid.uuid4()}.{extension}")
+
+
+def normalize_avatar(uploaded):
+    """
+    Return a ContentFile with the downscaled, metadata-free avatar. Raises
+    ImageRejected if the upload is not a usable image. Blocks until a pool
+    worker is free, which bounds concurrent decodes.
+    """
+    return executor.submit(_encode_avatar, uploaded).result()
+
+
+def _delete(storage, name):
+    try:
+        storage.delete(name)
+    except Exception as e:
+        logger.warning(f"Could not delete {name}: {str(e)}")
+
+
+def delete_later(name, storage=None):
+    """Delete a stored file in the background once the current transaction commits."""
+    if not name:
+        return
+    storage = storage or default_storage
+    transaction.on_commit(lambda: executor.submit(_delete, storage, name))
+
+
+COPY_BUFFER = 64 * 1024
+
+
+class ChunkRejected(ValueError):
+    pass
+
+
+class OffsetMismatch(ChunkRejected):
+    pass
+
+
+def chunk_path(upload):
+    directory = getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'chunked_uploads'))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{upload.id}.part")
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset`` and return the new
+    offset. The caller holds a row lock on ``upload``.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(f"Expected offset {upload.offset}.")
+    max_chunk = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK', 8 * 1024 * 1024)
+    if length <= 0 or length > max_chunk:
+        raise ChunkRejected(f"Chunks must be between 1 and {max_chunk} bytes.")
+    if offset + length > upload.size:
+        raise ChunkRejected("Chunk runs past the declared file size.")
+
+    path = chunk_path(upload)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+        # Overwrite whatever an interrupted earlier attempt left past the offset
+        fh.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(COPY_BUFFER, remaining))
+            if not data:
+                raise ChunkRejected("Request body ended before Content-Length bytes.")
+            fh.write(data)
+            remaining -= len(data)
+        fh.truncate()
+    return offset + length
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(COPY_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssembledFile(File):
+    """
+    A finished upload on local disk. Exposing ``temporary_file_path`` lets
+    FileSystemStorage move it into place instead of copying it.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def discard_chunks(upload):
+    try:
+        os.remove(chunk_path(upload))
+    except FileNotFoundError:
+        pass
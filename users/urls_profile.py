@@ -1,8 +1,9 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views_profile import (
-    UserProfileView, ProfilePictureUploadView, EmailChangeView,
-    PhoneNumberUpdateView, PasswordChangeView, StudentProfileViewSet, MerchantProfileViewSet, TutorProfileViewSet, CampusAdminProfileViewSet
+    UserProfileView, UserFullProfileView, ProfilePictureUploadView, EmailChangeView,
+    PhoneNumberUpdateView, PasswordChangeView, StudentProfileViewSet, MerchantProfileViewSet, TutorProfileViewSet, CampusAdminProfileViewSet,
+    ChunkedUploadCreateView, ChunkedUploadDetailView, ChunkedUploadChunkView, ChunkedUploadCompleteView
 )
 
 router = DefaultRouter()
@@ -14,10 +15,17 @@ router.register(r'campus-admin-profiles', CampusAdminProfileViewSet, basename='c
 urlpatterns = [
     # User profile
     path('me/', UserProfileView.as_view(), name='user_profile'),
+    path('me/full/', UserFullProfileView.as_view(), name='user_full_profile'),
     path('me/avatar/', ProfilePictureUploadView.as_view(), name='profile_picture'),
     path('me/email/', EmailChangeView.as_view(), name='change_email'),
     path('me/phone/', PhoneNumberUpdateView.as_view(), name='update_phone'),
     path('me/password/', PasswordChangeView.as_view(), name='change_password'),
+
+    # Resumable document uploads
+    path('me/uploads/', ChunkedUploadCreateView.as_view(), name='chunked_upload_create'),
+    path('me/uploads/<uuid:pk>/', ChunkedUploadDetailView.as_view(), name='chunked_upload_detail'),
+    path('me/uploads/<uuid:pk>/chunk/', ChunkedUploadChunkView.as_view(), name='chunked_upload_chunk'),
+    path('me/uploads/<uuid:pk>/complete/', ChunkedUploadCompleteView.as_view(), name='chunked_upload_complete'),
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Two-level cache of User rows for token authentication.
+
+A small per-process LRU with a short TTL absorbs bursts from the same user;
+behind it the shared Django cache holds users for a few minutes so other
+workers skip the database too. Entries are dropped on every User save or
+delete (see users/signals.py). If the shared cache is unreachable, users
+are loaded from the database as if they were not cached.
+
+Only a projection of the row is cached: the concrete field values minus the
+password hash, plus the digest simplejwt compares for revoked tokens.
+Callers get a fresh User built from it with ``password`` deferred, so a view
+that mutates request.user never touches the cache, and ``user.save()`` only
+writes the loaded fields.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_FIELDS = {'password'}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class LocalTTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTTLCache(
+    maxsize=_setting('AUTH_USER_LOCAL_CACHE_SIZE', 1024),
+    ttl=_setting('AUTH_USER_LOCAL_CACHE_TTL', 5),
+)
+
+
+def get_cached_user(user_id):
+    key = cache_key(user_id)
+    projection = local_cache.get(key)
+    if projection is None:
+        try:
+            projection = cache.get(key)
+        except Exception as e:
+            logger.warning(f"User cache unavailable, loading user {user_id} from the database: {str(e)}")
+            return None
+        if projection is None:
+            return None
+        local_cache.set(key, projection)
+    fields, password_digest = projection
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+    user.password_digest = password_digest
+    return user
+
+
+def cache_user(user):
+    projection = (
+        {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.attname not in EXCLUDED_FIELDS
+        },
+        get_md5_hash_password(user.password),
+    )
+    key = cache_key(user.pk)
+    try:
+        cache.set(key, projection, timeout=_setting('AUTH_USER_CACHE_TIMEOUT', 300))
+    except Exception as e:
+        logger.warning(f"Could not cache user {user.pk}: {str(e)}")
+    local_cache.set(key, projection)
+
+
+def invalidate_user(user_id):
+    """Call after changing users with queryset.update(), which sends no signals."""
+    key = cache_key(user_id)
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Could not drop cached user {user_id}: {str(e)}")
+    local_cache.pop(key)
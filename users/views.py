@@ -31,8 +31,9 @@ from .serializers import (
     EmailChangeSerializer, PhoneNumberUpdateSerializer, PasswordChangeSerializer,
     ResendVerificationEmailSerializer, UniversitySerializer
 )
-from .tokens import email_verification_token
+from .tokens import email_verification_token, CachedBlacklistRefreshToken
 from .utils import send_verification_email
+from .university_index import search_universities
 from .models import University, User
 
 User = get_user_model()
@@ -89,8 +90,8 @@ class UserRegistrationView(generics.CreateAPIView):
                 try:
                     with transaction.atomic():
                         user = serializer.save()
-                    # Send verification email outside transaction
-                    success, error_message = send_verification_email(user, request)
+                        # Queued with the user row, so it is only sent if registration commits
+                        success, error_message = send_verification_email(user, request)
                     response_data = {
                         'status': 'success',
                         'message': 'User registered successfully.',
@@ -295,7 +296,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh')
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
             
             return Response({
@@ -396,16 +397,36 @@ class ResendVerificationEmailView(APIView):
 class UniversityListView(generics.ListAPIView):
     """
     API endpoint to list all universities.
-    Uses pagination.
+    Uses pagination. With ?q= it returns the best prefix/fuzzy matches instead,
+    ranked by relevance and served from the in-memory university index.
     """
     queryset = University.objects.all()
     serializer_class = UniversitySerializer
     permission_classes = [permissions.AllowAny] # Allow anyone to view universities
     pagination_class = PageNumberPagination # Use standard pagination
+    max_search_results = 50
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return super().get_queryset()
+        matches = search_universities(query, limit=self.max_search_results)
+        universities = University.objects.in_bulk([university_id for university_id, _ in matches])
+        return [universities[university_id] for university_id, _ in matches if university_id in universities]
 
     @swagger_auto_schema(
         operation_summary="List Universities",
-        operation_description="Retrieve a paginated list of all universities.",
+        operation_description="Retrieve a paginated list of all universities, or search them by name with `q` "
+                              "(accent- and case-insensitive, tolerant of typos).",
+        manual_parameters=[
+            openapi.Parameter(
+                name='q',
+                in_=openapi.IN_QUERY,
+                description='Search text, e.g. "addis" or "adis abeba"',
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ],
         responses={
             200: UniversitySerializer(many=True),
         }
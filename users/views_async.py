@@ -0,0 +1,36 @@
+"""
+Async university list for the ASGI read path (``unibazzar/urls_async.py``),
+mirroring ``UniversityListView``.
+"""
+from asgiref.sync import sync_to_async
+from unibazzar.async_read import fetch_queryset, paginate
+
+from .models import University
+from .serializers import UniversitySerializer
+from .university_index import search_universities
+from .views import UniversityListView
+
+
+async def university_list(request):
+    query = request.GET.get('q', '').strip()
+
+    def serialize(rows):
+        return UniversitySerializer(rows, many=True).data
+
+    if not query:
+        queryset = University.objects.all()
+        return await paginate(
+            request, await queryset.acount(),
+            lambda offset, limit: fetch_queryset(queryset, offset, limit),
+            serialize,
+        )
+
+    # Ranking is CPU work on the in-memory index (built from the database on first use)
+    matches = await sync_to_async(search_universities)(query, limit=UniversityListView.max_search_results)
+    universities = await University.objects.ain_bulk([university_id for university_id, _ in matches])
+    rows = [universities[university_id] for university_id, _ in matches if university_id in universities]
+
+    async def fetch(offset, limit):
+        return rows[offset:offset + limit]
+
+    return await paginate(request, len(rows), fetch, serialize)
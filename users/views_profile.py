@@ -1,19 +1,29 @@
+import hashlib
+import json
+
 from rest_framework import status, generics, permissions, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from .serializers import (
     UserProfileSerializer, UserProfileUpdateSerializer, ProfilePictureSerializer,
     EmailChangeSerializer, PhoneNumberUpdateSerializer, PasswordChangeSerializer,
-    StudentProfileSerializer, MerchantProfileSerializer, TutorProfileSerializer, CampusAdminProfileSerializer
+    StudentProfileSerializer, MerchantProfileSerializer, TutorProfileSerializer, CampusAdminProfileSerializer,
+    ChunkedUploadSerializer, UserFullProfileSerializer
 )
 from .utils import send_verification_email
-from .models import StudentProfile, MerchantProfile, TutorProfile, CampusAdminProfile
+from .uploads import (
+    BoundedUploadHandler, ImageRejected, normalize_avatar, delete_later,
+    AssembledFile, ChunkRejected, OffsetMismatch, append_chunk, chunk_path, discard_chunks, file_sha256
+)
+from .models import StudentProfile, MerchantProfile, TutorProfile, CampusAdminProfile, ChunkedUpload
 
 User = get_user_model()
 
@@ -90,13 +100,50 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class UserFullProfileView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Get Full User Profile",
+        operation_description="Retrieve the authenticated user together with their university and role profiles (null when absent) in one request. Send the returned ETag in If-None-Match to get 304 Not Modified while nothing has changed.",
+        responses={
+            200: UserFullProfileSerializer(),
+            304: "Not modified",
+            401: "Unauthorized"
+        }
+    )
+    def get(self, request):
+        user = User.objects.select_related(
+            'university', 'student_profile', 'merchant_profile', 'tutor_profile', 'campus_admin_profile',
+        ).get(pk=request.user.pk)
+        data = UserFullProfileSerializer(user, context={'request': request}).data
+        etag = '"%s"' % hashlib.sha256(
+            json.dumps(data, sort_keys=True, default=str).encode()
+        ).hexdigest()[:32]
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        # Per-user data: browsers may keep it but must revalidate every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
 class ProfilePictureUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [permissions.IsAuthenticated]
-    
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Must be set before anything reads the body
+        if request.method == 'POST':
+            request.upload_handlers = [BoundedUploadHandler(request, settings.AVATAR_MAX_UPLOAD_SIZE)]
+        return super().initialize_request(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_summary="Upload Profile Picture",
-        operation_description="Upload or replace the profile picture for the authenticated user. Use multipart/form-data.",
+        operation_description="Upload or replace the profile picture for the authenticated user. Use multipart/form-data. The image is downscaled, stripped of metadata and stored as WebP.",
         request_body=ProfilePictureSerializer,
         responses={
             200: openapi.Response(
@@ -105,12 +152,13 @@ class ProfilePictureUploadView(APIView):
                     "application/json": {
                         "status": "success",
                         "message": "Profile picture updated successfully",
-                        "profile_picture": "http://example.com/media/profile_pictures/uuid.jpg"
+                        "profile_picture": "http://example.com/media/profile_pictures/2024/05/uuid.webp"
                     }
                 }
             ),
-            400: "Invalid input (e.g., no file, invalid file type)",
-            401: "Unauthorized"
+            400: "Invalid input (e.g., no file, not an image)",
+            401: "Unauthorized",
+            413: "File larger than AVATAR_MAX_UPLOAD_SIZE"
         },
         manual_parameters=[openapi.Parameter(
             name='profile_picture', 
@@ -121,25 +169,42 @@ class ProfilePictureUploadView(APIView):
         )]
     )
     def post(self, request):
-        serializer = ProfilePictureSerializer(
-            request.user, 
-            data=request.data,
-            partial=True
-        )
-        
-        if serializer.is_valid():
-            # Delete old profile picture if exists
-            if request.user.profile_picture:
-                request.user.profile_picture.delete(save=False)
-            
-            serializer.save()
-            return Response({
-                'status': 'success',
-                'message': 'Profile picture updated successfully',
-                'profile_picture': request.build_absolute_uri(request.user.profile_picture.url) if request.user.profile_picture else None
-            })
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        max_size = settings.AVATAR_MAX_UPLOAD_SIZE
+        too_large = Response({
+            'status': 'error',
+            'message': f'Profile picture must be smaller than {max_size // (1024 * 1024)} MB.'
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            # Reject declared oversized bodies before reading them
+            if int(request.META.get('CONTENT_LENGTH') or 0) > max_size + 64 * 1024:
+                return too_large
+        except ValueError:
+            pass
+
+        uploaded = request.FILES.get('profile_picture')
+        if any(getattr(handler, 'exceeded', False) for handler in request.upload_handlers):
+            return too_large
+        if uploaded is None:
+            return Response({'profile_picture': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            avatar = normalize_avatar(uploaded)
+        except ImageRejected as e:
+            return Response({'profile_picture': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        old_name = user.profile_picture.name if user.profile_picture else None
+        with transaction.atomic():
+            user.profile_picture.save(avatar.name, avatar, save=False)
+            user.save(update_fields=['profile_picture', 'updated_at'])
+            # Old file removed in the background after commit
+            delete_later(old_name)
+
+        return Response({
+            'status': 'success',
+            'message': 'Profile picture updated successfully',
+            'profile_picture': request.build_absolute_uri(user.profile_picture.url)
+        })
     
     @swagger_auto_schema(
         operation_summary="Remove Profile Picture",
@@ -170,9 +235,10 @@ class ProfilePictureUploadView(APIView):
         user = request.user
         
         if user.profile_picture:
-            user.profile_picture.delete(save=False)
-            user.profile_picture = None
-            user.save()
+            with transaction.atomic():
+                delete_later(user.profile_picture.name)
+                user.profile_picture = None
+                user.save()
             
             return Response({
                 'status': 'success',
@@ -215,13 +281,14 @@ class EmailChangeView(APIView):
             user = request.user
             new_email = serializer.validated_data['email']
             
-            # Store the new email temporarily
-            user.email = new_email
-            user.is_email_verified = False
-            user.save()
-            
-            # Send verification email
-            send_verification_email(user, request)
+            with transaction.atomic():
+                # Store the new email temporarily
+                user.email = new_email
+                user.is_email_verified = False
+                user.save()
+                
+                # Queue verification email with the change
+                send_verification_email(user, request)
             
             return Response({
                 'status': 'success',
@@ -351,4 +418,132 @@ class CampusAdminProfileViewSet(viewsets.ModelViewSet):
             return CampusAdminProfile.objects.none()
         return CampusAdminProfile.objects.filter(user=self.request.user)
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+# --- Resumable document uploads --- #
+
+class ChunkedUploadCreateView(generics.CreateAPIView):
+    """
+    Start a resumable upload of business_docs (merchants) or edu_docs (tutors).
+    Send the bytes with PUT .../chunk/ and finish with POST .../complete/.
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Start Document Upload",
+        operation_description="Declare a verification document (target, filename, size, sha256) to upload in chunks.",
+    )
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class ChunkedUploadDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Current offset of an upload (where to resume), or DELETE to abandon it.
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False) or not self.request.user.is_authenticated:
+            return ChunkedUpload.objects.none()
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_chunks(instance)
+        instance.delete()
+
+class ChunkedUploadChunkView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Upload Document Chunk",
+        operation_description=(
+            "Send the next bytes of the file as the raw request body (application/octet-stream). "
+            "Upload-Offset must equal the upload's current offset; a 409 response carries the offset to resume from."
+        ),
+        manual_parameters=[openapi.Parameter(
+            name='Upload-Offset',
+            in_=openapi.IN_HEADER,
+            type=openapi.TYPE_INTEGER,
+            required=True,
+            description='Byte offset of this chunk'
+        )],
+        responses={200: ChunkedUploadSerializer, 409: "Offset does not match the upload"}
+    )
+    def put(self, request, pk):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response({
+                'status': 'error',
+                'message': 'Upload-Offset and Content-Length headers are required.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            upload = get_object_or_404(ChunkedUpload.objects.select_for_update(), pk=pk, user=request.user)
+            try:
+                # Streamed from the socket in small pieces, never read whole
+                upload.offset = append_chunk(upload, request.stream, offset, length)
+            except ChunkRejected as e:
+                return Response({
+                    'status': 'error',
+                    'message': str(e),
+                    'offset': upload.offset
+                }, status=status.HTTP_409_CONFLICT if isinstance(e, OffsetMismatch) else status.HTTP_400_BAD_REQUEST)
+            upload.save(update_fields=['offset', 'updated_at'])
+        return Response(ChunkedUploadSerializer(upload).data)
+
+class ChunkedUploadCompleteView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Complete Document Upload",
+        operation_description="Verify the SHA-256 of the assembled file and attach it to the merchant or tutor profile.",
+        request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={}),
+    )
+    def post(self, request, pk):
+        with transaction.atomic():
+            upload = get_object_or_404(ChunkedUpload.objects.select_for_update(), pk=pk, user=request.user)
+            if upload.offset != upload.size:
+                return Response({
+                    'status': 'error',
+                    'message': f'Upload incomplete: {upload.offset} of {upload.size} bytes received.',
+                    'offset': upload.offset
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            path = chunk_path(upload)
+            if file_sha256(path) != upload.sha256:
+                discard_chunks(upload)
+                upload.offset = 0
+                upload.save(update_fields=['offset', 'updated_at'])
+                return Response({
+                    'status': 'error',
+                    'message': 'Checksum mismatch. The upload was reset; send the file again from offset 0.',
+                    'offset': 0
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            profile = upload.get_profile()
+            if profile is None:
+                return Response({
+                    'status': 'error',
+                    'message': 'The profile for this document no longer exists.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            document = getattr(profile, upload.target)
+            old_name = document.name
+            with open(path, 'rb') as fh:
+                document.save(upload.filename, AssembledFile(fh), save=False)
+            profile.save(update_fields=[upload.target])
+            delete_later(old_name)
+            upload.delete()
+        discard_chunks(upload)
+
+        return Response({
+            'status': 'success',
+            'message': 'Document uploaded successfully',
+            upload.target: request.build_absolute_uri(document.url)
+        })